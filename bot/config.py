@@ -1,6 +1,7 @@
 import os
 from dataclasses import dataclass
 from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 
 @dataclass
@@ -9,11 +10,42 @@ class BotConfig:
     admin_ids: list[int]
     username: str
     usd_to_idr: float
+    referral_code_key: str = "referral"
+    pin_scrypt_n: int = 2 ** 14     # scrypt cost; 16 MiB and ~50-70ms per hash
+    pin_hash_workers: int = 2       # threads for PIN hashing
 
 
 @dataclass
 class DatabaseConfig:
     url: str
+    connection_limit: int = 0       # 0 = engine default (num_cpus * 2 + 1)
+    pool_timeout: int = 10          # seconds to wait for a free connection
+    connect_timeout: int = 5
+    statement_cache_size: int = 100  # 0 disables prepared statement caching
+    pgbouncer: bool = False         # transaction-mode PgBouncer / Neon pooled endpoint
+    pool_wait_warn_ms: float = 100
+    slow_query_ms: float = 200
+    replica_url: str = ""           # optional read replica for lag-tolerant reads
+    
+    @property
+    def pool_size(self) -> int:
+        return self.connection_limit or (os.cpu_count() or 1) * 2 + 1
+    
+    def connection_url(self, url: Optional[str] = None) -> str:
+        """Datasource URL with pool and query-engine parameters applied"""
+        url = self.url if url is None else url
+        if not url:
+            return url
+        parts = urlsplit(url)
+        params = dict(parse_qsl(parts.query))
+        if self.connection_limit:
+            params["connection_limit"] = str(self.connection_limit)
+        params["pool_timeout"] = str(self.pool_timeout)
+        params["connect_timeout"] = str(self.connect_timeout)
+        params["statement_cache_size"] = str(0 if self.pgbouncer else self.statement_cache_size)
+        if self.pgbouncer:
+            params["pgbouncer"] = "true"
+        return urlunsplit(parts._replace(query=urlencode(params)))
 
 
 @dataclass
@@ -23,6 +55,8 @@ class OxaPayConfig:
     webhook_secret: str
     webhook_url: str
     base_url: str = "https://api.oxapay.com"
+    payout_rate: float = 5.0          # payout/create requests per second
+    payout_concurrency: int = 8       # payout requests in flight at once
 
 
 @dataclass
@@ -31,6 +65,13 @@ class CryptoBotConfig:
     margin: float = 0.05
 
 
+@dataclass
+class LoggingConfig:
+    level: str = "INFO"
+    json: bool = True
+    sample_rate: float = 1.0
+
+
 @dataclass
 class AppConfig:
     bot: BotConfig
@@ -38,6 +79,8 @@ class AppConfig:
     oxapay: OxaPayConfig
     cryptobot: CryptoBotConfig
     webhook_host: str
+    logging: LoggingConfig
+    ops_token: str = ""     # bearer token for /metrics, /debug/queries and /ready details
     debug: bool = False
 
 
@@ -55,21 +98,40 @@ def load_config() -> AppConfig:
             admin_ids=admin_ids,
             username=os.getenv("BOT_USERNAME", "kriptoecerbot"),
             usd_to_idr=float(os.getenv("USD_TO_IDR", "16000")),
+            referral_code_key=os.getenv("REFERRAL_CODE_KEY", "referral"),
+            pin_scrypt_n=int(os.getenv("PIN_SCRYPT_N", str(2 ** 14))),
+            pin_hash_workers=int(os.getenv("PIN_HASH_WORKERS", "2")),
         ),
         database=DatabaseConfig(
             url=os.getenv("BOT_DATABASE", ""),
+            connection_limit=int(os.getenv("DB_CONNECTION_LIMIT", "0")),
+            pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "10")),
+            connect_timeout=int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+            statement_cache_size=int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")),
+            pgbouncer=os.getenv("DB_PGBOUNCER", "false").lower() == "true",
+            pool_wait_warn_ms=float(os.getenv("DB_POOL_WAIT_WARN_MS", "100")),
+            slow_query_ms=float(os.getenv("DB_SLOW_QUERY_MS", "200")),
+            replica_url=os.getenv("BOT_DATABASE_REPLICA", ""),
         ),
         oxapay=OxaPayConfig(
             merchant_api_key=os.getenv("OXAPAY_MERCHANT_API_KEY", ""),
             payout_api_key=os.getenv("OXAPAY_PAYOUT_API_KEY", ""),
             webhook_secret=os.getenv("OXAPAY_WEBHOOK_SECRET", ""),
             webhook_url=os.getenv("OXAPAY_WEBHOOK_URL", f"https://{webhook_host}/webhook/oxapay"),
+            payout_rate=float(os.getenv("OXAPAY_PAYOUT_RATE", "5")),
+            payout_concurrency=int(os.getenv("OXAPAY_PAYOUT_CONCURRENCY", "8")),
         ),
         cryptobot=CryptoBotConfig(
             api_token=os.getenv("CRYPTOBOT_API_TOKEN", ""),
             margin=float(os.getenv("CRYPTOBOT_MARGIN", "0.05")),
         ),
         webhook_host=webhook_host,
+        logging=LoggingConfig(
+            level=os.getenv("LOG_LEVEL", "INFO").upper(),
+            json=os.getenv("LOG_FORMAT", "json").lower() == "json",
+            sample_rate=float(os.getenv("LOG_SAMPLE_RATE", "1.0")),
+        ),
+        ops_token=os.getenv("OPS_API_TOKEN", ""),
         debug=os.getenv("DEBUG", "false").lower() == "true",
     )
 
@@ -0,0 +1,158 @@
+"""
+Prisma client factory with pool tuning and pool-wait tracking
+The query engine's pool is opaque, so queries pass through a semaphore
+sized like the pool - time spent waiting on it is time spent waiting
+for a connection
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+
+from prisma import Prisma
+from prisma.errors import DataError
+
+from bot.config import DatabaseConfig, config
+from bot.db.instrumentation import query_profiler
+
+logger = logging.getLogger(__name__)
+
+REPLICA_RETRY_AFTER = 30.0    # seconds reads stay on the primary after a replica failure
+
+
+class PooledPrisma(Prisma):
+    def __init__(self, db_config: DatabaseConfig = config.database, url: Optional[str] = None, **kwargs: Any):
+        # Transaction clients are copies built from keyword args only, datasource included
+        kwargs.setdefault("datasource", {"url": db_config.connection_url(url)})
+        super().__init__(**kwargs)
+        self._pool_gate = asyncio.Semaphore(db_config.pool_size)
+        self._pool_size = db_config.pool_size
+        self._wait_warn_ms = db_config.pool_wait_warn_ms
+        self._pool_root = self    # client whose gate and counters this one uses
+        self.pool_queries = 0
+        self.pool_waited = 0
+        self.pool_wait_total_ms = 0.0
+        self.pool_wait_max_ms = 0.0
+    
+    def _copy(self) -> Any:
+        # db.tx() runs on a copy; it must queue on the same gate and report into
+        # the same counters, or transaction traffic would bypass the pool tracking
+        new = super()._copy()
+        new._pool_gate = self._pool_gate
+        new._pool_root = self._pool_root
+        return new
+    
+    async def _execute(self, *args: Any, **kwargs: Any) -> Any:
+        # Every model action and raw query in prisma-client-py goes through _execute
+        started = time.perf_counter()
+        async with self._pool_gate:
+            wait_ms = (time.perf_counter() - started) * 1000
+            self._record_wait(wait_ms, kwargs)
+            query_started = time.perf_counter()
+            try:
+                return await super()._execute(*args, **kwargs)
+            finally:
+                model = kwargs.get("model")
+                query_profiler.record_query(
+                    getattr(model, "__name__", None),
+                    kwargs.get("method"),
+                    (time.perf_counter() - query_started) * 1000,
+                )
+    
+    def _record_wait(self, wait_ms: float, kwargs: dict[str, Any]) -> None:
+        root = self._pool_root
+        root.pool_queries += 1
+        if wait_ms < 1:
+            return
+        root.pool_waited += 1
+        root.pool_wait_total_ms += wait_ms
+        root.pool_wait_max_ms = max(root.pool_wait_max_ms, wait_ms)
+        if wait_ms >= self._wait_warn_ms:
+            model = kwargs.get("model")
+            logger.warning(
+                "Pool saturated: waited %.1fms for a connection (%s.%s, pool size %d)",
+                wait_ms,
+                getattr(model, "__name__", "raw"),
+                kwargs.get("method"),
+                self._pool_size,
+            )
+    
+    def pool_stats(self) -> dict[str, Any]:
+        root = self._pool_root
+        in_use = self._pool_size - self._pool_gate._value
+        return {
+            "size": self._pool_size,
+            "in_use": in_use,
+            "queries": root.pool_queries,
+            "waited": root.pool_waited,
+            "avg_wait_ms": round(root.pool_wait_total_ms / root.pool_waited, 1) if root.pool_waited else 0.0,
+            "max_wait_ms": round(root.pool_wait_max_ms, 1),
+        }
+
+
+class ReplicaPrisma(PooledPrisma):
+    """
+    Read replica client. A query that fails for any reason other than the
+    data itself (connection, engine, timeout) takes the replica out of
+    rotation for a while and is retried on the primary
+    """
+    
+    async def _execute(self, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return await super()._execute(*args, **kwargs)
+        except DataError:
+            raise
+        except Exception as e:
+            if _primary is None:
+                raise
+            mark_replica_down(e)
+            return await _primary._execute(*args, **kwargs)
+
+
+def create_prisma(db_config: DatabaseConfig = config.database, replica: bool = False) -> PooledPrisma:
+    if replica:
+        # Separate client and query engine pointed at the replica
+        return ReplicaPrisma(db_config, url=db_config.replica_url)
+    return PooledPrisma(db_config)
+
+
+# Read replica client, set at startup when BOT_DATABASE_REPLICA is configured
+_read_replica: Optional[Prisma] = None
+_primary: Optional[Prisma] = None
+_replica_down_until = 0.0
+
+
+def set_read_replica(client: Optional[Prisma], primary: Optional[Prisma] = None) -> None:
+    global _read_replica, _primary
+    _read_replica = client
+    _primary = primary
+
+
+def mark_replica_down(error: BaseException) -> None:
+    global _replica_down_until
+    now = time.monotonic()
+    if now >= _replica_down_until:
+        logger.warning(
+            "Read replica failed, reads go to the primary for %.0fs: %s",
+            REPLICA_RETRY_AFTER,
+            error,
+        )
+    _replica_down_until = now + REPLICA_RETRY_AFTER
+
+
+def read_client(db: Prisma) -> Prisma:
+    """
+    Client for lag-tolerant reads (history, lists, dashboards, counts).
+    Falls back to the primary when no replica is configured, it is
+    disconnected, or a recent query on it failed.
+    Reads that guard a write - balance checks before a debit - and reads
+    that fill a cache must use db directly.
+    """
+    if (
+        _read_replica is not None
+        and _read_replica.is_connected()
+        and time.monotonic() >= _replica_down_until
+    ):
+        return _read_replica
+    return db
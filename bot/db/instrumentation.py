@@ -0,0 +1,113 @@
+"""
+Query instrumentation for the Prisma client
+Counts queries and DB time per update (via a context variable set by
+DatabaseMiddleware), logs slow queries, and keeps running totals per
+model operation and per handler for /debug/queries
+"""
+
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """Queries issued while handling one update"""
+    count: int = 0
+    db_ms: float = 0.0
+    operations: list[str] = field(default_factory=list)
+
+
+@dataclass
+class _Totals:
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    queries: int = 0
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+class QueryProfiler:
+    MAX_OPERATIONS_PER_UPDATE = 50
+    
+    def __init__(self, slow_query_ms: float = 200):
+        self.slow_query_ms = slow_query_ms
+        self._operations: dict[str, _Totals] = {}
+        self._handlers: dict[str, _Totals] = {}
+    
+    def begin_update(self) -> QueryStats:
+        stats = QueryStats()
+        current_query_stats.set(stats)
+        return stats
+    
+    def record_query(self, model: Optional[str], method: Optional[str], elapsed_ms: float) -> None:
+        operation = f"{model or 'raw'}.{method}"
+        
+        totals = self._operations.setdefault(operation, _Totals())
+        totals.calls += 1
+        totals.total_ms += elapsed_ms
+        totals.max_ms = max(totals.max_ms, elapsed_ms)
+        
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.db_ms += elapsed_ms
+            if len(stats.operations) < self.MAX_OPERATIONS_PER_UPDATE:
+                stats.operations.append(operation)
+        
+        if elapsed_ms >= self.slow_query_ms:
+            logger.warning("Slow query: %s took %.1fms", operation, elapsed_ms)
+    
+    def record_update(self, handler: str, stats: QueryStats) -> None:
+        totals = self._handlers.setdefault(handler, _Totals())
+        totals.calls += 1
+        totals.queries += stats.count
+        totals.total_ms += stats.db_ms
+        totals.max_ms = max(totals.max_ms, stats.db_ms)
+    
+    def top(self, limit: int = 20) -> dict[str, Any]:
+        """Worst model operations by total time, worst handlers by queries per update"""
+        operations = sorted(self._operations.items(), key=lambda kv: kv[1].total_ms, reverse=True)
+        handlers = sorted(
+            self._handlers.items(),
+            key=lambda kv: kv[1].queries / kv[1].calls if kv[1].calls else 0,
+            reverse=True,
+        )
+        return {
+            "slow_query_ms": self.slow_query_ms,
+            "operations": [
+                {
+                    "operation": name,
+                    "calls": t.calls,
+                    "total_ms": round(t.total_ms, 1),
+                    "avg_ms": round(t.total_ms / t.calls, 1),
+                    "max_ms": round(t.max_ms, 1),
+                }
+                for name, t in operations[:limit]
+            ],
+            "handlers": [
+                {
+                    "handler": name,
+                    "updates": t.calls,
+                    "avg_queries": round(t.queries / t.calls, 1),
+                    "avg_db_ms": round(t.total_ms / t.calls, 1),
+                    "max_db_ms": round(t.max_ms, 1),
+                }
+                for name, t in handlers[:limit]
+            ],
+        }
+    
+    def reset(self) -> None:
+        self._operations.clear()
+        self._handlers.clear()
+
+
+# Global profiler instance
+query_profiler = QueryProfiler(slow_query_ms=config.database.slow_query_ms)
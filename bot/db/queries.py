@@ -4,6 +4,10 @@ from datetime import datetime
 from prisma import Prisma, Json
 from prisma.models import User, Balance, Transaction, Deposit, Withdrawal, CryptoOrder, CoinSetting, PaymentMethod, ReferralSetting
 from prisma.enums import TransactionStatus, TransactionType, UserStatus, OrderStatus, OrderType
+from prisma.errors import UniqueViolationError
+
+from bot.db.client import read_client
+from bot.services.referral_codes import referral_code_allocator
 
 
 async def get_user_by_telegram_id(db: Prisma, telegram_id: int) -> Optional[User]:
@@ -13,10 +17,12 @@ async def get_user_by_telegram_id(db: Prisma, telegram_id: int) -> Optional[User
     )
 
 
+REFERRAL_CODE_ATTEMPTS = 5
+
+
 async def create_user(
     db: Prisma,
     telegram_id: int,
-    referral_code: str,
     username: Optional[str] = None,
     first_name: Optional[str] = None,
     last_name: Optional[str] = None,
@@ -25,37 +31,59 @@ async def create_user(
     latitude: Optional[float] = None,
     longitude: Optional[float] = None,
     referred_by_id: Optional[str] = None,
+    referral_setting: Optional[ReferralSetting] = None,
 ) -> User:
-    user = await db.user.create(
-        data={
-            "telegramId": telegram_id,
-            "username": username,
-            "firstName": first_name,
-            "lastName": last_name,
-            "email": email,
-            "whatsapp": whatsapp,
-            "latitude": latitude,
-            "longitude": longitude,
-            "referralCode": referral_code,
-            "referredById": referred_by_id,
-            "status": UserStatus.ACTIVE,
-        }
-    )
+    """
+    Create user + balance in one nested insert, returning the balance relation.
+    Referral codes come from the allocator and are unique by construction;
+    a collision with a legacy random code just retries with the next one.
+    When referred, both bonuses are applied in the same transaction as the insert.
+    """
+    referee_bonus = Decimal("0")
+    referrer_bonus = Decimal("0")
+    if referred_by_id and referral_setting:
+        referee_bonus = referral_setting.refereeBonus
+        referrer_bonus = referral_setting.referrerBonus
     
-    await db.balance.create(
-        data={
-            "userId": user.id,
-            "amount": Decimal("0"),
-        }
-    )
+    data: dict[str, Any] = {
+        "telegramId": telegram_id,
+        "username": username,
+        "firstName": first_name,
+        "lastName": last_name,
+        "email": email,
+        "whatsapp": whatsapp,
+        "latitude": latitude,
+        "longitude": longitude,
+        "referredById": referred_by_id,
+        "status": UserStatus.ACTIVE,
+        "balance": {"create": {"amount": referee_bonus}},
+        "referralBonusTotal": referee_bonus,
+    }
+    if referee_bonus > 0:
+        data["transactions"] = {"create": [_referral_bonus_tx(referee_bonus, "Bonus pendaftaran")]}
     
-    result = await db.user.find_unique(
-        where={"id": user.id},
-        include={"balance": True}
-    )
-    if result is None:
-        raise ValueError("Failed to create user")
-    return result
+    for attempt in range(REFERRAL_CODE_ATTEMPTS):
+        data["referralCode"] = await referral_code_allocator.allocate(db)
+        try:
+            if not referred_by_id:
+                return await db.user.create(data=cast(Any, data), include={"balance": True})
+            
+            async with db.tx() as tx:
+                user = await tx.user.create(data=cast(Any, data), include={"balance": True})
+                await _update_referrer(tx, referred_by_id, referrer_bonus)
+                await _insert_referral_closure(tx, user.id, referred_by_id)
+            
+            # After commit, so a concurrent read cannot re-cache the old balance
+            from bot.services.cache import cache_service
+            cache_service.invalidate_balance(referred_by_id)
+            cache_service.invalidate_balance(user.id)
+            return user
+        except UniqueViolationError as e:
+            # Only a referral code collision is retryable; a duplicate telegramId is a real conflict
+            if "referral" not in str(e).lower() or attempt == REFERRAL_CODE_ATTEMPTS - 1:
+                raise
+    
+    raise ValueError("Failed to create user")
 
 
 async def get_user_balance(db: Prisma, user_id: str) -> Decimal:
@@ -174,6 +202,7 @@ async def create_crypto_order(
     expires_at: Optional[datetime] = None,
     oxapay_payment_id: Optional[str] = None,
     oxapay_payout_id: Optional[str] = None,
+    status: OrderStatus = OrderStatus.PENDING,
 ) -> CryptoOrder:
     return await db.cryptoorder.create(
         data={
@@ -188,7 +217,7 @@ async def create_crypto_order(
             "networkFee": network_fee,
             "walletAddress": wallet_address,
             "depositAddress": deposit_address,
-            "status": OrderStatus.PENDING,
+            "status": status,
             "expiresAt": expires_at,
             "oxapayPaymentId": oxapay_payment_id,
             "oxapayPayoutId": oxapay_payout_id,
@@ -196,6 +225,163 @@ async def create_crypto_order(
     )
 
 
+def _values_placeholders(rows: int, casts: tuple[str, ...]) -> str:
+    """($1::text, $2::numeric), ($3::text, $4::numeric), ... for a VALUES list"""
+    width = len(casts)
+    return ", ".join(
+        "(" + ", ".join(f"${row * width + col + 1}::{cast_}" for col, cast_ in enumerate(casts)) + ")"
+        for row in range(rows)
+    )
+
+
+async def record_submitted_payouts(db: Prisma, payouts: list[tuple[str, Optional[str], Optional[str]]]) -> int:
+    """
+    Store payout track ids (and a tx hash if OxaPay already has one) in one statement.
+    payouts: (order_id, payout_id, tx_hash). Orders stay PROCESSING until the payout is final
+    """
+    if not payouts:
+        return 0
+    return await db.execute_raw(
+        f"""
+        UPDATE crypto_orders AS o
+        SET oxapay_payout_id = v.payout_id,
+            tx_hash = COALESCE(v.tx_hash, o.tx_hash),
+            updated_at = NOW()
+        FROM (VALUES {_values_placeholders(len(payouts), ("text", "text", "text"))}) AS v(id, payout_id, tx_hash)
+        WHERE o.id = v.id
+        """,
+        *(value for row in payouts for value in row),
+    )
+
+
+async def fail_unsubmitted_buy_order(db: Prisma, order_id: str) -> Optional[CryptoOrder]:
+    """
+    Fail a BUY order whose payout never got a track id and refund the user.
+    Conditional, so an order recorded or refunded meanwhile is left alone;
+    returns the order (with user) only when this call refunded it
+    """
+    async with db.tx() as tx:
+        moved = await tx.cryptoorder.update_many(
+            where={"id": order_id, "status": OrderStatus.PROCESSING, "oxapayPayoutId": None},
+            data={"status": OrderStatus.FAILED},
+        )
+        if not moved:
+            return None
+        order = await tx.cryptoorder.find_unique(where={"id": order_id}, include={"user": True})
+        if order is None:
+            return None
+        balance = await tx.balance.update(
+            where={"userId": order.userId},
+            data=cast(Any, {"amount": {"increment": float(order.fiatAmount)}}),
+        )
+        if balance is None:
+            raise ValueError(f"Balance not found for user {order.userId}")
+    
+    # After commit, so a concurrent read cannot re-cache the old balance
+    from bot.services.cache import cache_service
+    cache_service.invalidate_balance(order.userId)
+    return order
+
+
+async def refund_balances(db: Prisma, refunds: dict[str, Decimal]) -> int:
+    """
+    Credit several users in one statement. One row per user - UPDATE ... FROM applies a single match per row.
+    Raises when a user has no balance row so the surrounding transaction rolls back; run it
+    inside one and invalidate the cached balances after it commits
+    """
+    if not refunds:
+        return 0
+    count = await db.execute_raw(
+        f"""
+        UPDATE balances AS b
+        SET amount = b.amount + v.amount, updated_at = NOW()
+        FROM (VALUES {_values_placeholders(len(refunds), ("text", "numeric"))}) AS v(user_id, amount)
+        WHERE b.user_id = v.user_id
+        """,
+        *(value for user_id, amount in refunds.items() for value in (user_id, str(amount))),
+    )
+    if count != len(refunds):
+        raise ValueError(f"Balance not found for {len(refunds) - count} of {len(refunds)} users")
+    return count
+
+
+# Pending requests an admin can settle in bulk: table and the transaction metadata key pointing at it
+_SETTLEABLE = {
+    "deposits": "depositId",
+    "withdrawals": "withdrawalId",
+}
+
+
+async def _settle_pending(tx: Prisma, table: str, ids: list[str], status: TransactionStatus) -> list[dict[str, Any]]:
+    """
+    Move the still-PENDING rows among ids to status and mark their ledger
+    transactions the same, two statements in total. Returns the rows that
+    actually moved with the owner's Telegram ID, so an item settled
+    concurrently is neither counted nor notified twice
+    """
+    if not ids:
+        return []
+    meta_key = _SETTLEABLE[table]
+    values = _values_placeholders(len(ids), ("text",))
+    rows = await tx.query_raw(
+        f"""
+        UPDATE {table} AS r
+        SET status = ${len(ids) + 1}::"TransactionStatus", updated_at = NOW()
+        FROM (VALUES {values}) AS v(id), users AS u
+        WHERE r.id = v.id AND r.status = 'PENDING' AND u.id = r.user_id
+        RETURNING r.id, r.user_id AS "userId", r.amount, u.telegram_id AS "telegramId"
+        """,
+        *ids,
+        status.value,
+    )
+    if rows:
+        await tx.execute_raw(
+            f"""
+            UPDATE transactions AS t
+            SET status = ${len(rows) + 1}::"TransactionStatus", updated_at = NOW()
+            FROM (VALUES {_values_placeholders(len(rows), ("text",))}) AS v(id)
+            WHERE t.metadata->>'{meta_key}' = v.id
+            """,
+            *(row["id"] for row in rows),
+            status.value,
+        )
+    return [
+        {
+            "id": row["id"],
+            "userId": row["userId"],
+            "amount": Decimal(str(row["amount"])),
+            "telegramId": int(row["telegramId"]),
+        }
+        for row in rows
+    ]
+
+
+async def settle_deposits(db: Prisma, deposit_ids: list[str], approve: bool) -> list[dict[str, Any]]:
+    """Approve (credit balances) or reject pending top ups in one DB transaction"""
+    status = TransactionStatus.COMPLETED if approve else TransactionStatus.FAILED
+    async with db.tx() as tx:
+        settled = await _settle_pending(tx, "deposits", deposit_ids, status)
+        if approve:
+            credits: dict[str, Decimal] = {}
+            for row in settled:
+                credits[row["userId"]] = credits.get(row["userId"], Decimal("0")) + row["amount"]
+            await refund_balances(tx, credits)
+    
+    if approve:
+        # After commit, so a concurrent read cannot re-cache the old balance
+        from bot.services.cache import cache_service
+        for user_id in {row["userId"] for row in settled}:
+            cache_service.invalidate_balance(user_id)
+    return settled
+
+
+async def settle_withdrawals(db: Prisma, withdrawal_ids: list[str], approve: bool) -> list[dict[str, Any]]:
+    """Approve or reject pending withdrawals in one DB transaction"""
+    status = TransactionStatus.COMPLETED if approve else TransactionStatus.FAILED
+    async with db.tx() as tx:
+        return await _settle_pending(tx, "withdrawals", withdrawal_ids, status)
+
+
 async def get_coin_settings(db: Prisma, coin_symbol: str, network: str) -> Optional[CoinSetting]:
     return await db.coinsetting.find_unique(
         where={"coinSymbol_network": {"coinSymbol": coin_symbol, "network": network}}
@@ -203,11 +389,11 @@ async def get_coin_settings(db: Prisma, coin_symbol: str, network: str) -> Optio
 
 
 async def get_active_coin_settings(db: Prisma) -> list[CoinSetting]:
-    return await db.coinsetting.find_many(where={"isActive": True})
+    return await read_client(db).coinsetting.find_many(where={"isActive": True})
 
 
 async def get_payment_methods(db: Prisma, is_active: bool = True) -> list[PaymentMethod]:
-    return await db.paymentmethod.find_many(where={"isActive": is_active})
+    return await read_client(db).paymentmethod.find_many(where={"isActive": is_active})
 
 
 async def get_referral_setting(db: Prisma) -> Optional[ReferralSetting]:
@@ -225,7 +411,7 @@ async def get_user_transactions(
     if tx_type:
         where["type"] = tx_type
     
-    return await db.transaction.find_many(
+    return await read_client(db).transaction.find_many(
         where=cast(Any, where),
         order={"createdAt": "desc"},
         take=limit,
@@ -242,15 +428,16 @@ async def count_user_transactions(
     if tx_type:
         where["type"] = tx_type
     
-    return await db.transaction.count(where=cast(Any, where))
+    return await read_client(db).transaction.count(where=cast(Any, where))
 
 
 async def get_referral_count(db: Prisma, user_id: str) -> int:
-    return await db.user.count(where={"referredById": user_id})
+    """Live COUNT - screens should read User.referralCount instead"""
+    return await read_client(db).user.count(where={"referredById": user_id})
 
 
 async def get_referral_bonus_earned(db: Prisma, user_id: str) -> Decimal:
-    transactions = await db.transaction.find_many(
+    transactions = await read_client(db).transaction.find_many(
         where={
             "userId": user_id,
             "type": TransactionType.REFERRAL_BONUS,
@@ -261,33 +448,105 @@ async def get_referral_bonus_earned(db: Prisma, user_id: str) -> Decimal:
     return sum(tx.amount for tx in transactions) or Decimal("0")
 
 
-async def process_referral_bonus(
-    db: Prisma,
-    referrer_id: str,
-    referee_id: str,
-    referrer_bonus: Decimal,
-    referee_bonus: Decimal,
-):
-    if referrer_bonus > 0:
-        await update_balance(db, referrer_id, referrer_bonus)
-        await db.transaction.create(
-            data={
-                "userId": referrer_id,
-                "type": TransactionType.REFERRAL_BONUS,
-                "amount": referrer_bonus,
-                "status": TransactionStatus.COMPLETED,
-                "description": "Bonus referral",
-            }
-        )
-    
-    if referee_bonus > 0:
-        await update_balance(db, referee_id, referee_bonus)
-        await db.transaction.create(
-            data={
-                "userId": referee_id,
-                "type": TransactionType.REFERRAL_BONUS,
-                "amount": referee_bonus,
-                "status": TransactionStatus.COMPLETED,
-                "description": "Bonus pendaftaran",
-            }
+def _referral_bonus_tx(amount: Decimal, description: str) -> dict[str, Any]:
+    return {
+        "type": TransactionType.REFERRAL_BONUS,
+        "amount": amount,
+        "status": TransactionStatus.COMPLETED,
+        "description": description,
+    }
+
+
+def _referral_bonus_update(amount: Decimal, description: str) -> dict[str, Any]:
+    """Balance increment, ledger row and running bonus total for a nested user update"""
+    return {
+        "balance": {"update": {"amount": {"increment": amount}}},
+        "transactions": {"create": [_referral_bonus_tx(amount, description)]},
+        "referralBonusTotal": {"increment": amount},
+    }
+
+
+async def _update_referrer(db: Prisma, referrer_id: str, bonus: Decimal) -> None:
+    """Count the new referral and credit the referrer bonus in one statement"""
+    data: dict[str, Any] = {"referralCount": {"increment": 1}}
+    if bonus > 0:
+        data.update(_referral_bonus_update(bonus, "Bonus referral"))
+    await db.user.update(where={"id": referrer_id}, data=cast(Any, data))
+
+
+async def _insert_referral_closure(db: Prisma, user_id: str, referrer_id: str) -> None:
+    """New leaf: the referrer at depth 1 plus every ancestor of the referrer one level deeper"""
+    await db.execute_raw(
+        """
+        INSERT INTO referral_closure (ancestor_id, descendant_id, depth)
+        SELECT $2::text, $1::text, 1
+        UNION ALL
+        SELECT ancestor_id, $1::text, depth + 1 FROM referral_closure WHERE descendant_id = $2
+        """,
+        user_id,
+        referrer_id,
+    )
+
+
+async def get_referral_descendants(db: Prisma, user_id: str, max_depth: int = 3) -> list[dict[str, Any]]:
+    """All referrals down to max_depth, nearest first"""
+    return await read_client(db).query_raw(
+        """
+        SELECT u.id, u.telegram_id AS "telegramId", u.username, u.first_name AS "firstName", c.depth
+        FROM referral_closure c
+        JOIN users u ON u.id = c.descendant_id
+        WHERE c.ancestor_id = $1 AND c.depth <= $2
+        ORDER BY c.depth, u.created_at
+        """,
+        user_id,
+        max_depth,
+    )
+
+
+async def count_referrals_by_depth(db: Prisma, user_id: str, max_depth: int = 3) -> dict[int, int]:
+    rows = await read_client(db).query_raw(
+        """
+        SELECT depth, COUNT(*) AS count
+        FROM referral_closure
+        WHERE ancestor_id = $1 AND depth <= $2
+        GROUP BY depth
+        """,
+        user_id,
+        max_depth,
+    )
+    return {int(row["depth"]): int(row["count"]) for row in rows}
+
+
+async def get_top_referrers(db: Prisma, limit: int = 10, max_depth: int = 1) -> list[dict[str, Any]]:
+    """
+    Users with the largest referral trees down to max_depth. Direct referrals
+    come from the indexed users.referral_count; deeper trees aggregate the closure table
+    """
+    if max_depth <= 1:
+        return await read_client(db).query_raw(
+            """
+            SELECT id, telegram_id AS "telegramId", username, first_name AS "firstName", referral_count AS total
+            FROM users
+            WHERE referral_count > 0
+            ORDER BY referral_count DESC
+            LIMIT $1
+            """,
+            limit,
         )
+    return await read_client(db).query_raw(
+        """
+        SELECT u.id, u.telegram_id AS "telegramId", u.username, u.first_name AS "firstName", t.total
+        FROM (
+            SELECT ancestor_id, COUNT(*) AS total
+            FROM referral_closure
+            WHERE depth <= $1
+            GROUP BY ancestor_id
+            ORDER BY total DESC
+            LIMIT $2
+        ) t
+        JOIN users u ON u.id = t.ancestor_id
+        ORDER BY t.total DESC
+        """,
+        max_depth,
+        limit,
+    )
@@ -1,5 +1,6 @@
 from decimal import Decimal
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
 from typing import Optional
 import random
 
@@ -94,11 +95,10 @@ Dengan menggunakan layanan ini, Anda menyetujui:
 {warning} Pastikan Anda memahami risiko trading crypto.""".format(warning=Emoji.WARNING)
 
 
-def format_main_menu(balance: Decimal | int, name: str, telegram_id: int) -> str:
+@lru_cache(maxsize=1)
+def _main_menu_template() -> str:
+    """Static parts baked in once; per-user fields are spliced in by format_main_menu"""
     from bot.config import config
-    greeting = get_wib_greeting()
-    quote = get_quote()
-    
     return """{greeting}, <b>{name}</b>!
 <code>ID: {telegram_id}</code>
 
@@ -106,13 +106,16 @@ def format_main_menu(balance: Decimal | int, name: str, telegram_id: int) -> str
 
 <i>{quote}</i>
 
-<i>⚠️ Pastikan menggunakan bot official @{bot_username}</i>""".format(
-        greeting=greeting,
+<i>⚠️ Pastikan menggunakan bot official @%s</i>""" % config.bot.username
+
+
+def format_main_menu(balance: Decimal | int, name: str, telegram_id: int) -> str:
+    return _main_menu_template().format(
+        greeting=get_wib_greeting(),
         name=name,
         telegram_id=telegram_id,
         balance=format_currency(balance),
-        quote=quote,
-        bot_username=config.bot.username
+        quote=get_quote(),
     )
 
 
@@ -190,18 +193,21 @@ Bagikan ke teman untuk dapat bonus!""".format(
     )
 
 
+@lru_cache(maxsize=None)
 def format_buy_menu() -> str:
     return """{coin} <b>Beli Crypto</b>
 
 Pilih cryptocurrency yang ingin Anda beli:""".format(coin=Emoji.COIN)
 
 
+@lru_cache(maxsize=None)
 def format_sell_menu() -> str:
     return """{money} <b>Jual Crypto</b>
 
 Pilih cryptocurrency yang ingin Anda jual:""".format(money=Emoji.MONEY)
 
 
+@lru_cache(maxsize=None)
 def format_coin_networks(coin: str) -> str:
     return """<b>Pilih Network {coin}</b>
 
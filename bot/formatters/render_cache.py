@@ -0,0 +1,51 @@
+"""
+Memoized screen rendering
+Price-driven screens (rates, stock, buy prompts) render the same text for
+every viewer until the underlying snapshot changes, so rendered text is
+kept per snapshot version and dropped wholesale when the version moves on
+"""
+
+from typing import Callable, Hashable
+
+
+class RenderCache:
+    """
+    Entries are grouped by screen. Each screen tracks its own snapshot
+    version, so the rates board moving on does not evict the stock board
+    """
+    
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._versions: dict[str, Hashable] = {}
+        self._entries: dict[str, dict[Hashable, str]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get_or_render(self, screen: str, version: Hashable, key: Hashable, render: Callable[[], str]) -> str:
+        entries = self._entries.setdefault(screen, {})
+        if self._versions.get(screen) != version:
+            entries.clear()
+            self._versions[screen] = version
+        
+        text = entries.get(key)
+        if text is not None:
+            self.hits += 1
+            return text
+        
+        self.misses += 1
+        if len(entries) >= self.max_entries:
+            entries.clear()
+        text = render()
+        entries[key] = text
+        return text
+    
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": sum(len(entries) for entries in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Global render cache instance
+render_cache = RenderCache()
@@ -7,6 +7,7 @@ from bot.handlers.admin.payments import router as payments_router
 from bot.handlers.admin.referrals import router as referrals_router
 from bot.handlers.admin.users import router as users_router
 from bot.handlers.admin.commands import router as commands_router
+from bot.handlers.admin.broadcast import router as broadcast_router
 
 router = Router()
 
@@ -17,3 +18,4 @@ router.include_router(payments_router)
 router.include_router(referrals_router)
 router.include_router(users_router)
 router.include_router(commands_router)
+router.include_router(broadcast_router)
@@ -0,0 +1,64 @@
+from typing import Any
+from aiogram import Router
+from aiogram.types import Message
+from aiogram.filters import Command, CommandObject
+from prisma import Prisma
+
+from bot.formatters.messages import Emoji
+from bot.services.broadcast import broadcast_engine, format_broadcast_status
+from bot.handlers.admin.shared import is_admin
+
+router = Router()
+
+
+@router.message(Command("broadcast"))
+async def broadcast(message: Message, command: CommandObject, db: Prisma, **kwargs: Any) -> None:
+    from_user = message.from_user
+    if from_user is None or not is_admin(from_user.id):
+        return
+    
+    reply = message.reply_to_message
+    if reply is not None and (reply.text or reply.caption):
+        text = reply.html_text
+    else:
+        text = (command.args or "").strip()
+    
+    if not text:
+        await message.answer(
+            "Usage: /broadcast [pesan]\n"
+            "atau reply pesan yang ingin di-broadcast dengan /broadcast"
+        )
+        return
+    
+    if message.bot is None:
+        return
+    
+    started = await broadcast_engine.start(message.bot, db, text, message.chat.id)
+    if not started:
+        await message.answer(f"{Emoji.WARNING} Broadcast lain masih berjalan. Cek /broadcast_status")
+
+
+@router.message(Command("broadcast_status"))
+async def broadcast_status(message: Message, **kwargs: Any) -> None:
+    from_user = message.from_user
+    if from_user is None or not is_admin(from_user.id):
+        return
+    
+    progress = broadcast_engine.progress
+    if progress is None:
+        await message.answer("Belum ada broadcast.")
+        return
+    
+    await message.answer(format_broadcast_status(progress), parse_mode="HTML")
+
+
+@router.message(Command("broadcast_cancel"))
+async def broadcast_cancel(message: Message, **kwargs: Any) -> None:
+    from_user = message.from_user
+    if from_user is None or not is_admin(from_user.id):
+        return
+    
+    if broadcast_engine.cancel():
+        await message.answer(f"{Emoji.CHECK} Broadcast dibatalkan.")
+    else:
+        await message.answer("Tidak ada broadcast yang berjalan.")
@@ -8,7 +8,7 @@ from prisma import Prisma
 from bot.formatters.messages import Emoji
 from bot.utils.telegram_helpers import get_callback_data
 from bot.keyboards.admin import coin_list_keyboard, coin_networks_keyboard, coin_edit_keyboard, cancel_keyboard
-from bot.handlers.admin.shared import AdminStates, is_admin, safe_edit_text
+from bot.handlers.admin.shared import AdminStates, is_admin, safe_edit_text, invalidate_coin_caches
 
 router = Router()
 
@@ -99,6 +99,7 @@ async def toggle_coin(callback: CallbackQuery, db: Prisma, **kwargs: Any) -> Non
         where={"id": coin_id},
         data={"isActive": not coin.isActive}
     )
+    invalidate_coin_caches()
     
     status = "disabled" if coin.isActive else "enabled"
     await callback.answer(f"{coin.coinSymbol} {coin.network} {status}!", show_alert=True)
@@ -192,6 +193,7 @@ async def set_buy_margin_finish(message: Message, state: FSMContext, db: Prisma,
         return
     
     await db.coinsetting.update(where={"id": coin_id}, data={"buyMargin": margin})
+    invalidate_coin_caches()
     await state.clear()
     await message.answer(f"{Emoji.CHECK} Buy margin berhasil diubah ke {margin}%")
 
@@ -245,6 +247,7 @@ async def set_sell_margin_finish(message: Message, state: FSMContext, db: Prisma
         return
     
     await db.coinsetting.update(where={"id": coin_id}, data={"sellMargin": margin})
+    invalidate_coin_caches()
     await state.clear()
     await message.answer(f"{Emoji.CHECK} Sell margin berhasil diubah ke {margin}%")
 
@@ -298,6 +301,7 @@ async def set_min_buy_finish(message: Message, state: FSMContext, db: Prisma, **
         return
     
     await db.coinsetting.update(where={"id": coin_id}, data={"minBuy": amount})
+    invalidate_coin_caches()
     await state.clear()
     await message.answer(f"{Emoji.CHECK} Min buy berhasil diubah ke Rp {amount:,.0f}")
 
@@ -351,6 +355,7 @@ async def set_max_buy_finish(message: Message, state: FSMContext, db: Prisma, **
         return
     
     await db.coinsetting.update(where={"id": coin_id}, data={"maxBuy": amount})
+    invalidate_coin_caches()
     await state.clear()
     await message.answer(f"{Emoji.CHECK} Max buy berhasil diubah ke Rp {amount:,.0f}")
 
@@ -404,6 +409,7 @@ async def set_min_sell_finish(message: Message, state: FSMContext, db: Prisma, *
         return
     
     await db.coinsetting.update(where={"id": coin_id}, data={"minSell": amount})
+    invalidate_coin_caches()
     await state.clear()
     await message.answer(f"{Emoji.CHECK} Min sell berhasil diubah ke Rp {amount:,.0f}")
 
@@ -457,5 +463,6 @@ async def set_max_sell_finish(message: Message, state: FSMContext, db: Prisma, *
         return
     
     await db.coinsetting.update(where={"id": coin_id}, data={"maxSell": amount})
+    invalidate_coin_caches()
     await state.clear()
     await message.answer(f"{Emoji.CHECK} Max sell berhasil diubah ke Rp {amount:,.0f}")
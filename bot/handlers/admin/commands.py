@@ -7,18 +7,19 @@ from prisma.enums import TransactionStatus
 
 from bot.formatters.messages import Emoji
 from bot.db.queries import update_balance
+from bot.services.message_sender import message_sender
 from bot.handlers.admin.shared import is_admin
 
 router = Router()
 
 
 @router.message(Command("pending_topup"))
-async def pending_topup(message: Message, db: Prisma, **kwargs: Any) -> None:
+async def pending_topup(message: Message, db_read: Prisma, **kwargs: Any) -> None:
     from_user = message.from_user
     if from_user is None or not is_admin(from_user.id):
         return
     
-    deposits = await db.deposit.find_many(
+    deposits = await db_read.deposit.find_many(
         where={"status": TransactionStatus.PENDING},
         include={"user": True},
         order={"createdAt": "asc"},
@@ -48,12 +49,12 @@ async def pending_topup(message: Message, db: Prisma, **kwargs: Any) -> None:
 
 
 @router.message(Command("pending_withdraw"))
-async def pending_withdraw(message: Message, db: Prisma, **kwargs: Any) -> None:
+async def pending_withdraw(message: Message, db_read: Prisma, **kwargs: Any) -> None:
     from_user = message.from_user
     if from_user is None or not is_admin(from_user.id):
         return
     
-    withdrawals = await db.withdrawal.find_many(
+    withdrawals = await db_read.withdrawal.find_many(
         where={"status": TransactionStatus.PENDING},
         include={"user": True},
         order={"createdAt": "asc"},
@@ -134,16 +135,12 @@ async def approve_topup(message: Message, db: Prisma, **kwargs: Any) -> None:
         f"Amount: Rp {deposit.amount:,.0f}"
     )
     
-    if user is not None and message.bot is not None:
-        try:
-            await message.bot.send_message(
-                user.telegramId,
-                f"<b>Topup Berhasil</b> {Emoji.CHECK}\n\n"
-                f"Rp {deposit.amount:,.0f} telah ditambahkan ke saldo Anda.",
-                parse_mode="HTML"
-            )
-        except Exception:
-            pass
+    if user is not None:
+        message_sender.send(
+            user.telegramId,
+            f"<b>Topup Berhasil</b> {Emoji.CHECK}\n\n"
+            f"Rp {deposit.amount:,.0f} telah ditambahkan ke saldo Anda."
+        )
 
 
 @router.message(Command("reject_topup"))
@@ -186,17 +183,13 @@ async def reject_topup(message: Message, db: Prisma, **kwargs: Any) -> None:
     await message.answer(f"{Emoji.CHECK} Topup rejected!")
     
     user = deposit.user
-    if user is not None and message.bot is not None:
-        try:
-            await message.bot.send_message(
-                user.telegramId,
-                f"<b>Topup Ditolak</b> {Emoji.CROSS}\n\n"
-                f"Topup Rp {deposit.amount:,.0f} ditolak.\n"
-                f"Hubungi admin untuk info lebih lanjut.",
-                parse_mode="HTML"
-            )
-        except Exception:
-            pass
+    if user is not None:
+        message_sender.send(
+            user.telegramId,
+            f"<b>Topup Ditolak</b> {Emoji.CROSS}\n\n"
+            f"Topup Rp {deposit.amount:,.0f} ditolak.\n"
+            f"Hubungi admin untuk info lebih lanjut."
+        )
 
 
 @router.message(Command("approve_withdraw"))
@@ -245,16 +238,12 @@ async def approve_withdraw(message: Message, db: Prisma, **kwargs: Any) -> None:
         f"Amount: Rp {withdrawal.amount:,.0f}"
     )
     
-    if user is not None and message.bot is not None:
-        try:
-            await message.bot.send_message(
-                user.telegramId,
-                f"<b>Withdraw Berhasil</b> {Emoji.CHECK}\n\n"
-                f"Rp {withdrawal.amount:,.0f} telah dikirim ke rekening Anda.",
-                parse_mode="HTML"
-            )
-        except Exception:
-            pass
+    if user is not None:
+        message_sender.send(
+            user.telegramId,
+            f"<b>Withdraw Berhasil</b> {Emoji.CHECK}\n\n"
+            f"Rp {withdrawal.amount:,.0f} telah dikirim ke rekening Anda."
+        )
 
 
 @router.message(Command("reject_withdraw"))
@@ -297,14 +286,10 @@ async def reject_withdraw(message: Message, db: Prisma, **kwargs: Any) -> None:
     await message.answer(f"{Emoji.CHECK} Withdraw rejected!")
     
     user = withdrawal.user
-    if user is not None and message.bot is not None:
-        try:
-            await message.bot.send_message(
-                user.telegramId,
-                f"<b>Withdraw Ditolak</b> {Emoji.CROSS}\n\n"
-                f"Withdraw Rp {withdrawal.amount:,.0f} ditolak.\n"
-                f"Hubungi admin untuk info lebih lanjut.",
-                parse_mode="HTML"
-            )
-        except Exception:
-            pass
+    if user is not None:
+        message_sender.send(
+            user.telegramId,
+            f"<b>Withdraw Ditolak</b> {Emoji.CROSS}\n\n"
+            f"Withdraw Rp {withdrawal.amount:,.0f} ditolak.\n"
+            f"Hubungi admin untuk info lebih lanjut."
+        )
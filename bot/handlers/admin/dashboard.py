@@ -1,31 +1,90 @@
-from typing import Any, cast
+from decimal import Decimal
+from typing import Any, Optional, cast
 from aiogram import Router, F
+from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from prisma import Prisma
 from prisma.enums import TransactionStatus, UserStatus
 
 from bot.formatters.messages import Emoji
-from bot.db.queries import update_balance
+from bot.db.queries import update_balance, settle_deposits, settle_withdrawals
+from bot.services.message_sender import message_sender
 from bot.utils.telegram_helpers import get_callback_data
 from bot.keyboards.admin import back_to_admin_keyboard
 from bot.handlers.admin.shared import is_admin, safe_edit_text
 
 router = Router()
 
+BULK_LABELS = {"topup": "Topup", "withdraw": "Withdraw"}
+
+
+def settled_message(kind: str, approve: bool, amount: Decimal) -> str:
+    """User notification for an approved or rejected topup / withdraw"""
+    if kind == "topup" and approve:
+        return (
+            f"<b>Topup Berhasil</b> {Emoji.CHECK}\n\n"
+            f"Rp {amount:,.0f} telah ditambahkan ke saldo Anda."
+        )
+    if kind == "topup":
+        return (
+            f"<b>Topup Ditolak</b> {Emoji.CROSS}\n\n"
+            f"Topup Rp {amount:,.0f} ditolak.\n"
+            f"Hubungi admin untuk info lebih lanjut."
+        )
+    if approve:
+        return (
+            f"<b>Withdraw Berhasil</b> {Emoji.CHECK}\n\n"
+            f"Rp {amount:,.0f} telah dikirim ke rekening Anda."
+        )
+    return (
+        f"<b>Withdraw Ditolak</b> {Emoji.CROSS}\n\n"
+        f"Withdraw Rp {amount:,.0f} ditolak.\n"
+        f"Hubungi admin untuk info lebih lanjut."
+    )
+
+
+async def _sync_selection(state: Optional[FSMContext], kind: str, visible: list[str]) -> set[str]:
+    """Remember what the pending list shows for the bulk buttons; selections that left the list are dropped"""
+    if state is None:
+        return set()
+    data = await state.get_data()
+    selected = [item_id for item_id in data.get(f"{kind}_selected", []) if item_id in visible]
+    await state.update_data({f"{kind}_visible": visible, f"{kind}_selected": selected})
+    return set(selected)
+
+
+def _selection_button(kind: str, item_id: str, selected: set[str]) -> InlineKeyboardButton:
+    mark = "☑" if item_id in selected else "☐"
+    return InlineKeyboardButton(text=mark, callback_data=f"admin:toggle:{kind}:{item_id}")
+
+
+def _bulk_rows(kind: str, visible: int, selected: int) -> list[list[InlineKeyboardButton]]:
+    rows = []
+    if selected:
+        rows.append([
+            InlineKeyboardButton(text=f"✅ Approve dipilih ({selected})", callback_data=f"admin:bulk:{kind}:approve:selected"),
+            InlineKeyboardButton(text=f"❌ Reject dipilih ({selected})", callback_data=f"admin:bulk:{kind}:reject:selected"),
+        ])
+    rows.append([
+        InlineKeyboardButton(text=f"✅ Approve semua ({visible})", callback_data=f"admin:bulk:{kind}:approve:all"),
+        InlineKeyboardButton(text=f"❌ Reject semua ({visible})", callback_data=f"admin:bulk:{kind}:reject:all"),
+    ])
+    return rows
+
 
 @router.callback_query(F.data == "admin:dashboard")
-async def admin_dashboard(callback: CallbackQuery, db: Prisma, **kwargs: Any) -> None:
+async def admin_dashboard(callback: CallbackQuery, db_read: Prisma, **kwargs: Any) -> None:
     if not is_admin(callback.from_user.id):
         await callback.answer("Unauthorized", show_alert=True)
         return
     
-    pending_deposits = await db.deposit.count(where={"status": TransactionStatus.PENDING})
-    pending_withdrawals = await db.withdrawal.count(where={"status": TransactionStatus.PENDING})
-    total_users = await db.user.count()
-    active_users = await db.user.count(where={"status": UserStatus.ACTIVE})
+    pending_deposits = await db_read.deposit.count(where={"status": TransactionStatus.PENDING})
+    pending_withdrawals = await db_read.withdrawal.count(where={"status": TransactionStatus.PENDING})
+    total_users = await db_read.user.count()
+    active_users = await db_read.user.count(where={"status": UserStatus.ACTIVE})
     
-    completed_deposits = await db.deposit.find_many(where={"status": TransactionStatus.COMPLETED})
-    completed_withdrawals = await db.withdrawal.find_many(where={"status": TransactionStatus.COMPLETED})
+    completed_deposits = await db_read.deposit.find_many(where={"status": TransactionStatus.COMPLETED})
+    completed_withdrawals = await db_read.withdrawal.find_many(where={"status": TransactionStatus.COMPLETED})
     
     dep_sum = sum(d.amount for d in completed_deposits)
     wit_sum = sum(w.amount for w in completed_withdrawals)
@@ -53,12 +112,17 @@ async def admin_dashboard(callback: CallbackQuery, db: Prisma, **kwargs: Any) ->
 
 
 @router.callback_query(F.data == "admin:pending_topup")
-async def pending_topup_callback(callback: CallbackQuery, db: Prisma, **kwargs: Any) -> None:
+async def pending_topup_callback(
+    callback: CallbackQuery,
+    db_read: Prisma,
+    state: Optional[FSMContext] = None,
+    **kwargs: Any
+) -> None:
     if not is_admin(callback.from_user.id):
         await callback.answer("Unauthorized", show_alert=True)
         return
     
-    deposits = await db.deposit.find_many(
+    deposits = await db_read.deposit.find_many(
         where={"status": TransactionStatus.PENDING},
         include={"user": True},
         order={"createdAt": "asc"},
@@ -77,6 +141,7 @@ async def pending_topup_callback(callback: CallbackQuery, db: Prisma, **kwargs:
         await callback.answer()
         return
     
+    selected = await _sync_selection(state, "topup", [d.id for d in deposits])
     buttons: list[list[InlineKeyboardButton]] = []
     text = "<b>Pending Top Up</b>\n\n"
     
@@ -93,10 +158,12 @@ async def pending_topup_callback(callback: CallbackQuery, db: Prisma, **kwargs:
             f"<b>Amount:</b> Rp {d.amount:,.0f}\n\n"
         )
         buttons.append([
+            _selection_button("topup", d.id, selected),
             InlineKeyboardButton(text=f"✅ {d.id[:8]}", callback_data=f"admin:approve_topup:{d.id}"),
             InlineKeyboardButton(text=f"❌ {d.id[:8]}", callback_data=f"admin:reject_topup:{d.id}"),
         ])
     
+    buttons.extend(_bulk_rows("topup", len(deposits), len(selected)))
     buttons.append([InlineKeyboardButton(text="← Back", callback_data="admin:menu")])
     
     await safe_edit_text(callback, text, reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
@@ -104,12 +171,17 @@ async def pending_topup_callback(callback: CallbackQuery, db: Prisma, **kwargs:
 
 
 @router.callback_query(F.data == "admin:pending_withdraw")
-async def pending_withdraw_callback(callback: CallbackQuery, db: Prisma, **kwargs: Any) -> None:
+async def pending_withdraw_callback(
+    callback: CallbackQuery,
+    db_read: Prisma,
+    state: Optional[FSMContext] = None,
+    **kwargs: Any
+) -> None:
     if not is_admin(callback.from_user.id):
         await callback.answer("Unauthorized", show_alert=True)
         return
     
-    withdrawals = await db.withdrawal.find_many(
+    withdrawals = await db_read.withdrawal.find_many(
         where={"status": TransactionStatus.PENDING},
         include={"user": True},
         order={"createdAt": "asc"},
@@ -128,6 +200,7 @@ async def pending_withdraw_callback(callback: CallbackQuery, db: Prisma, **kwarg
         await callback.answer()
         return
     
+    selected = await _sync_selection(state, "withdraw", [w.id for w in withdrawals])
     buttons: list[list[InlineKeyboardButton]] = []
     text = "<b>Pending Withdraw</b>\n\n"
     
@@ -147,10 +220,12 @@ async def pending_withdraw_callback(callback: CallbackQuery, db: Prisma, **kwarg
             f"<b>Nama:</b> {w.accountName}\n\n"
         )
         buttons.append([
+            _selection_button("withdraw", w.id, selected),
             InlineKeyboardButton(text=f"✅ {w.id[:8]}", callback_data=f"admin:approve_withdraw:{w.id}"),
             InlineKeyboardButton(text=f"❌ {w.id[:8]}", callback_data=f"admin:reject_withdraw:{w.id}"),
         ])
     
+    buttons.extend(_bulk_rows("withdraw", len(withdrawals), len(selected)))
     buttons.append([InlineKeyboardButton(text="← Back", callback_data="admin:menu")])
     
     await safe_edit_text(callback, text, reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
@@ -200,18 +275,10 @@ async def approve_topup_callback(callback: CallbackQuery, db: Prisma, **kwargs:
     
     await callback.answer(f"Topup Rp {deposit.amount:,.0f} approved!", show_alert=True)
     
-    if user is not None and callback.bot is not None:
-        try:
-            await callback.bot.send_message(
-                user.telegramId,
-                f"<b>Topup Berhasil</b> {Emoji.CHECK}\n\n"
-                f"Rp {deposit.amount:,.0f} telah ditambahkan ke saldo Anda.",
-                parse_mode="HTML"
-            )
-        except Exception:
-            pass
-    
-    await pending_topup_callback(callback, db)
+    if user is not None:
+        message_sender.send(user.telegramId, settled_message("topup", True, deposit.amount))
+    
+    await pending_topup_callback(callback, db, state=kwargs.get("state"))
 
 
 @router.callback_query(F.data.startswith("admin:reject_topup:"))
@@ -254,19 +321,10 @@ async def reject_topup_callback(callback: CallbackQuery, db: Prisma, **kwargs: A
     await callback.answer("Topup rejected!", show_alert=True)
     
     user = deposit.user
-    if user is not None and callback.bot is not None:
-        try:
-            await callback.bot.send_message(
-                user.telegramId,
-                f"<b>Topup Ditolak</b> {Emoji.CROSS}\n\n"
-                f"Topup Rp {deposit.amount:,.0f} ditolak.\n"
-                f"Hubungi admin untuk info lebih lanjut.",
-                parse_mode="HTML"
-            )
-        except Exception:
-            pass
-    
-    await pending_topup_callback(callback, db)
+    if user is not None:
+        message_sender.send(user.telegramId, settled_message("topup", False, deposit.amount))
+    
+    await pending_topup_callback(callback, db, state=kwargs.get("state"))
 
 
 @router.callback_query(F.data.startswith("admin:approve_withdraw:"))
@@ -309,18 +367,10 @@ async def approve_withdraw_callback(callback: CallbackQuery, db: Prisma, **kwarg
     await callback.answer(f"Withdraw Rp {withdrawal.amount:,.0f} approved!", show_alert=True)
     
     user = withdrawal.user
-    if user is not None and callback.bot is not None:
-        try:
-            await callback.bot.send_message(
-                user.telegramId,
-                f"<b>Withdraw Berhasil</b> {Emoji.CHECK}\n\n"
-                f"Rp {withdrawal.amount:,.0f} telah dikirim ke rekening Anda.",
-                parse_mode="HTML"
-            )
-        except Exception:
-            pass
-    
-    await pending_withdraw_callback(callback, db)
+    if user is not None:
+        message_sender.send(user.telegramId, settled_message("withdraw", True, withdrawal.amount))
+    
+    await pending_withdraw_callback(callback, db, state=kwargs.get("state"))
 
 
 @router.callback_query(F.data.startswith("admin:reject_withdraw:"))
@@ -363,16 +413,72 @@ async def reject_withdraw_callback(callback: CallbackQuery, db: Prisma, **kwargs
     await callback.answer("Withdraw rejected!", show_alert=True)
     
     user = withdrawal.user
-    if user is not None and callback.bot is not None:
-        try:
-            await callback.bot.send_message(
-                user.telegramId,
-                f"<b>Withdraw Ditolak</b> {Emoji.CROSS}\n\n"
-                f"Withdraw Rp {withdrawal.amount:,.0f} ditolak.\n"
-                f"Hubungi admin untuk info lebih lanjut.",
-                parse_mode="HTML"
-            )
-        except Exception:
-            pass
-    
-    await pending_withdraw_callback(callback, db)
+    if user is not None:
+        message_sender.send(user.telegramId, settled_message("withdraw", False, withdrawal.amount))
+    
+    await pending_withdraw_callback(callback, db, state=kwargs.get("state"))
+
+
+PENDING_VIEWS = {
+    "topup": pending_topup_callback,
+    "withdraw": pending_withdraw_callback,
+}
+
+
+@router.callback_query(F.data.startswith("admin:toggle:"))
+async def toggle_selection_callback(callback: CallbackQuery, db_read: Prisma, state: FSMContext, **kwargs: Any) -> None:
+    if not is_admin(callback.from_user.id):
+        await callback.answer("Unauthorized", show_alert=True)
+        return
+    
+    parts = get_callback_data(callback).split(":")
+    if len(parts) < 4 or parts[2] not in PENDING_VIEWS:
+        await callback.answer("Invalid data", show_alert=True)
+        return
+    
+    kind, item_id = parts[2], parts[3]
+    data = await state.get_data()
+    selected: list[str] = data.get(f"{kind}_selected", [])
+    if item_id in selected:
+        selected.remove(item_id)
+    else:
+        selected.append(item_id)
+    await state.update_data({f"{kind}_selected": selected})
+    
+    await PENDING_VIEWS[kind](callback, db_read, state=state)
+
+
+@router.callback_query(F.data.startswith("admin:bulk:"))
+async def bulk_settle_callback(callback: CallbackQuery, db: Prisma, state: FSMContext, **kwargs: Any) -> None:
+    """Approve or reject the selected (or all listed) items in one DB transaction"""
+    if not is_admin(callback.from_user.id):
+        await callback.answer("Unauthorized", show_alert=True)
+        return
+    
+    parts = get_callback_data(callback).split(":")
+    if len(parts) < 5 or parts[2] not in PENDING_VIEWS:
+        await callback.answer("Invalid data", show_alert=True)
+        return
+    
+    kind, approve, scope = parts[2], parts[3] == "approve", parts[4]
+    data = await state.get_data()
+    ids: list[str] = data.get(f"{kind}_selected" if scope == "selected" else f"{kind}_visible", [])
+    if not ids:
+        await callback.answer("Tidak ada item dipilih.", show_alert=True)
+        return
+    
+    settle = settle_deposits if kind == "topup" else settle_withdrawals
+    settled = await settle(db, ids, approve)
+    await state.update_data({f"{kind}_selected": []})
+    
+    for row in settled:
+        message_sender.send(row["telegramId"], settled_message(kind, approve, row["amount"]))
+    
+    total = sum((row["amount"] for row in settled), Decimal("0"))
+    summary = f"{len(settled)} {BULK_LABELS[kind]} {'approved' if approve else 'rejected'} (Rp {total:,.0f})"
+    skipped = len(ids) - len(settled)
+    if skipped:
+        summary += f"\n{skipped} sudah diproses sebelumnya."
+    await callback.answer(summary, show_alert=True)
+    
+    await PENDING_VIEWS[kind](callback, db, state=state)
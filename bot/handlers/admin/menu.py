@@ -12,14 +12,14 @@ router = Router()
 
 
 @router.message(Command("admin"))
-async def admin_menu(message: Message, db: Prisma, **kwargs: Any) -> None:
+async def admin_menu(message: Message, db_read: Prisma, **kwargs: Any) -> None:
     from_user = message.from_user
     if from_user is None or not is_admin(from_user.id):
         return
     
-    pending_topup = await db.deposit.count(where={"status": TransactionStatus.PENDING})
-    pending_withdraw = await db.withdrawal.count(where={"status": TransactionStatus.PENDING})
-    total_users = await db.user.count()
+    pending_topup = await db_read.deposit.count(where={"status": TransactionStatus.PENDING})
+    pending_withdraw = await db_read.withdrawal.count(where={"status": TransactionStatus.PENDING})
+    total_users = await db_read.user.count()
     
     await message.answer(
         f"🔐 <b>ADMIN PANEL</b>\n"
@@ -35,14 +35,14 @@ async def admin_menu(message: Message, db: Prisma, **kwargs: Any) -> None:
 
 
 @router.callback_query(F.data == "admin:menu")
-async def admin_menu_callback(callback: CallbackQuery, db: Prisma, **kwargs: Any) -> None:
+async def admin_menu_callback(callback: CallbackQuery, db_read: Prisma, **kwargs: Any) -> None:
     if not is_admin(callback.from_user.id):
         await callback.answer("Unauthorized", show_alert=True)
         return
     
-    pending_topup = await db.deposit.count(where={"status": TransactionStatus.PENDING})
-    pending_withdraw = await db.withdrawal.count(where={"status": TransactionStatus.PENDING})
-    total_users = await db.user.count()
+    pending_topup = await db_read.deposit.count(where={"status": TransactionStatus.PENDING})
+    pending_withdraw = await db_read.withdrawal.count(where={"status": TransactionStatus.PENDING})
+    total_users = await db_read.user.count()
     
     await safe_edit_text(
         callback,
@@ -1,3 +1,4 @@
+import html
 from decimal import Decimal, InvalidOperation
 from typing import Any
 from aiogram import Router, F
@@ -9,6 +10,7 @@ from bot.formatters.messages import Emoji
 from bot.utils.telegram_helpers import get_callback_data
 from bot.keyboards.admin import referral_settings_keyboard, referral_create_keyboard, cancel_keyboard
 from bot.handlers.admin.shared import AdminStates, is_admin, safe_edit_text
+from bot.db.queries import get_top_referrers
 
 router = Router()
 
@@ -28,6 +30,14 @@ async def admin_referral(callback: CallbackQuery, db: Prisma, **kwargs: Any) ->
             f"Bonus Referee: <b>Rp {setting.refereeBonus:,.0f}</b>\n"
             f"Status: <b>{'Active' if setting.isActive else 'Inactive'}</b>\n"
         )
+        
+        top = await get_top_referrers(db, limit=5)
+        if top:
+            text += "\n<b>Top Referrer</b>\n"
+            for i, row in enumerate(top, 1):
+                name = html.escape(str(row["username"] or row["firstName"] or row["telegramId"]))
+                text += f"{i}. {name} - <b>{row['total']}</b>\n"
+        
         await safe_edit_text(callback, text, reply_markup=referral_settings_keyboard(setting.id))
     else:
         text = (
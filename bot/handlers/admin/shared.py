@@ -3,6 +3,8 @@ from aiogram.types import CallbackQuery, InlineKeyboardMarkup
 from aiogram.fsm.state import State, StatesGroup
 
 from bot.config import config
+from bot.services.cache import cache_service
+from bot.keyboards.inline import invalidate_coin_keyboards
 
 
 class AdminStates(StatesGroup):
@@ -26,6 +28,13 @@ def is_admin(user_id: Optional[int]) -> bool:
     return user_id in config.bot.admin_ids
 
 
+def invalidate_coin_caches() -> None:
+    """Call after any coin setting change so menus and keyboards reflect it immediately"""
+    cache_service.invalidate_coin_settings()
+    cache_service.invalidate_generic("active_")
+    invalidate_coin_keyboards()
+
+
 async def safe_edit_text(
     callback: CallbackQuery,
     text: str,
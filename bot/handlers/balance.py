@@ -3,7 +3,7 @@ from typing import Optional, Any
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from prisma import Prisma
-from prisma.models import User
+from bot.types import UserSnapshot
 
 from bot.formatters.messages import format_balance
 from bot.keyboards.inline import CallbackData, get_balance_keyboard
@@ -16,7 +16,7 @@ router = Router()
 async def show_balance(
     callback: CallbackQuery,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     if not user:
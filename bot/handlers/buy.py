@@ -1,13 +1,13 @@
 from decimal import Decimal
 from datetime import datetime, timedelta
-from typing import Optional, Any
+from typing import Optional, Any, Awaitable, Callable
 import asyncio
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from prisma import Prisma
-from prisma.models import User
+from bot.types import UserSnapshot
 from prisma.enums import OrderType, OrderStatus
 
 from bot.formatters.messages import (
@@ -15,7 +15,8 @@ from bot.formatters.messages import (
     format_coin_networks,
     format_buy_amount,
     format_buy_confirm,
-    format_transaction_success,
+    format_transaction_pending,
+    format_currency,
     format_error,
     format_insufficient_balance,
 )
@@ -29,10 +30,14 @@ from bot.keyboards.inline import (
 )
 from bot.utils.helpers import parse_amount, idr_to_crypto
 from bot.utils.telegram_helpers import safe_edit_text, get_callback_data
-from bot.services.oxapay import OxaPayService
+from bot.formatters.render_cache import render_cache
+from bot.services.oxapay import OxaPayService, get_prices_version
 from bot.db.optimized_queries import get_coin_settings_fast, get_active_networks_for_coin, get_active_coins
 from bot.services.api_service import ParallelAPIService
-from bot.tasks.background_tasks import schedule_background_task, process_payout_async
+from bot.services.liquidity import liquidity_ledger
+from bot.services.payout_dispatcher import payout_dispatcher, PayoutJob
+from bot.services.pin import pin_service
+from bot.handlers.pin_gate import PIN_PROMPT, read_pin
 from bot.db.queries import (
     create_crypto_order,
     update_balance,
@@ -42,6 +47,7 @@ from bot.config import config
 router = Router()
 
 USD_TO_IDR = Decimal(str(config.bot.usd_to_idr))
+MIN_BUY_IDR = Decimal("10000")
 
 
 class BuyStates(StatesGroup):
@@ -50,6 +56,7 @@ class BuyStates(StatesGroup):
     entering_amount = State()
     entering_wallet = State()
     confirming = State()
+    entering_pin = State()
 
 
 @router.callback_query(F.data == CallbackData.MENU_BUY)
@@ -57,7 +64,7 @@ async def show_buy_menu(
     callback: CallbackQuery,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     if not user or user.status != "ACTIVE":
@@ -66,7 +73,8 @@ async def show_buy_menu(
     
     await state.set_state(BuyStates.selecting_coin)
     
-    coins = await get_active_coins(db)
+    # Coins custody cannot pay out are hidden rather than failing at payout time
+    coins = liquidity_ledger.filter_coins(await get_active_coins(db), MIN_BUY_IDR)
     
     if not coins:
         await callback.answer("Tidak ada coin tersedia.", show_alert=True)
@@ -90,6 +98,12 @@ async def select_buy_coin(
     data = get_callback_data(callback)
     coin = data.split(":")[-1]
     
+    capacity = liquidity_ledger.capacity_idr(coin)
+    if capacity is not None and capacity < MIN_BUY_IDR:
+        # Keyboard may predate the latest reservations
+        await callback.answer(f"Stock {coin} sedang habis.", show_alert=True)
+        return
+    
     db_networks = await get_active_networks_for_coin(db, coin)
     
     if not db_networks:
@@ -111,8 +125,8 @@ async def select_buy_coin(
     
     rate_idr = rate_usd * USD_TO_IDR if rate_usd else None
     
-    active_network_names = {n["network"] for n in db_networks}
-    networks = [n for n in oxapay_networks if n["network"] in active_network_names]
+    active_network_names = {n.network for n in db_networks}
+    networks = [n for n in oxapay_networks if n.network in active_network_names]
     
     if not networks:
         await callback.answer("Network tidak tersedia.", show_alert=True)
@@ -167,8 +181,8 @@ async def select_buy_network(
     
     rate_idr = rate_usd * USD_TO_IDR
     
-    network_info = next((n for n in networks if n["network"] == network), None)
-    network_fee = network_info["withdraw_fee"] if network_info else Decimal("0")
+    network_info = next((n for n in networks if n.network == network), None)
+    network_fee = network_info.withdraw_fee if network_info else Decimal("0")
     
     await state.update_data(
         coin=coin,
@@ -181,7 +195,12 @@ async def select_buy_network(
     
     await safe_edit_text(
         callback,
-        format_buy_amount(coin, network, rate_idr, margin),
+        render_cache.get_or_render(
+            "buy_amount",
+            get_prices_version(),
+            (coin, network, rate_idr, margin),
+            lambda: format_buy_amount(coin, network, rate_idr, margin),
+        ),
         reply_markup=get_cancel_keyboard("buy:back")
     )
     await callback.answer()
@@ -192,12 +211,12 @@ async def process_buy_amount(
     message: Message,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     amount_idr = parse_amount(message.text or "")
     
-    if not amount_idr or amount_idr < Decimal("10000"):
+    if not amount_idr or amount_idr < MIN_BUY_IDR:
         await message.answer(
             format_error("Jumlah minimal pembelian adalah Rp 10.000"),
             reply_markup=get_cancel_keyboard("buy:back"),
@@ -236,6 +255,15 @@ async def process_buy_amount(
         )
         return
     
+    coin = state_data["coin"]
+    if not liquidity_ledger.has_capacity(coin, calc["crypto_amount"] + network_fee):
+        await message.answer(
+            format_error(_capacity_error(coin)),
+            reply_markup=get_cancel_keyboard("buy:back"),
+            parse_mode="HTML"
+        )
+        return
+    
     await state.update_data(
         amount_idr=float(amount_idr),
         crypto_amount=float(calc["crypto_amount"]),
@@ -292,78 +320,123 @@ async def confirm_buy(
     callback: CallbackQuery,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
-    state_data = await state.get_data()
-    
     if not user:
         await callback.answer("User tidak ditemukan.", show_alert=True)
         return
     
+    if pin_service.needs_pin(user):
+        await state.set_state(BuyStates.entering_pin)
+        await safe_edit_text(callback, PIN_PROMPT, reply_markup=get_cancel_keyboard())
+        await callback.answer()
+        return
+    
+    async def reply(text: str, markup: Optional[InlineKeyboardMarkup]) -> None:
+        await safe_edit_text(callback, text, reply_markup=markup)
+    
+    await _place_buy_order(state, db, user, reply)
+    await callback.answer()
+
+
+@router.message(BuyStates.entering_pin)
+async def process_buy_pin(
+    message: Message,
+    state: FSMContext,
+    db: Prisma,
+    user: Optional[UserSnapshot] = None,
+    **kwargs: Any
+) -> None:
+    if not user:
+        await state.clear()
+        return
+    
+    if not await read_pin(message, state, db, user):
+        return
+    
+    async def reply(text: str, markup: Optional[InlineKeyboardMarkup]) -> None:
+        await message.answer(text, reply_markup=markup, parse_mode="HTML")
+    
+    await _place_buy_order(state, db, user, reply)
+
+
+async def _place_buy_order(
+    state: FSMContext,
+    db: Prisma,
+    user: UserSnapshot,
+    reply: Callable[[str, Optional[InlineKeyboardMarkup]], Awaitable[None]],
+) -> None:
+    state_data = await state.get_data()
+    
     balance = user.balance.amount if user.balance else Decimal("0")
     total_idr = Decimal(str(state_data["total_idr"]))
     
     if total_idr > balance:
-        await safe_edit_text(
-            callback,
-            format_insufficient_balance(total_idr, balance),
-            reply_markup=get_back_keyboard()
-        )
-        await callback.answer()
+        await reply(format_insufficient_balance(total_idr, balance), get_back_keyboard())
         return
     
-    order, _ = await asyncio.gather(
-        create_crypto_order(
-            db=db,
-            user_id=user.id,
-            order_type=OrderType.BUY,
-            coin_symbol=state_data["coin"],
-            network=state_data["network"],
-            crypto_amount=Decimal(str(state_data["crypto_amount"])),
-            fiat_amount=Decimal(str(state_data["amount_idr"])),
-            rate=Decimal(str(state_data["rate_idr"])),
-            margin=Decimal(str(state_data["margin"])),
-            network_fee=Decimal(str(state_data["network_fee"])),
-            wallet_address=state_data["wallet_address"],
-            expires_at=datetime.utcnow() + timedelta(hours=24),
-        ),
-        update_balance(db, user.id, -total_idr)
-    )
+    # Hold the coin before debiting so concurrent orders cannot oversell custody
+    coin = state_data["coin"]
+    crypto_amount = Decimal(str(state_data["crypto_amount"]))
+    reservation = liquidity_ledger.reserve(coin, crypto_amount + Decimal(str(state_data["network_fee"])))
+    if reservation is None:
+        await reply(format_error(_capacity_error(coin)), get_back_keyboard())
+        return
     
-    async def update_order_status() -> None:
-        await db.cryptoorder.update(
-            where={"id": order.id},
-            data={"status": OrderStatus.PROCESSING}
+    try:
+        order, _ = await asyncio.gather(
+            create_crypto_order(
+                db=db,
+                user_id=user.id,
+                order_type=OrderType.BUY,
+                coin_symbol=state_data["coin"],
+                network=state_data["network"],
+                crypto_amount=Decimal(str(state_data["crypto_amount"])),
+                fiat_amount=Decimal(str(state_data["amount_idr"])),
+                rate=Decimal(str(state_data["rate_idr"])),
+                margin=Decimal(str(state_data["margin"])),
+                network_fee=Decimal(str(state_data["network_fee"])),
+                wallet_address=state_data["wallet_address"],
+                expires_at=datetime.utcnow() + timedelta(hours=24),
+                status=OrderStatus.PROCESSING,
+            ),
+            update_balance(db, user.id, -total_idr)
         )
+    except Exception:
+        liquidity_ledger.release(reservation)
+        raise
     
     await state.clear()
     
-    await safe_edit_text(
-        callback,
-        format_transaction_success("Beli Crypto", total_idr) + 
-        f"\n\nAnda menerima: <b>{state_data['crypto_amount']:.8f} {state_data['coin']}</b>\n"
-        f"Ke: <code>{state_data['wallet_address'][:20]}...</code>\n\n"
-        f"<i>Memproses payout... Tunggu sebentar.</i>",
-        reply_markup=get_back_keyboard()
+    await reply(
+        format_transaction_pending() +
+        f"\n\nAnda akan menerima: <b>{state_data['crypto_amount']:.8f} {state_data['coin']}</b>\n"
+        f"Ke: <code>{state_data['wallet_address'][:20]}...</code>\n"
+        f"Total: <b>{format_currency(total_idr)}</b>",
+        get_back_keyboard()
     )
-    await callback.answer()
     
-    await schedule_background_task(asyncio.gather(
-        update_order_status(),
-        process_payout_async(
-            db=db,
-            order_id=order.id,
-            user_id=user.id,
-            wallet_address=state_data["wallet_address"],
-            amount=Decimal(str(state_data["crypto_amount"])),
-            coin=state_data["coin"],
-            network=state_data["network"],
-            total_idr=total_idr,
-        )
+    payout_dispatcher.submit(PayoutJob(
+        order_id=order.id,
+        user_id=user.id,
+        wallet_address=state_data["wallet_address"],
+        amount=crypto_amount,
+        coin=coin,
+        network=state_data["network"],
+        total_idr=total_idr,
+        reservation=reservation,
+        chat_id=user.telegramId,
     ))
 
 
+def _capacity_error(coin: str) -> str:
+    capacity = liquidity_ledger.capacity_idr(coin) or Decimal("0")
+    if capacity < MIN_BUY_IDR:
+        return f"Stock {coin} sedang habis. Silakan coba lagi nanti."
+    return f"Stock {coin} tidak mencukupi. Maksimal pembelian saat ini sekitar Rp {capacity:,.0f}."
+
+
 @router.callback_query(F.data == "buy:cancel:process")
 async def cancel_buy(
     callback: CallbackQuery,
@@ -389,7 +462,8 @@ async def back_to_buy_coins(
 ) -> None:
     await state.set_state(BuyStates.selecting_coin)
     
-    coins = await get_active_coins(db)
+    # Coins custody cannot pay out are hidden rather than failing at payout time
+    coins = liquidity_ledger.filter_coins(await get_active_coins(db), MIN_BUY_IDR)
     
     if not coins:
         await callback.answer("Tidak ada coin tersedia.", show_alert=True)
@@ -6,13 +6,14 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from prisma import Prisma
-from prisma.models import User
+from bot.types import UserSnapshot
 from prisma.enums import TransactionStatus, UserStatus
 
 from bot.formatters.messages import Emoji
 from bot.keyboards.inline import CallbackData, get_back_keyboard, get_cancel_keyboard
 from bot.utils.telegram_helpers import safe_edit_text, get_callback_data
 from bot.services.cryptobot import CryptoBotService
+from bot.services.message_sender import message_sender
 from bot.db.queries import create_deposit
 from bot.config import config
 
@@ -117,7 +118,7 @@ async def process_crypto_amount(
     message: Message,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     try:
@@ -218,24 +219,17 @@ async def process_crypto_amount(
         )
         
         user_name = user.firstName or user.username or "User"
-        for admin_id in config.bot.admin_ids:
-            if message.bot is not None:
-                try:
-                    await message.bot.send_message(
-                        admin_id,
-                        f"<b>Request Deposit Crypto Baru</b>\n\n"
-                        f"{Emoji.DOT} User: {user_name} (ID: {user.telegramId})\n"
-                        f"{Emoji.DOT} Deposit: {amount} {coin}\n"
-                        f"{Emoji.DOT} Gross: Rp {gross_idr:,.0f}\n"
-                        f"{Emoji.DOT} Fee 5%: Rp {fee_idr:,.0f}\n"
-                        f"{Emoji.DOT} Net: Rp {net_idr:,.0f}\n"
-                        f"{Emoji.DOT} Invoice: {result.invoice_id}\n\n"
-                        f"ID: <code>{deposit.id}</code>",
-                        parse_mode="HTML"
-                    )
-                except Exception:
-                    pass
-        
+        message_sender.notify_admins(
+            f"<b>Request Deposit Crypto Baru</b>\n\n"
+            f"{Emoji.DOT} User: {user_name} (ID: {user.telegramId})\n"
+            f"{Emoji.DOT} Deposit: {amount} {coin}\n"
+            f"{Emoji.DOT} Gross: Rp {gross_idr:,.0f}\n"
+            f"{Emoji.DOT} Fee 5%: Rp {fee_idr:,.0f}\n"
+            f"{Emoji.DOT} Net: Rp {net_idr:,.0f}\n"
+            f"{Emoji.DOT} Invoice: {result.invoice_id}\n\n"
+            f"ID: <code>{deposit.id}</code>"
+        )
+    
     finally:
         await cryptobot.close()
 
@@ -324,7 +318,7 @@ async def cancel_crypto_deposit(
     callback: CallbackQuery,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     from bot.formatters.messages import format_main_menu
@@ -3,13 +3,14 @@ from typing import Optional, Any
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from prisma import Prisma
-from prisma.models import User
+from bot.types import UserSnapshot
 
 from bot.formatters.messages import format_referral_info, format_rates, format_profile, Emoji
 from bot.keyboards.inline import CallbackData, get_back_keyboard, get_referral_keyboard
 from bot.utils.telegram_helpers import safe_edit_text
-from bot.db.queries import get_referral_count, get_referral_bonus_earned, get_user_by_telegram_id
-from bot.services.oxapay import OxaPayService
+from bot.db.queries import get_user_by_telegram_id
+from bot.formatters.render_cache import render_cache
+from bot.services.oxapay import OxaPayService, get_prices_version
 from bot.config import config
 
 router = Router()
@@ -36,7 +37,12 @@ async def show_rates(callback: CallbackQuery, **kwargs: Any) -> None:
     
     await safe_edit_text(
         callback,
-        format_rates(prices, USD_TO_IDR),
+        render_cache.get_or_render(
+            "rates",
+            get_prices_version(),
+            USD_TO_IDR,
+            lambda: format_rates(prices, USD_TO_IDR),
+        ),
         reply_markup=get_back_keyboard()
     )
     await callback.answer()
@@ -46,19 +52,16 @@ async def show_rates(callback: CallbackQuery, **kwargs: Any) -> None:
 async def show_referral(
     callback: CallbackQuery,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     if not user:
         await callback.answer("Silakan daftar terlebih dahulu.", show_alert=True)
         return
     
-    referral_count = await get_referral_count(db, user.id)
-    bonus_earned = await get_referral_bonus_earned(db, user.id)
-    
     await safe_edit_text(
         callback,
-        format_referral_info(user.referralCode, referral_count, bonus_earned),
+        format_referral_info(user.referralCode, user.referralCount, user.referralBonusTotal),
         reply_markup=get_referral_keyboard(user.referralCode)
     )
     await callback.answer()
@@ -104,7 +107,7 @@ async def show_help(callback: CallbackQuery, **kwargs: Any) -> None:
 async def show_profile(
     callback: CallbackQuery,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     if not user:
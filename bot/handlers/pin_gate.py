@@ -0,0 +1,63 @@
+"""
+PIN prompt shared by the transaction confirmations
+Buy, withdraw and sell ask for the transaction PIN before committing when
+the user has one set and no verified session
+"""
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+from prisma import Prisma
+
+from bot.formatters.messages import Emoji
+from bot.keyboards.inline import get_cancel_keyboard, get_back_keyboard
+from bot.services.pin import pin_service, PinCheck
+from bot.types import UserSnapshot
+
+PIN_PROMPT = f"""{Emoji.LOCK} <b>Masukkan PIN Transaksi</b>
+
+Ketik 6 digit PIN Anda untuk melanjutkan transaksi."""
+
+
+def format_pin_error(check: PinCheck) -> str:
+    if check.locked:
+        minutes = max(1, round(check.locked_for / 60))
+        return (
+            f"{Emoji.CROSS} Terlalu banyak percobaan PIN yang salah.\n\n"
+            f"Silakan coba lagi dalam {minutes} menit."
+        )
+    return (
+        f"{Emoji.CROSS} PIN tidak sesuai.\n\n"
+        f"Sisa percobaan: {check.attempts_left}. Silakan masukkan PIN yang benar."
+    )
+
+
+async def read_pin(message: Message, state: FSMContext, db: Prisma, user: UserSnapshot) -> bool:
+    """
+    Delete the PIN message and verify it. Errors are answered here; a
+    lockout also ends the transaction
+    """
+    try:
+        await message.delete()
+    except Exception:
+        pass
+    
+    pin = (message.text or "").strip()
+    if not pin.isdigit() or len(pin) != 6:
+        await message.answer(
+            f"{Emoji.CROSS} PIN harus berupa 6 digit angka.\n\nSilakan masukkan PIN yang benar.",
+            reply_markup=get_cancel_keyboard(),
+            parse_mode="HTML"
+        )
+        return False
+    
+    check = await pin_service.verify_pin(db, user.id, pin, pin_service.current_hash(user))
+    if check.ok:
+        return True
+    
+    if check.locked:
+        await state.clear()
+    await message.answer(
+        format_pin_error(check),
+        reply_markup=get_back_keyboard() if check.locked else get_cancel_keyboard(),
+        parse_mode="HTML"
+    )
+    return False
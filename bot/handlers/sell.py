@@ -6,7 +6,7 @@ from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from prisma import Prisma
-from prisma.models import User
+from bot.types import UserSnapshot
 from prisma.enums import OrderType, OrderStatus
 
 from bot.formatters.messages import (
@@ -28,6 +28,8 @@ from bot.services.oxapay import OxaPayService
 from bot.db.optimized_queries import get_coin_settings_fast, get_active_networks_for_coin, get_active_coins
 from bot.services.api_service import ParallelAPIService
 from bot.db.queries import create_crypto_order
+from bot.services.pin import pin_service
+from bot.handlers.pin_gate import PIN_PROMPT, read_pin
 from bot.config import config
 
 router = Router()
@@ -40,6 +42,7 @@ class SellStates(StatesGroup):
     selecting_network = State()
     entering_amount = State()
     awaiting_deposit = State()
+    entering_pin = State()
 
 
 @router.callback_query(F.data == CallbackData.MENU_SELL)
@@ -47,7 +50,7 @@ async def show_sell_menu(
     callback: CallbackQuery,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     if not user or user.status != "ACTIVE":
@@ -101,8 +104,8 @@ async def select_sell_coin(
     
     rate_idr = rate_usd * USD_TO_IDR if rate_usd else None
     
-    active_network_names = {n["network"] for n in db_networks}
-    networks = [n for n in oxapay_networks if n["network"] in active_network_names]
+    active_network_names = {n.network for n in db_networks}
+    networks = [n for n in oxapay_networks if n.network in active_network_names]
     
     if not networks:
         await callback.answer("Network tidak tersedia.", show_alert=True)
@@ -181,7 +184,7 @@ async def process_sell_amount(
     message: Message,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     crypto_amount = parse_crypto_amount(message.text or "")
@@ -213,6 +216,48 @@ async def process_sell_amount(
         await message.answer(format_error("User tidak ditemukan."), parse_mode="HTML")
         return
     
+    if pin_service.needs_pin(user):
+        await state.update_data(crypto_amount=str(crypto_amount))
+        await state.set_state(SellStates.entering_pin)
+        await message.answer(PIN_PROMPT, reply_markup=get_cancel_keyboard(), parse_mode="HTML")
+        return
+    
+    await _create_sell_order(message, state, db, user, crypto_amount)
+
+
+@router.message(SellStates.entering_pin)
+async def process_sell_pin(
+    message: Message,
+    state: FSMContext,
+    db: Prisma,
+    user: Optional[UserSnapshot] = None,
+    **kwargs: Any
+) -> None:
+    if not user:
+        await state.clear()
+        return
+    
+    if not await read_pin(message, state, db, user):
+        return
+    
+    state_data = await state.get_data()
+    await _create_sell_order(message, state, db, user, Decimal(state_data["crypto_amount"]))
+
+
+async def _create_sell_order(
+    message: Message,
+    state: FSMContext,
+    db: Prisma,
+    user: UserSnapshot,
+    crypto_amount: Decimal,
+) -> None:
+    state_data = await state.get_data()
+    rate_idr = Decimal(str(state_data["rate_idr"]))
+    margin = Decimal(str(state_data["margin"]))
+    
+    calc = calculate_sell_price(crypto_amount, rate_idr, margin)
+    fiat_amount = calc["total"]
+    
     oxapay = OxaPayService(
         merchant_api_key=config.oxapay.merchant_api_key,
         payout_api_key=config.oxapay.payout_api_key,
@@ -269,7 +314,7 @@ async def process_sell_amount(
             reply_markup=get_back_keyboard(),
             parse_mode="HTML"
         )
-        
+    
     except Exception as e:
         await message.answer(
             format_error(f"Terjadi kesalahan: {str(e)}"),
@@ -1,15 +1,16 @@
-import hashlib
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from prisma import Prisma
-from prisma.models import User
+from bot.types import UserSnapshot
 from typing import Optional, Any
 
 from bot.formatters.messages import Emoji
 from bot.keyboards.inline import CallbackData, get_settings_keyboard, get_cancel_keyboard
+from bot.services.pin import pin_service
+from bot.handlers.pin_gate import format_pin_error
 from bot.utils.telegram_helpers import safe_edit_text
 
 router = Router()
@@ -22,16 +23,6 @@ class PinStates(StatesGroup):
     confirming_delete_pin = State()
 
 
-def hash_pin(pin: str) -> str:
-    return hashlib.sha256(pin.encode()).hexdigest()
-
-
-def verify_pin(pin: str, pin_hash: Optional[str]) -> bool:
-    if pin_hash is None:
-        return False
-    return hash_pin(pin) == pin_hash
-
-
 def get_settings_back_keyboard():
     builder = InlineKeyboardBuilder()
     builder.row(
@@ -47,7 +38,7 @@ def get_settings_back_keyboard():
 async def show_settings(
     callback: CallbackQuery,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     if not user:
@@ -67,7 +58,7 @@ async def show_settings(
 
 PIN digunakan untuk mengamankan transaksi Anda.
 Pastikan PIN tidak diketahui orang lain."""
-    
+
     await safe_edit_text(
         callback,
         settings_text,
@@ -143,7 +134,7 @@ async def process_current_pin(
     message: Message,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     try:
@@ -164,9 +155,13 @@ async def process_current_pin(
         )
         return
     
-    if not verify_pin(pin, user.pinHash):
+    check = await pin_service.verify_pin(db, user.id, pin, pin_service.current_hash(user))
+    if not check.ok:
+        if check.locked:
+            await state.clear()
         await message.answer(
-            f"{Emoji.CROSS} PIN tidak sesuai.\n\nSilakan masukkan PIN yang benar.",
+            format_pin_error(check),
+            reply_markup=get_settings_back_keyboard() if check.locked else None,
             parse_mode="HTML"
         )
         return
@@ -179,6 +174,7 @@ async def process_current_pin(
             where={"id": user.id},
             data={"pinHash": None}
         )
+        pin_service.pin_changed(user.id, None)
         
         await state.clear()
         
@@ -237,7 +233,7 @@ async def process_confirm_pin(
     message: Message,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     try:
@@ -260,11 +256,12 @@ async def process_confirm_pin(
         )
         return
     
-    pin_hash = hash_pin(new_pin)
+    pin_hash = await pin_service.hash_pin(new_pin)
     await db.user.update(
         where={"id": user.id},
         data={"pinHash": pin_hash}
     )
+    pin_service.pin_changed(user.id, pin_hash)
     
     await state.clear()
     
@@ -27,7 +27,6 @@ from bot.utils.helpers import (
     validate_email,
     validate_phone,
     normalize_phone,
-    generate_referral_code,
 )
 from bot.db.queries import (
     get_user_by_telegram_id,
@@ -36,7 +35,6 @@ from bot.db.queries import (
     get_user_by_whatsapp,
     create_user,
     get_referral_setting,
-    process_referral_bonus,
 )
 
 router = Router()
@@ -225,14 +223,13 @@ async def complete_signup(message: Message, state: FSMContext, db: Prisma):
         return
     data = await state.get_data()
     
-    referral_code = generate_referral_code()
-    while await get_user_by_referral_code(db, referral_code):
-        referral_code = generate_referral_code()
+    referral_setting = None
+    if data.get("referred_by_id"):
+        referral_setting = await get_referral_setting(db)
     
     user = await create_user(
         db=db,
         telegram_id=message.from_user.id,
-        referral_code=referral_code,
         username=message.from_user.username,
         first_name=message.from_user.first_name,
         last_name=message.from_user.last_name,
@@ -241,23 +238,13 @@ async def complete_signup(message: Message, state: FSMContext, db: Prisma):
         latitude=data.get("latitude"),
         longitude=data.get("longitude"),
         referred_by_id=data.get("referred_by_id"),
+        referral_setting=referral_setting,
     )
     
-    if data.get("referred_by_id"):
-        referral_setting = await get_referral_setting(db)
-        if referral_setting:
-            await process_referral_bonus(
-                db=db,
-                referrer_id=data["referred_by_id"],
-                referee_id=user.id,
-                referrer_bonus=referral_setting.referrerBonus,
-                referee_bonus=referral_setting.refereeBonus,
-            )
-    
     await state.clear()
     
     await message.answer(
-        format_signup_success(referral_code),
+        format_signup_success(user.referralCode),
         parse_mode="HTML"
     )
     
@@ -274,14 +261,13 @@ async def complete_signup(message: Message, state: FSMContext, db: Prisma):
 async def complete_signup_callback(callback: CallbackQuery, state: FSMContext, db: Prisma):
     data = await state.get_data()
     
-    referral_code = generate_referral_code()
-    while await get_user_by_referral_code(db, referral_code):
-        referral_code = generate_referral_code()
+    referral_setting = None
+    if data.get("referred_by_id"):
+        referral_setting = await get_referral_setting(db)
     
     user = await create_user(
         db=db,
         telegram_id=callback.from_user.id,
-        referral_code=referral_code,
         username=callback.from_user.username,
         first_name=callback.from_user.first_name,
         last_name=callback.from_user.last_name,
@@ -290,25 +276,15 @@ async def complete_signup_callback(callback: CallbackQuery, state: FSMContext, d
         latitude=data.get("latitude"),
         longitude=data.get("longitude"),
         referred_by_id=data.get("referred_by_id"),
+        referral_setting=referral_setting,
     )
     
-    if data.get("referred_by_id"):
-        referral_setting = await get_referral_setting(db)
-        if referral_setting:
-            await process_referral_bonus(
-                db=db,
-                referrer_id=data["referred_by_id"],
-                referee_id=user.id,
-                referrer_bonus=referral_setting.referrerBonus,
-                referee_bonus=referral_setting.refereeBonus,
-            )
-    
     await state.clear()
     
     msg = callback.message
     if isinstance(msg, AiogramMessage):
         await msg.edit_text(
-            format_signup_success(referral_code),
+            format_signup_success(user.referralCode),
             parse_mode="HTML"
         )
     
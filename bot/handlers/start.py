@@ -3,7 +3,7 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
 from prisma import Prisma
-from prisma.models import User
+from bot.types import UserSnapshot
 from typing import Optional, Any
 
 from bot.formatters.messages import format_welcome, format_terms, format_main_menu
@@ -24,7 +24,7 @@ async def cmd_start(
     message: Message,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     await state.clear()
@@ -94,7 +94,7 @@ async def back_to_menu(
     callback: CallbackQuery,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     await state.clear()
@@ -134,7 +134,7 @@ async def cancel_and_show_menu(
     callback: CallbackQuery,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     await state.clear()
@@ -1,15 +1,18 @@
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
+from datetime import datetime
 from decimal import Decimal
+from typing import Optional
 
-from bot.services.oxapay import OxaPayService
+from bot.services.custody import custody_snapshot, CustodySnapshot
+from bot.formatters.render_cache import render_cache
 from bot.keyboards.inline import CallbackData, get_back_keyboard
-from bot.formatters.messages import Emoji
+from bot.formatters.messages import Emoji, format_wib_datetime
 
 router = Router()
 
 
-def format_stock_message(balances: dict, prices: dict) -> str:
+def format_stock_message(balances: dict, prices: dict, updated_at: Optional[datetime] = None) -> str:
     lines = [
         f"{Emoji.CHART} <b>Stock Crypto Realtime</b>",
         "",
@@ -41,11 +44,23 @@ def format_stock_message(balances: dict, prices: dict) -> str:
     lines.append("━━━━━━━━━━━━━━━━━━━━━━")
     lines.append(f"{Emoji.MONEY} <b>Total Value:</b> ${total_usd:,.2f}")
     lines.append("")
-    lines.append("<i>Data realtime dari custody wallet</i>")
+    lines.append("<i>Data dari custody wallet</i>")
+    if updated_at is not None:
+        lines.append(f"<i>Diperbarui: {format_wib_datetime(updated_at)}</i>")
     
     return "\n".join(lines)
 
 
+def render_stock_message(snapshot: CustodySnapshot) -> str:
+    """Rendered once per custody snapshot and shared by every viewer"""
+    return render_cache.get_or_render(
+        "stock",
+        snapshot.version,
+        snapshot.fetched_at,
+        lambda: format_stock_message(snapshot.balances, snapshot.prices, snapshot.updated_at),
+    )
+
+
 def get_coin_emoji(coin: str) -> str:
     emojis = {
         "BTC": "₿",
@@ -59,7 +74,7 @@ def get_coin_emoji(coin: str) -> str:
 
 
 @router.callback_query(F.data == CallbackData.MENU_STOCK)
-async def show_stock(callback: CallbackQuery, oxapay: OxaPayService, **kwargs) -> None:
+async def show_stock(callback: CallbackQuery, **kwargs) -> None:
     from aiogram.types import Message as AiogramMessage
     await callback.answer()
     
@@ -67,32 +82,19 @@ async def show_stock(callback: CallbackQuery, oxapay: OxaPayService, **kwargs) -
     if not isinstance(msg, AiogramMessage):
         return
     
-    await msg.edit_text(
-        f"{Emoji.CLOCK} Mengambil data stock dari wallet...",
-        parse_mode="HTML"
-    )
-    
-    try:
-        balances = await oxapay.get_balance()
-        prices = await oxapay.get_prices()
-        
-        message = format_stock_message(balances, prices)
-        
+    snapshot = custody_snapshot.snapshot
+    if snapshot is None:
         await msg.edit_text(
-            message,
-            reply_markup=get_stock_keyboard(),
-            parse_mode="HTML"
-        )
-    except Exception as e:
-        await msg.edit_text(
-            f"{Emoji.CROSS} Gagal mengambil data stock.\n\nError: {str(e)}",
-            reply_markup=get_back_keyboard(),
+            f"{Emoji.CLOCK} Mengambil data stock dari wallet...",
             parse_mode="HTML"
         )
+        snapshot = await custody_snapshot.get()
+    
+    await _send_stock(msg, snapshot, "Gagal mengambil data stock.")
 
 
 @router.callback_query(F.data == "stock:refresh")
-async def refresh_stock(callback: CallbackQuery, oxapay: OxaPayService, **kwargs) -> None:
+async def refresh_stock(callback: CallbackQuery, **kwargs) -> None:
     from aiogram.types import Message as AiogramMessage
     await callback.answer("Memperbarui data...")
     
@@ -100,23 +102,31 @@ async def refresh_stock(callback: CallbackQuery, oxapay: OxaPayService, **kwargs
     if not isinstance(msg, AiogramMessage):
         return
     
-    try:
-        balances = await oxapay.get_balance()
-        prices = await oxapay.get_prices()
-        
-        message = format_stock_message(balances, prices)
-        
+    # Shared with every other viewer refreshing at the same time
+    snapshot = await custody_snapshot.refresh()
+    await _send_stock(msg, snapshot, "Gagal memperbarui data stock.")
+
+
+async def _send_stock(msg, snapshot: Optional[CustodySnapshot], error_text: str) -> None:
+    from aiogram.exceptions import TelegramBadRequest
+    
+    if snapshot is None:
         await msg.edit_text(
-            message,
-            reply_markup=get_stock_keyboard(),
+            f"{Emoji.CROSS} {error_text}",
+            reply_markup=get_back_keyboard(),
             parse_mode="HTML"
         )
-    except Exception as e:
+        return
+    
+    try:
         await msg.edit_text(
-            f"{Emoji.CROSS} Gagal memperbarui data stock.\n\nError: {str(e)}",
-            reply_markup=get_back_keyboard(),
+            render_stock_message(snapshot),
+            reply_markup=get_stock_keyboard(),
             parse_mode="HTML"
         )
+    except TelegramBadRequest:
+        # "message is not modified" when the snapshot has not changed since the last view
+        pass
 
 
 def get_stock_keyboard():
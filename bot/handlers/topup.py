@@ -5,7 +5,7 @@ from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from prisma import Prisma
-from prisma.models import User
+from bot.types import UserSnapshot
 
 from bot.formatters.messages import (
     format_topup_menu,
@@ -24,7 +24,7 @@ from bot.keyboards.inline import (
 from bot.utils.helpers import parse_amount
 from bot.utils.telegram_helpers import safe_edit_text, get_callback_data
 from bot.db.queries import get_payment_methods, create_deposit
-from bot.config import config
+from bot.services.message_sender import message_sender
 
 router = Router()
 
@@ -42,7 +42,7 @@ async def show_topup_menu(
     callback: CallbackQuery,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     if not user or user.status != "ACTIVE":
@@ -110,7 +110,7 @@ async def process_topup_amount(
     message: Message,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     amount = parse_amount(message.text or "")
@@ -151,20 +151,13 @@ async def process_topup_amount(
     )
     
     user_name = user.firstName or user.username or "User"
-    for admin_id in config.bot.admin_ids:
-        if message.bot is not None:
-            try:
-                await message.bot.send_message(
-                    admin_id,
-                    f"<b>Request Top Up Baru</b>\n\n"
-                    f"• User: {user_name} (ID: {user.telegramId})\n"
-                    f"• Jumlah: Rp {amount:,.0f}\n"
-                    f"• Via: {state_data['method_name']}\n\n"
-                    f"ID: <code>{deposit.id}</code>",
-                    parse_mode="HTML"
-                )
-            except Exception:
-                pass
+    message_sender.notify_admins(
+        f"<b>Request Top Up Baru</b>\n\n"
+        f"• User: {user_name} (ID: {user.telegramId})\n"
+        f"• Jumlah: Rp {amount:,.0f}\n"
+        f"• Via: {state_data['method_name']}\n\n"
+        f"ID: <code>{deposit.id}</code>"
+    )
 
 
 @router.callback_query(F.data.startswith("topup:confirm:"))
@@ -1,11 +1,11 @@
 from decimal import Decimal
-from typing import Optional, Any
+from typing import Optional, Any, Awaitable, Callable
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from prisma import Prisma
-from prisma.models import User
+from bot.types import UserSnapshot
 
 from bot.formatters.messages import (
     format_withdraw_menu,
@@ -25,7 +25,9 @@ from bot.keyboards.inline import (
 from bot.utils.helpers import parse_amount
 from bot.utils.telegram_helpers import safe_edit_text, get_callback_data
 from bot.db.queries import create_withdrawal
-from bot.config import config
+from bot.services.message_sender import message_sender
+from bot.services.pin import pin_service
+from bot.handlers.pin_gate import PIN_PROMPT, read_pin
 
 router = Router()
 
@@ -40,6 +42,7 @@ class WithdrawStates(StatesGroup):
     entering_ewallet_number = State()
     entering_amount = State()
     confirming = State()
+    entering_pin = State()
 
 
 @router.callback_query(F.data == CallbackData.MENU_WITHDRAW)
@@ -47,7 +50,7 @@ async def show_withdraw_menu(
     callback: CallbackQuery,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     if not user or user.status != "ACTIVE":
@@ -213,7 +216,7 @@ async def process_withdraw_amount(
     message: Message,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
     amount = parse_amount(message.text or "")
@@ -274,27 +277,64 @@ async def confirm_withdraw(
     callback: CallbackQuery,
     state: FSMContext,
     db: Prisma,
-    user: Optional[User] = None,
+    user: Optional[UserSnapshot] = None,
     **kwargs: Any
 ) -> None:
-    state_data = await state.get_data()
-    amount = Decimal(str(state_data["amount"]))
-    
     if not user:
         await callback.answer("User tidak ditemukan.", show_alert=True)
         return
     
-    balance = user.balance.amount if user.balance else Decimal("0")
+    if pin_service.needs_pin(user):
+        await state.set_state(WithdrawStates.entering_pin)
+        await safe_edit_text(callback, PIN_PROMPT, reply_markup=get_cancel_keyboard())
+        await callback.answer()
+        return
     
-    if amount > balance:
-        await safe_edit_text(
-            callback,
-            format_insufficient_balance(amount, balance),
-            reply_markup=get_back_keyboard()
-        )
+    async def reply(text: str, markup: Optional[InlineKeyboardMarkup]) -> None:
+        await safe_edit_text(callback, text, reply_markup=markup)
+    
+    if await _submit_withdrawal(state, db, user, reply):
+        await callback.answer("Request withdraw berhasil dikirim!", show_alert=True)
+    else:
         await callback.answer()
+
+
+@router.message(WithdrawStates.entering_pin)
+async def process_withdraw_pin(
+    message: Message,
+    state: FSMContext,
+    db: Prisma,
+    user: Optional[UserSnapshot] = None,
+    **kwargs: Any
+) -> None:
+    if not user:
+        await state.clear()
+        return
+    
+    if not await read_pin(message, state, db, user):
         return
     
+    async def reply(text: str, markup: Optional[InlineKeyboardMarkup]) -> None:
+        await message.answer(text, reply_markup=markup, parse_mode="HTML")
+    
+    await _submit_withdrawal(state, db, user, reply)
+
+
+async def _submit_withdrawal(
+    state: FSMContext,
+    db: Prisma,
+    user: UserSnapshot,
+    reply: Callable[[str, Optional[InlineKeyboardMarkup]], Awaitable[None]],
+) -> bool:
+    state_data = await state.get_data()
+    amount = Decimal(str(state_data["amount"]))
+    
+    balance = user.balance.amount if user.balance else Decimal("0")
+    
+    if amount > balance:
+        await reply(format_insufficient_balance(amount, balance), get_back_keyboard())
+        return False
+    
     if state_data.get("method") == "bank":
         withdrawal = await create_withdrawal(
             db=db,
@@ -315,34 +355,22 @@ async def confirm_withdraw(
     
     await state.clear()
     
-    await safe_edit_text(
-        callback,
-        format_transaction_pending()
-    )
+    await reply(format_transaction_pending(), None)
     
     user_name = user.firstName or user.username or "User"
-    msg = callback.message
-    if msg is not None and hasattr(msg, 'bot') and msg.bot is not None:
-        for admin_id in config.bot.admin_ids:
-            try:
-                if state_data.get("method") == "bank":
-                    detail = f"Bank: {state_data['bank_name']}\nNo. Rek: {state_data['account_number']}\nNama: {state_data['account_name']}"
-                else:
-                    detail = f"{state_data['ewallet_type']}: {state_data['ewallet_number']}"
-                
-                await msg.bot.send_message(
-                    admin_id,
-                    f"<b>Request Withdraw Baru</b>\n\n"
-                    f"{Emoji.DOT} User: {user_name} (ID: {user.telegramId})\n"
-                    f"{Emoji.DOT} Jumlah: Rp {amount:,.0f}\n"
-                    f"{detail}\n\n"
-                    f"ID Withdraw: <code>{withdrawal.id}</code>",
-                    parse_mode="HTML"
-                )
-            except Exception:
-                pass
-    
-    await callback.answer("Request withdraw berhasil dikirim!", show_alert=True)
+    if state_data.get("method") == "bank":
+        detail = f"Bank: {state_data['bank_name']}\nNo. Rek: {state_data['account_number']}\nNama: {state_data['account_name']}"
+    else:
+        detail = f"{state_data['ewallet_type']}: {state_data['ewallet_number']}"
+    
+    message_sender.notify_admins(
+        f"<b>Request Withdraw Baru</b>\n\n"
+        f"{Emoji.DOT} User: {user_name} (ID: {user.telegramId})\n"
+        f"{Emoji.DOT} Jumlah: Rp {amount:,.0f}\n"
+        f"{detail}\n\n"
+        f"ID Withdraw: <code>{withdrawal.id}</code>"
+    )
+    return True
 
 
 @router.callback_query(F.data == "withdraw:cancel:confirm")
@@ -1,6 +1,8 @@
+from functools import lru_cache
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 
+@lru_cache(maxsize=128)
 def admin_menu_keyboard(pending_topup: int = 0, pending_withdraw: int = 0) -> InlineKeyboardMarkup:
     topup_text = f"📥 Topup ({pending_topup})" if pending_topup > 0 else "📥 Topup"
     withdraw_text = f"📤 Withdraw ({pending_withdraw})" if pending_withdraw > 0 else "📤 Withdraw"
@@ -27,6 +29,7 @@ def admin_menu_keyboard(pending_topup: int = 0, pending_withdraw: int = 0) -> In
     ])
 
 
+@lru_cache(maxsize=None)
 def back_to_admin_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="← Back", callback_data="admin:menu")]
@@ -56,6 +59,7 @@ def coin_networks_keyboard(coin_symbol: str, networks: list[tuple[str, str, bool
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@lru_cache(maxsize=256)
 def coin_edit_keyboard(coin_id: str, coin_symbol: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -74,6 +78,7 @@ def coin_edit_keyboard(coin_id: str, coin_symbol: str) -> InlineKeyboardMarkup:
     ])
 
 
+@lru_cache(maxsize=None)
 def cancel_keyboard(callback_data: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="Cancel", callback_data=callback_data)]
@@ -92,6 +97,7 @@ def payment_list_keyboard(payments: list[tuple[str, str, bool]]) -> InlineKeyboa
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@lru_cache(maxsize=None)
 def payment_type_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="Bank Transfer", callback_data="payment_type:BANK")],
@@ -100,6 +106,7 @@ def payment_type_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@lru_cache(maxsize=16)
 def referral_settings_keyboard(setting_id: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="Edit Bonus Referrer", callback_data=f"admin:set_referrer_bonus:{setting_id}")],
@@ -108,6 +115,7 @@ def referral_settings_keyboard(setting_id: str) -> InlineKeyboardMarkup:
     ])
 
 
+@lru_cache(maxsize=None)
 def referral_create_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="➕ Buat Setting", callback_data="admin:create_referral")],
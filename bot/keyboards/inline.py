@@ -1,8 +1,11 @@
 from decimal import Decimal
+from functools import lru_cache
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 from typing import Optional
 
+from bot.types import NetworkInfo
+
 
 class CallbackData:
     AGREE_TERMS = "signup:agree"
@@ -31,6 +34,7 @@ class CallbackData:
     CANCEL_DELETE = "cancel:delete_and_menu"
 
 
+@lru_cache(maxsize=None)
 def get_terms_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.row(
@@ -42,6 +46,7 @@ def get_terms_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def get_skip_referral_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.row(
@@ -53,6 +58,7 @@ def get_skip_referral_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def get_location_keyboard() -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
     builder.row(
@@ -61,6 +67,7 @@ def get_location_keyboard() -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
+@lru_cache(maxsize=None)
 def get_phone_keyboard() -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
     builder.row(
@@ -69,10 +76,12 @@ def get_phone_keyboard() -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
+@lru_cache(maxsize=None)
 def get_remove_keyboard() -> ReplyKeyboardRemove:
     return ReplyKeyboardRemove()
 
 
+@lru_cache(maxsize=None)
 def get_main_menu_keyboard(is_admin: bool = False) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.row(
@@ -106,6 +115,7 @@ def get_main_menu_keyboard(is_admin: bool = False) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def get_balance_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.row(
@@ -130,15 +140,42 @@ def get_coin_emoji(coin: str) -> str:
     return emojis.get(coin, "•")
 
 
+# Memoized parameterized keyboards. Like the lru_cache'd keyboards in this module
+# (and bot/keyboards/admin.py), one instance is shared by every update. Markups are
+# mutable pydantic models with plain list rows, so callers must treat them as
+# read-only: build a new keyboard instead of editing a returned one. Cleared when
+# coin settings change.
+_coins_keyboards: dict[tuple, InlineKeyboardMarkup] = {}
+_networks_keyboards: dict[tuple, InlineKeyboardMarkup] = {}
+MEMO_MAX_ENTRIES = 512
+
+
+def invalidate_coin_keyboards() -> None:
+    _coins_keyboards.clear()
+    _networks_keyboards.clear()
+
+
+def _memo_put(memo: dict[tuple, InlineKeyboardMarkup], key: tuple, markup: InlineKeyboardMarkup) -> InlineKeyboardMarkup:
+    if len(memo) >= MEMO_MAX_ENTRIES:
+        memo.clear()
+    memo[key] = markup
+    return markup
+
+
 def get_coins_keyboard(coins: list, action: str) -> InlineKeyboardMarkup:
+    symbols = tuple(coin["symbol"] if isinstance(coin, dict) else coin for coin in coins)
+    key = (symbols, action)
+    cached = _coins_keyboards.get(key)
+    if cached is not None:
+        return cached
+    
     builder = InlineKeyboardBuilder()
     
-    for i in range(0, len(coins), 2):
+    for i in range(0, len(symbols), 2):
         row = []
         for j in range(2):
-            if i + j < len(coins):
-                coin = coins[i + j]
-                symbol = coin["symbol"] if isinstance(coin, dict) else coin
+            if i + j < len(symbols):
+                symbol = symbols[i + j]
                 emoji = get_coin_emoji(symbol)
                 row.append(
                     InlineKeyboardButton(
@@ -151,22 +188,30 @@ def get_coins_keyboard(coins: list, action: str) -> InlineKeyboardMarkup:
     builder.row(
         InlineKeyboardButton(text="← Kembali", callback_data=CallbackData.BACK_MENU),
     )
-    return builder.as_markup()
+    return _memo_put(_coins_keyboards, key, builder.as_markup())
 
 
-def get_networks_keyboard(networks: list[dict], coin: str, action: str, rate_idr: Optional[Decimal] = None) -> InlineKeyboardMarkup:
-    builder = InlineKeyboardBuilder()
-    
+def get_networks_keyboard(networks: list[NetworkInfo], coin: str, action: str, rate_idr: Optional[Decimal] = None) -> InlineKeyboardMarkup:
+    labels = []
     for net in networks:
-        network = net["network"]
-        fee = net.get("withdraw_fee", Decimal("0"))
-        
+        fee = net.withdraw_fee
         if rate_idr and fee:
             fee_idr = Decimal(str(fee)) * rate_idr
             fee_text = f"Fee: Rp {fee_idr:,.0f}"
         else:
             fee_text = f"Fee: {fee} {coin}"
-        
+        labels.append((net.network, fee_text))
+    
+    # Keyed on the rendered labels rather than the raw rate, so rate ticks that
+    # do not change the displayed fees still hit
+    key = (coin, action, tuple(labels))
+    cached = _networks_keyboards.get(key)
+    if cached is not None:
+        return cached
+    
+    builder = InlineKeyboardBuilder()
+    
+    for network, fee_text in labels:
         builder.row(
             InlineKeyboardButton(
                 text=f"{network} ({fee_text})",
@@ -177,7 +222,7 @@ def get_networks_keyboard(networks: list[dict], coin: str, action: str, rate_idr
     builder.row(
         InlineKeyboardButton(text="← Kembali", callback_data=f"{action}:back"),
     )
-    return builder.as_markup()
+    return _memo_put(_networks_keyboards, key, builder.as_markup())
 
 
 def get_confirm_keyboard(action: str, order_id: str) -> InlineKeyboardMarkup:
@@ -237,6 +282,7 @@ def get_topup_confirm_keyboard(deposit_id: str) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def get_withdraw_methods_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.row(
@@ -249,6 +295,7 @@ def get_withdraw_methods_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def get_ewallet_options_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     ewallets = ["GoPay", "OVO", "DANA", "ShopeePay", "LinkAja"]
@@ -272,6 +319,7 @@ def get_ewallet_options_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def get_back_keyboard(callback_data: str = CallbackData.BACK_MENU) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.row(
@@ -280,6 +328,7 @@ def get_back_keyboard(callback_data: str = CallbackData.BACK_MENU) -> InlineKeyb
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def get_settings_keyboard(has_pin: bool = False) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
@@ -319,6 +368,7 @@ def get_referral_keyboard(ref_code: str, bot_username: str = "") -> InlineKeyboa
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def get_cancel_keyboard(back_callback: str = CallbackData.CANCEL_DELETE) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.row(
@@ -327,6 +377,7 @@ def get_cancel_keyboard(back_callback: str = CallbackData.CANCEL_DELETE) -> Inli
     return builder.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def get_history_pagination_keyboard(
     page: int,
     total_pages: int,
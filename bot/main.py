@@ -3,22 +3,34 @@ import logging
 from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
-from prisma import Prisma
 
 from bot.config import config
+from bot.utils import json_codec
+from bot.db.client import create_prisma
 from bot.handlers import setup_routers
 from bot.middlewares.throttling import ThrottlingMiddleware
 from bot.middlewares.database import DatabaseMiddleware
 from bot.middlewares.user_status import UserStatusMiddleware
 from bot.middlewares.logging import LoggingMiddleware
-from bot.webhook import handle_oxapay_webhook, health_check
+from bot.webhook import handle_oxapay_webhook, health_check, readiness_check, metrics, debug_queries
+from bot.services.db_supervisor import db_supervisor
+from bot.services.message_sender import message_sender
+from bot.services.broadcast import broadcast_engine
+from bot.services.referral_codes import referral_code_allocator
+from bot.services.payout_dispatcher import payout_dispatcher
+from bot.services.payout_tracker import payout_tracker
+from bot.services.pin import pin_service
+from bot.tasks.background_tasks import event_loop_lag_monitor
+from bot.utils.log_setup import setup_logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+log_listener = setup_logging(
+    level=getattr(logging, config.logging.level, logging.INFO),
+    json_format=config.logging.json,
+    sample_rate=config.logging.sample_rate,
 )
 logger = logging.getLogger(__name__)
 
@@ -34,6 +46,8 @@ async def on_startup(bot: Bot):
         drop_pending_updates=True,
     )
     logger.info(f"Webhook set to: {webhook_url}")
+    
+    asyncio.create_task(event_loop_lag_monitor())
 
 
 async def on_shutdown(bot: Bot):
@@ -50,20 +64,31 @@ async def main():
         logger.error("BOT_DATABASE is not set!")
         return
     
-    prisma = Prisma()
+    prisma = create_prisma(config.database)
     await prisma.connect()
     logger.info("Connected to database")
+    db_supervisor.start(prisma)
+    payout_dispatcher.start(prisma)
+    payout_tracker.start(prisma)
+    
+    # RESERVE A BLOCK OF REFERRAL CODES SO SIGNUP NEVER WAITS ON THE SEQUENCE
+    await referral_code_allocator.start(prisma)
     
     bot = Bot(
         token=config.bot.token,
+        session=AiohttpSession(json_loads=json_codec.loads, json_dumps=json_codec.dumps),
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
+    message_sender.start(bot)
+    
+    # RESUME UNFINISHED BROADCAST FROM ITS LAST CHECKPOINT
+    await broadcast_engine.resume(bot, prisma)
     
     storage = MemoryStorage()
     dp = Dispatcher(storage=storage)
     
     logging_mw = LoggingMiddleware()
-    throttling_mw = ThrottlingMiddleware(rate_limit=0.1)
+    throttling_mw = ThrottlingMiddleware()
     database_mw = DatabaseMiddleware(prisma)
     user_status_mw = UserStatusMiddleware()
     
@@ -88,9 +113,13 @@ async def main():
     app = web.Application()
     app["db"] = prisma
     app["bot"] = bot
+    app["throttling"] = throttling_mw
     
     app.router.add_post("/webhook/oxapay", handle_oxapay_webhook)
     app.router.add_get("/health", health_check)
+    app.router.add_get("/ready", readiness_check)
+    app.router.add_get("/debug/queries", debug_queries)
+    app.router.add_get("/metrics", metrics)
     
     webhook_requests_handler = SimpleRequestHandler(
         dispatcher=dp,
@@ -114,9 +143,15 @@ async def main():
     try:
         await asyncio.Event().wait()
     finally:
+        await payout_dispatcher.stop()
+        await payout_tracker.stop()
+        await message_sender.stop()
+        await db_supervisor.stop()
+        pin_service.close()
         await prisma.disconnect()
         await bot.session.close()
         await runner.cleanup()
+        log_listener.stop()
 
 
 if __name__ == "__main__":
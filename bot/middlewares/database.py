@@ -1,10 +1,15 @@
 import logging
 from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject
+from aiogram.types import TelegramObject, Message, CallbackQuery
 from prisma import Prisma
+from prisma.errors import ClientNotConnectedError, HTTPClientClosedError
 
 from bot.services.oxapay import OxaPayService
+from bot.services.db_supervisor import db_supervisor
+from bot.db.client import read_client
+from bot.db.instrumentation import query_profiler
+from bot.middlewares.logging import handler_name
 from bot.config import config
 
 logger = logging.getLogger(__name__)
@@ -20,29 +25,28 @@ class DatabaseMiddleware(BaseMiddleware):
         )
         super().__init__()
     
-    async def ensure_connected(self) -> None:
-        """Ensure database connection is alive, reconnect if needed."""
-        try:
-            if not self.prisma.is_connected():
-                logger.warning("Database disconnected, reconnecting...")
-                await self.prisma.connect()
-                logger.info("Database reconnected successfully")
-        except Exception as e:
-            logger.error(f"Database reconnection failed: {e}")
-            try:
-                await self.prisma.disconnect()
-            except Exception:
-                pass
-            await self.prisma.connect()
-            logger.info("Database reconnected after disconnect")
-    
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        await self.ensure_connected()
+        # Health is owned by the supervisor; the request path only reads the flag
+        if not db_supervisor.ready:
+            if isinstance(event, CallbackQuery):
+                await event.answer("⚠️ Layanan sedang gangguan, coba lagi sebentar.", show_alert=False)
+            elif isinstance(event, Message):
+                await event.answer("⚠️ Layanan sedang gangguan, coba lagi sebentar.")
+            return
+        
         data["db"] = self.prisma
+        data["db_read"] = read_client(self.prisma)
         data["oxapay"] = self.oxapay
-        return await handler(event, data)
+        data["query_stats"] = stats = query_profiler.begin_update()
+        try:
+            return await handler(event, data)
+        except (ClientNotConnectedError, HTTPClientClosedError) as e:
+            db_supervisor.mark_unhealthy(str(e))
+            raise
+        finally:
+            query_profiler.record_update(handler_name(data), stats)
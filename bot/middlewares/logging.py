@@ -1,11 +1,30 @@
 import logging
-from typing import Any, Awaitable, Callable, Dict
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message, CallbackQuery
 
 logger = logging.getLogger(__name__)
 
 
+def handler_name(data: Dict[str, Any]) -> str:
+    handler_obj = data.get("handler")
+    callback = getattr(handler_obj, "callback", None)
+    return getattr(callback, "__name__", "unknown")
+
+
+def _is_secret_state(raw_state: Optional[str]) -> bool:
+    """PIN prompts (buy/withdraw/sell entering_pin, settings waiting_*_pin): the text is the PIN"""
+    return bool(raw_state) and raw_state.rpartition(":")[2].endswith("_pin")
+
+
+def _query_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    stats = data.get("query_stats")
+    if stats is None:
+        return {}
+    return {"queries": stats.count, "db_ms": round(stats.db_ms, 1)}
+
+
 class LoggingMiddleware(BaseMiddleware):
     async def __call__(
         self,
@@ -15,23 +34,50 @@ class LoggingMiddleware(BaseMiddleware):
     ) -> Any:
         user_id = None
         event_type = type(event).__name__
-        event_data = ""
+        event_data = None
         
         if isinstance(event, Message):
             user_id = event.from_user.id if event.from_user else None
-            if event.text:
-                event_data = f"text='{event.text[:50]}'"
+            if event.text and _is_secret_state(data.get("raw_state")):
+                # Never log what was typed at a PIN prompt
+                event_data = f"<redacted {len(event.text)} chars>"
+            elif event.text:
+                event_data = event.text[:50]
             elif event.location:
-                event_data = f"location=({event.location.latitude}, {event.location.longitude})"
+                event_data = "location"
         elif isinstance(event, CallbackQuery):
             user_id = event.from_user.id if event.from_user else None
-            event_data = f"data='{event.data}'"
-        
-        logger.info(f"[{event_type}] user_id={user_id} {event_data}")
+            event_data = event.data
         
+        started = time.perf_counter()
         try:
             result = await handler(event, data)
-            return result
         except Exception as e:
-            logger.error(f"[{event_type}] Error for user_id={user_id}: {str(e)}")
+            logger.error(
+                "%s failed: %s",
+                event_type,
+                e,
+                extra={
+                    "user_id": user_id,
+                    "handler": handler_name(data),
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "event": event_type,
+                    "data": event_data,
+                },
+            )
             raise
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "%s handled",
+                event_type,
+                extra={
+                    "user_id": user_id,
+                    "handler": handler_name(data),
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "event": event_type,
+                    "data": event_data,
+                    **_query_fields(data),
+                },
+            )
+        return result
@@ -1,14 +1,116 @@
-from typing import Any, Awaitable, Callable, Dict
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message, CallbackQuery
-from cachetools import TTLCache
+
+
+@dataclass(frozen=True)
+class RouteBudget:
+    rate: float   # tokens refilled per second
+    burst: float  # bucket capacity
+
+
+# Route class -> budget. Expensive routes (external API calls, heavy queries)
+# get tighter budgets than plain navigation and FSM text input.
+DEFAULT_BUDGETS: dict[str, RouteBudget] = {
+    "expensive": RouteBudget(rate=0.5, burst=2),
+    "admin": RouteBudget(rate=0.5, burst=3),
+    "callback": RouteBudget(rate=4, burst=8),
+    "message": RouteBudget(rate=3, burst=10),
+}
+
+# Callback data patterns -> route class. A trailing "*" matches by prefix.
+DEFAULT_ROUTES: list[tuple[str, str]] = [
+    ("buy:network:*", "expensive"),
+    ("sell:network:*", "expensive"),
+    ("buy:coin:*", "expensive"),
+    ("sell:coin:*", "expensive"),
+    ("menu:stock", "expensive"),
+    ("stock:refresh", "expensive"),
+    ("menu:rates", "expensive"),
+    ("admin:dashboard", "admin"),
+]
 
 
 class ThrottlingMiddleware(BaseMiddleware):
-    def __init__(self, rate_limit: float = 0.5):
-        self.cache = TTLCache(maxsize=10000, ttl=rate_limit)
+    PRUNE_INTERVAL = 60.0
+    
+    def __init__(
+        self,
+        budgets: Optional[dict[str, RouteBudget]] = None,
+        routes: Optional[list[tuple[str, str]]] = None,
+    ):
+        self.budgets = budgets or DEFAULT_BUDGETS
+        self._exact: dict[str, str] = {}
+        self._prefixes: list[tuple[str, str]] = []
+        for pattern, route_class in routes if routes is not None else DEFAULT_ROUTES:
+            if pattern.endswith("*"):
+                self._prefixes.append((pattern[:-1], route_class))
+            else:
+                self._exact[pattern] = route_class
+        
+        # (user_id, route_class) -> (tokens, last_refill). Refill is computed lazily on access.
+        self._buckets: dict[tuple[int, str], tuple[float, float]] = {}
+        self._last_prune = time.monotonic()
+        self.allowed: Counter[str] = Counter()
+        self.dropped: Counter[str] = Counter()
         super().__init__()
     
+    def route_class(self, event: TelegramObject) -> str:
+        if isinstance(event, CallbackQuery):
+            data = event.data or ""
+            route_class = self._exact.get(data)
+            if route_class:
+                return route_class
+            for prefix, route_class in self._prefixes:
+                if data.startswith(prefix):
+                    return route_class
+            return "callback"
+        return "message"
+    
+    def consume(self, user_id: int, route_class: str) -> bool:
+        """Take one token from the user's bucket for this route class"""
+        budget = self.budgets.get(route_class)
+        if budget is None:
+            return True
+        
+        now = time.monotonic()
+        key = (user_id, route_class)
+        state = self._buckets.get(key)
+        if state is None:
+            tokens = budget.burst
+        else:
+            tokens = min(budget.burst, state[0] + (now - state[1]) * budget.rate)
+        
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return False
+        
+        self._buckets[key] = (tokens - 1, now)
+        
+        if now - self._last_prune > self.PRUNE_INTERVAL:
+            self._prune(now)
+        return True
+    
+    def _prune(self, now: float) -> None:
+        """Drop buckets that have fully refilled - equivalent to having no state"""
+        self._last_prune = now
+        full = [
+            key for key, (tokens, updated_at) in self._buckets.items()
+            if tokens + (now - updated_at) * self.budgets[key[1]].rate >= self.budgets[key[1]].burst
+        ]
+        for key in full:
+            del self._buckets[key]
+    
+    def stats(self) -> dict[str, Any]:
+        return {
+            "tracked_buckets": len(self._buckets),
+            "allowed": dict(self.allowed),
+            "dropped": dict(self.dropped),
+        }
+    
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
@@ -23,11 +125,12 @@ class ThrottlingMiddleware(BaseMiddleware):
             user_id = event.from_user.id if event.from_user else None
         
         if user_id:
-            if user_id in self.cache:
+            route_class = self.route_class(event)
+            if not self.consume(user_id, route_class):
+                self.dropped[route_class] += 1
                 if isinstance(event, CallbackQuery):
                     await event.answer("⏳ Mohon tunggu sebentar...", show_alert=False)
                 return
-            
-            self.cache[user_id] = True
+            self.allowed[route_class] += 1
         
         return await handler(event, data)
@@ -0,0 +1,267 @@
+"""
+Broadcast engine for announcements to all ACTIVE users
+Streams recipients with keyset pagination, sends through a rate-limited
+worker pool and checkpoints progress in the settings table so a restart
+resumes where it stopped
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, asdict, field
+from typing import Optional, Any, cast
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from prisma import Prisma
+from prisma.enums import UserStatus
+
+from bot.services.message_sender import message_sender
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_KEY = "broadcast:checkpoint"
+
+
+@dataclass
+class BroadcastProgress:
+    text: str
+    admin_chat_id: int
+    status_message_id: Optional[int] = None
+    cursor: Optional[str] = None
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+    started_at: float = field(default_factory=time.time)
+    finished: bool = False
+    cancelled: bool = False
+    
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed + self.blocked
+    
+    @property
+    def rate(self) -> float:
+        elapsed = time.time() - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+    
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+    
+    @classmethod
+    def from_json(cls, raw: str) -> "BroadcastProgress":
+        return cls(**json.loads(raw))
+
+
+class BroadcastEngine:
+    BATCH_SIZE = 500
+    WORKERS = 8
+    BLOCKED_FLUSH_SIZE = 100
+    REPORT_INTERVAL = 5.0
+    
+    def __init__(self) -> None:
+        self._task: Optional[asyncio.Task] = None
+        self.progress: Optional[BroadcastProgress] = None
+    
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    async def start(self, bot: Bot, db: Prisma, text: str, admin_chat_id: int) -> bool:
+        if self.is_running():
+            return False
+        
+        progress = BroadcastProgress(text=text, admin_chat_id=admin_chat_id)
+        try:
+            status = await bot.send_message(admin_chat_id, format_broadcast_status(progress))
+            progress.status_message_id = status.message_id
+        except Exception:
+            pass
+        
+        await self._save_checkpoint(db, progress)
+        self._launch(bot, db, progress)
+        return True
+    
+    async def resume(self, bot: Bot, db: Prisma) -> None:
+        """Continue an unfinished broadcast after a restart"""
+        if self.is_running():
+            return
+        try:
+            setting = await db.setting.find_unique(where={"key": CHECKPOINT_KEY})
+        except Exception as e:
+            logger.error(f"Failed to load broadcast checkpoint: {e}")
+            return
+        if setting is None:
+            return
+        
+        progress = BroadcastProgress.from_json(setting.value)
+        if progress.finished:
+            return
+        
+        logger.info(f"Resuming broadcast from cursor {progress.cursor} ({progress.processed} processed)")
+        self._launch(bot, db, progress)
+    
+    def cancel(self) -> bool:
+        if not self.is_running() or self.progress is None:
+            return False
+        self.progress.cancelled = True
+        return True
+    
+    def _launch(self, bot: Bot, db: Prisma, progress: BroadcastProgress) -> None:
+        self.progress = progress
+        self._task = asyncio.create_task(self._run(bot, db, progress), name="broadcast")
+    
+    async def _run(self, bot: Bot, db: Prisma, progress: BroadcastProgress) -> None:
+        reporter = asyncio.create_task(self._report_loop(bot, progress))
+        blocked_ids: list[int] = []
+        
+        try:
+            while not progress.cancelled:
+                where: dict[str, Any] = {"status": UserStatus.ACTIVE}
+                if progress.cursor:
+                    where["id"] = {"gt": progress.cursor}
+                
+                users = await db.user.find_many(
+                    where=cast(Any, where),
+                    order={"id": "asc"},
+                    take=self.BATCH_SIZE,
+                )
+                if not users:
+                    break
+                
+                queue: asyncio.Queue[int] = asyncio.Queue()
+                for u in users:
+                    queue.put_nowait(u.telegramId)
+                
+                workers = [
+                    asyncio.create_task(self._worker(bot, queue, progress, blocked_ids))
+                    for _ in range(self.WORKERS)
+                ]
+                await asyncio.gather(*workers)
+                
+                if len(blocked_ids) >= self.BLOCKED_FLUSH_SIZE:
+                    await self._flush_blocked(db, blocked_ids)
+                
+                progress.cursor = users[-1].id
+                await self._save_checkpoint(db, progress)
+            
+            await self._flush_blocked(db, blocked_ids)
+            progress.finished = not progress.cancelled
+            await self._clear_checkpoint(db)
+            logger.info(
+                f"Broadcast finished: sent={progress.sent} failed={progress.failed} "
+                f"blocked={progress.blocked} rate={progress.rate:.1f}/s"
+            )
+        except Exception as e:
+            logger.error(f"Broadcast stopped with error: {e}")
+            await self._flush_blocked(db, blocked_ids)
+            await self._save_checkpoint(db, progress)
+        finally:
+            reporter.cancel()
+            await self._report(bot, progress)
+    
+    async def _worker(
+        self,
+        bot: Bot,
+        queue: "asyncio.Queue[int]",
+        progress: BroadcastProgress,
+        blocked_ids: list[int],
+    ) -> None:
+        while not progress.cancelled:
+            try:
+                chat_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            
+            while True:
+                # Shared with the outbound queue so the bot stays under Telegram's global limit
+                await message_sender.bucket.acquire()
+                try:
+                    await bot.send_message(chat_id, progress.text)
+                    progress.sent += 1
+                except TelegramRetryAfter as e:
+                    await asyncio.sleep(e.retry_after)
+                    continue
+                except TelegramForbiddenError:
+                    progress.blocked += 1
+                    blocked_ids.append(chat_id)
+                except TelegramBadRequest:
+                    progress.failed += 1
+                except Exception as e:
+                    progress.failed += 1
+                    logger.debug(f"Broadcast send to {chat_id} failed: {e}")
+                break
+    
+    async def _flush_blocked(self, db: Prisma, blocked_ids: list[int]) -> None:
+        """Mark users who blocked the bot INACTIVE in one statement"""
+        if not blocked_ids:
+            return
+        ids = list(blocked_ids)
+        blocked_ids.clear()
+        try:
+            await db.user.update_many(
+                where={"telegramId": {"in": ids}},
+                data={"status": UserStatus.INACTIVE},
+            )
+        except Exception as e:
+            logger.error(f"Failed to mark {len(ids)} blocked users inactive: {e}")
+    
+    async def _save_checkpoint(self, db: Prisma, progress: BroadcastProgress) -> None:
+        value = progress.to_json()
+        try:
+            await db.setting.upsert(
+                where={"key": CHECKPOINT_KEY},
+                data={
+                    "create": {"key": CHECKPOINT_KEY, "value": value},
+                    "update": {"value": value},
+                },
+            )
+        except Exception as e:
+            logger.error(f"Failed to save broadcast checkpoint: {e}")
+    
+    async def _clear_checkpoint(self, db: Prisma) -> None:
+        try:
+            await db.setting.delete_many(where={"key": CHECKPOINT_KEY})
+        except Exception as e:
+            logger.error(f"Failed to clear broadcast checkpoint: {e}")
+    
+    async def _report_loop(self, bot: Bot, progress: BroadcastProgress) -> None:
+        while True:
+            await asyncio.sleep(self.REPORT_INTERVAL)
+            await self._report(bot, progress)
+    
+    async def _report(self, bot: Bot, progress: BroadcastProgress) -> None:
+        if progress.status_message_id is None:
+            return
+        try:
+            await bot.edit_message_text(
+                format_broadcast_status(progress),
+                chat_id=progress.admin_chat_id,
+                message_id=progress.status_message_id,
+            )
+        except Exception:
+            pass
+
+
+def format_broadcast_status(progress: BroadcastProgress) -> str:
+    if progress.cancelled:
+        state = "⛔ Dibatalkan"
+    elif progress.finished:
+        state = "✅ Selesai"
+    else:
+        state = "⏳ Berjalan"
+    
+    return (
+        f"📢 <b>BROADCAST</b>\n"
+        f"━━━━━━━━━━━━━━━━━━━━\n\n"
+        f"Status    : <b>{state}</b>\n"
+        f"Terkirim  : <b>{progress.sent:,}</b>\n"
+        f"Gagal     : <b>{progress.failed:,}</b>\n"
+        f"Diblokir  : <b>{progress.blocked:,}</b>\n"
+        f"Kecepatan : <b>{progress.rate:.1f} msg/s</b>\n\n"
+        f"━━━━━━━━━━━━━━━━━━━━"
+    )
+
+
+# Global broadcast engine instance
+broadcast_engine = BroadcastEngine()
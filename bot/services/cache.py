@@ -101,6 +101,14 @@ class CacheService:
             "expires": time.time() + ttl
         }
     
+    def invalidate_generic(self, prefix: Optional[str] = None) -> None:
+        """Drop generic cache entries, optionally only keys starting with prefix"""
+        if prefix is None:
+            self._generic_cache.clear()
+            return
+        for key in [k for k in self._generic_cache if k.startswith(prefix)]:
+            del self._generic_cache[key]
+    
     def clear_all(self):
         """Clear all caches"""
         self._balance_cache.clear()
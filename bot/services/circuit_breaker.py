@@ -0,0 +1,136 @@
+"""
+Per-endpoint circuit breakers for the payment API clients
+Each endpoint keeps a window of recent outcomes and latencies. Deadlines
+follow the observed p99 instead of a flat 30s, and once an endpoint keeps
+failing the breaker opens so callers fail fast (and fall back to cached
+data) until a single trial request succeeds again
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    WINDOW = 50                 # recent calls considered for the error rate
+    MIN_CALLS = 10              # calls needed before the error rate can open the circuit
+    FAILURE_RATE = 0.5
+    CONSECUTIVE_FAILURES = 5    # opens even before MIN_CALLS when an endpoint is plainly down
+    OPEN_SECONDS = 30.0
+    LATENCY_SAMPLES = 200
+    MIN_SAMPLES = 20            # below this the default timeout applies
+    TIMEOUT_HEADROOM = 2.0      # deadline = p99 * headroom, clamped
+    MIN_TIMEOUT = 3.0
+    
+    def __init__(self, name: str, default_timeout: float = 30.0):
+        self.name = name
+        self.default_timeout = default_timeout
+        self._outcomes: deque[bool] = deque(maxlen=self.WINDOW)
+        self._latencies: deque[float] = deque(maxlen=self.LATENCY_SAMPLES)
+        self._p99: Optional[float] = None
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_started: Optional[float] = None
+        self.rejected = 0
+        self.opened = 0
+    
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.OPEN_SECONDS:
+            return "open"
+        return "half_open"
+    
+    def allow(self) -> bool:
+        """False while open. Half-open lets one trial through at a time"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open":
+            now = time.monotonic()
+            # A trial that never reported back (cancelled) stops blocking after one open period
+            if self._trial_started is None or now - self._trial_started > self.OPEN_SECONDS:
+                self._trial_started = now
+                return True
+        self.rejected += 1
+        return False
+    
+    def p99(self) -> Optional[float]:
+        if not self._latencies:
+            return None
+        if self._p99 is None:
+            ordered = sorted(self._latencies)
+            self._p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return self._p99
+    
+    def timeout(self) -> float:
+        """Deadline for the next call, from observed p99 latency"""
+        p99 = self.p99()
+        if p99 is None or len(self._latencies) < self.MIN_SAMPLES:
+            return self.default_timeout
+        return min(self.default_timeout, max(self.MIN_TIMEOUT, p99 * self.TIMEOUT_HEADROOM))
+    
+    def record_success(self, latency: float) -> None:
+        self._outcomes.append(True)
+        self._latencies.append(latency)
+        self._p99 = None
+        self._consecutive_failures = 0
+        if self._opened_at is not None:
+            logger.info(f"Circuit {self.name} closed")
+        self._opened_at = None
+        self._trial_started = None
+    
+    def record_failure(self) -> None:
+        self._outcomes.append(False)
+        self._consecutive_failures += 1
+        
+        if self._opened_at is not None:
+            # Trial failed - stay open for another period
+            self._opened_at = time.monotonic()
+            self._trial_started = None
+            return
+        
+        failures = self._outcomes.count(False)
+        if (
+            self._consecutive_failures >= self.CONSECUTIVE_FAILURES
+            or (len(self._outcomes) >= self.MIN_CALLS and failures / len(self._outcomes) >= self.FAILURE_RATE)
+        ):
+            self._opened_at = time.monotonic()
+            self.opened += 1
+            logger.warning(
+                f"Circuit {self.name} opened: {failures}/{len(self._outcomes)} recent calls failed"
+            )
+    
+    def stats(self) -> dict[str, Any]:
+        calls = len(self._outcomes)
+        p99 = self.p99()
+        return {
+            "state": self.state,
+            "error_rate": round(self._outcomes.count(False) / calls, 2) if calls else 0.0,
+            "p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+            "timeout_s": round(self.timeout(), 2),
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, default_timeout: float = 30.0) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name, default_timeout)
+    return breaker
+
+
+def breaker_stats() -> dict[str, dict[str, Any]]:
+    return {name: breaker.stats() for name, breaker in sorted(_breakers.items())}
+
+
+def open_circuits() -> list[str]:
+    return [name for name, breaker in _breakers.items() if breaker.state == "open"]
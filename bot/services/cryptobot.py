@@ -1,9 +1,12 @@
 import aiohttp
+import time
 from decimal import Decimal
 from typing import Optional, Dict
 from dataclasses import dataclass
 
 from bot.config import config
+from bot.services.circuit_breaker import get_breaker
+from bot.utils import json_codec
 
 
 @dataclass
@@ -22,6 +25,14 @@ class ExchangeRate:
     is_valid: bool
 
 
+_rates_cache: Dict[str, ExchangeRate] = {}
+_rates_cache_time: float = 0
+RATES_CACHE_TTL = 120
+
+# Not idempotent - keep the full deadline so a slow success is not mistaken for a failure
+NON_IDEMPOTENT_METHODS = {"createInvoice"}
+
+
 class CryptoBotService:
     BASE_URL = "https://pay.crypt.bot/api"
     SUPPORTED_COINS = ["USDT", "USDC"]
@@ -30,12 +41,12 @@ class CryptoBotService:
         self.api_token = api_token
         self.margin = margin
         self._session: Optional[aiohttp.ClientSession] = None
-        self._rates_cache: Dict[str, ExchangeRate] = {}
     
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
             self._session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=30)
+                timeout=aiohttp.ClientTimeout(total=30),
+                json_serialize=json_codec.dumps,
             )
         return self._session
     
@@ -44,6 +55,10 @@ class CryptoBotService:
             await self._session.close()
     
     async def _request(self, method: str, data: Optional[dict] = None) -> dict:
+        breaker = get_breaker(f"cryptobot:{method}")
+        if not breaker.allow():
+            return {"ok": False, "error": {"code": 0, "name": "circuit open"}}
+        
         session = await self._get_session()
         url = f"{self.BASE_URL}/{method}"
         
@@ -52,11 +67,22 @@ class CryptoBotService:
             "Content-Type": "application/json",
         }
         
+        deadline = breaker.default_timeout if method in NON_IDEMPOTENT_METHODS else breaker.timeout()
+        started = time.perf_counter()
         try:
-            async with session.post(url, json=data or {}, headers=headers) as resp:
-                return await resp.json()
+            async with session.post(
+                url, json=data or {}, headers=headers, timeout=aiohttp.ClientTimeout(total=deadline)
+            ) as resp:
+                result = json_codec.loads(await resp.read())
         except Exception as e:
+            breaker.record_failure()
             return {"ok": False, "error": {"code": 0, "name": str(e)}}
+        
+        if resp.status >= 500 or resp.status == 429:
+            breaker.record_failure()
+        else:
+            breaker.record_success(time.perf_counter() - started)
+        return result
     
     async def get_me(self) -> dict:
         result = await self._request("getMe")
@@ -64,11 +90,18 @@ class CryptoBotService:
             return result.get("result", {})
         return {}
     
-    async def get_exchange_rates(self) -> Dict[str, ExchangeRate]:
+    async def get_exchange_rates(self, force_refresh: bool = False) -> Dict[str, ExchangeRate]:
+        """Get USD rates, shared across all instances in this process"""
+        global _rates_cache, _rates_cache_time
+        
+        now = time.time()
+        if _rates_cache and not force_refresh and (now - _rates_cache_time) < RATES_CACHE_TTL:
+            return _rates_cache
+        
         result = await self._request("getExchangeRates")
-        rates = {}
         
         if result.get("ok"):
+            rates = {}
             for item in result.get("result", []):
                 if item.get("target") == "USD":
                     source = item.get("source", "")
@@ -78,15 +111,17 @@ class CryptoBotService:
                         rate=Decimal(str(item.get("rate", "1"))),
                         is_valid=item.get("is_valid", False),
                     )
+            
+            _rates_cache = rates
+            _rates_cache_time = now
+            return _rates_cache
         
-        self._rates_cache = rates
-        return rates
+        return _rates_cache
     
     async def get_usd_rate(self, asset: str) -> Decimal:
-        if not self._rates_cache:
-            await self.get_exchange_rates()
+        rates = await self.get_exchange_rates()
         
-        rate = self._rates_cache.get(asset)
+        rate = rates.get(asset)
         if rate and rate.is_valid:
             return rate.rate
         return Decimal("1")
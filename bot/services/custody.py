@@ -0,0 +1,110 @@
+"""
+Custody wallet snapshot
+One shared view of payout-wallet balances and prices, refreshed on a
+cadence and after payouts. Concurrent viewers share a single in-flight
+refresh instead of each calling OxaPay
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+from bot.services.oxapay import OxaPayService
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CustodySnapshot:
+    balances: dict
+    prices: dict
+    version: int
+    fetched_at: float = field(default_factory=time.time)
+    
+    @property
+    def updated_at(self) -> datetime:
+        return datetime.fromtimestamp(self.fetched_at, timezone.utc)
+    
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class CustodySnapshotService:
+    REFRESH_INTERVAL = 60.0
+    MIN_REFRESH_INTERVAL = 10.0   # manual refreshes within this window reuse the snapshot
+    
+    def __init__(self) -> None:
+        self._snapshot: Optional[CustodySnapshot] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._oxapay: Optional[OxaPayService] = None
+        self._version = 0
+    
+    @property
+    def snapshot(self) -> Optional[CustodySnapshot]:
+        return self._snapshot
+    
+    async def get(self, max_age: float = REFRESH_INTERVAL) -> Optional[CustodySnapshot]:
+        """Current snapshot, refreshing first if missing or older than max_age"""
+        if self._snapshot is not None and self._snapshot.age < max_age:
+            return self._snapshot
+        return await self.refresh()
+    
+    async def refresh(self, force: bool = False) -> Optional[CustodySnapshot]:
+        """Refresh once for all callers; returns the previous snapshot if the fetch fails"""
+        if not force and self._snapshot is not None and self._snapshot.age < self.MIN_REFRESH_INTERVAL:
+            return self._snapshot
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._fetch())
+        # Shield so one viewer's cancelled request does not cancel the shared fetch
+        return await asyncio.shield(self._inflight)
+    
+    def request_refresh(self) -> None:
+        """Fire-and-forget refresh, e.g. after a payout moved funds"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._fetch())
+    
+    async def run(self) -> None:
+        """Background cadence refresh"""
+        while True:
+            await self.refresh(force=True)
+            await asyncio.sleep(self.REFRESH_INTERVAL)
+    
+    async def close(self) -> None:
+        if self._oxapay is not None:
+            await self._oxapay.close()
+    
+    def _service(self) -> OxaPayService:
+        if self._oxapay is None:
+            self._oxapay = OxaPayService(
+                merchant_api_key=config.oxapay.merchant_api_key,
+                payout_api_key=config.oxapay.payout_api_key,
+                webhook_secret=config.oxapay.webhook_secret,
+            )
+        return self._oxapay
+    
+    async def _fetch(self) -> Optional[CustodySnapshot]:
+        oxapay = self._service()
+        try:
+            balances, prices = await asyncio.gather(oxapay.get_balance(), oxapay.get_prices())
+        except Exception as e:
+            logger.error(f"Custody snapshot refresh failed: {e}")
+            return self._snapshot
+        
+        if not balances and self._snapshot is not None:
+            # Empty response means the call failed - keep the last good balances
+            logger.warning("Custody balance fetch returned no data, keeping previous snapshot")
+            return self._snapshot
+        
+        if self._snapshot is None or balances != self._snapshot.balances or prices != self._snapshot.prices:
+            self._version += 1
+        self._snapshot = CustodySnapshot(balances=balances, prices=prices, version=self._version)
+        return self._snapshot
+
+
+# Global custody snapshot instance
+custody_snapshot = CustodySnapshotService()
@@ -0,0 +1,127 @@
+"""
+Database connection supervisor
+Owns DB health in one place: periodic probes (also keep NeonSQL from
+closing idle connections), a single reconnect path behind a lock with
+exponential backoff, and a readiness flag that request paths can check
+without touching the connection
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+
+from prisma import Prisma
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionSupervisor:
+    PROBE_INTERVAL = 30.0
+    PROBE_TIMEOUT = 5.0
+    BACKOFF_BASE = 1.0
+    BACKOFF_MAX = 30.0
+    
+    def __init__(self) -> None:
+        self._prisma: Optional[Prisma] = None
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+        self.last_probe_at: float = 0
+        self.last_probe_ms: float = 0
+        self.last_error: Optional[str] = None
+        self.reconnects = 0
+        self.failures = 0
+    
+    def start(self, prisma: Prisma) -> None:
+        """Start the probe loop. Call after the initial connect succeeded"""
+        if self._task is not None:
+            return
+        self._prisma = prisma
+        self.ready = prisma.is_connected()
+        self._task = asyncio.create_task(self._run(), name="db-supervisor")
+        logger.info("Database supervisor started")
+    
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+    
+    def mark_unhealthy(self, reason: str = "") -> None:
+        """Flip readiness off and wake the loop to reconnect - never blocks the caller"""
+        if self.ready:
+            logger.warning(f"Database marked unhealthy: {reason}")
+        self.ready = False
+        self.last_error = reason or self.last_error
+        self._wake.set()
+    
+    def stats(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "last_probe_age_s": round(time.monotonic() - self.last_probe_at, 1) if self.last_probe_at else None,
+            "last_probe_ms": self.last_probe_ms,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.PROBE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            
+            if self.ready and await self._probe():
+                continue
+            await self._reconnect()
+    
+    async def _probe(self) -> bool:
+        if self._prisma is None:
+            return False
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._prisma.execute_raw("SELECT 1"), timeout=self.PROBE_TIMEOUT)
+        except Exception as e:
+            self.failures += 1
+            self.mark_unhealthy(f"probe failed: {e}")
+            return False
+        self.last_probe_at = time.monotonic()
+        self.last_probe_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.debug(f"Database probe OK ({self.last_probe_ms}ms)")
+        return True
+    
+    async def _reconnect(self) -> None:
+        """Reconnect with backoff until a probe succeeds. Only one reconnect runs at a time"""
+        if self._prisma is None:
+            return
+        async with self._lock:
+            attempt = 0
+            while not self.ready:
+                try:
+                    if self._prisma.is_connected():
+                        await self._prisma.disconnect()
+                except Exception:
+                    pass
+                try:
+                    await self._prisma.connect()
+                    await asyncio.wait_for(self._prisma.execute_raw("SELECT 1"), timeout=self.PROBE_TIMEOUT)
+                    self.ready = True
+                    self.reconnects += 1
+                    self.last_probe_at = time.monotonic()
+                    logger.info(f"Database reconnected after {attempt + 1} attempt(s)")
+                except Exception as e:
+                    self.failures += 1
+                    self.last_error = str(e)
+                    delay = min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** attempt)
+                    attempt += 1
+                    logger.error(f"Database reconnect failed: {e}, retrying in {delay:.0f}s")
+                    await asyncio.sleep(delay)
+
+
+# Global supervisor instance
+db_supervisor = ConnectionSupervisor()
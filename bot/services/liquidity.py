@@ -0,0 +1,132 @@
+"""
+Custody liquidity ledger
+Tracks how much of each coin the payout wallet can still send, starting
+from the custody snapshot and adjusted locally as buy orders reserve,
+release and settle amounts. Checks are in-memory, so buy screens can hide
+or reject coins without calling OxaPay
+"""
+
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
+
+from bot.services.custody import custody_snapshot
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+USD_TO_IDR = Decimal(str(config.bot.usd_to_idr))
+
+
+@dataclass
+class Reservation:
+    coin: str
+    amount: Decimal
+    active: bool = True
+
+
+class LiquidityLedger:
+    """
+    Balances are reloaded whenever the custody snapshot version changes;
+    reservations survive the reload because pending payouts are not yet
+    reflected in the custody balance. Settled payouts are subtracted locally
+    until the next snapshot catches up.
+    
+    Without a snapshot nothing is known about custody, so every check passes
+    and payouts behave as before.
+    """
+    
+    def __init__(self) -> None:
+        self._version: Optional[int] = None
+        self._balances: dict[str, Decimal] = {}
+        self._prices: dict[str, Decimal] = {}
+        self._reserved: dict[str, Decimal] = {}
+        self._capacity_idr: dict[str, Decimal] = {}
+    
+    def _sync(self) -> bool:
+        """Reload from the custody snapshot if it moved on. False when there is no snapshot yet"""
+        snapshot = custody_snapshot.snapshot
+        if snapshot is None:
+            return False
+        if snapshot.version != self._version:
+            self._version = snapshot.version
+            self._balances = {coin: Decimal(str(amount)) for coin, amount in snapshot.balances.items()}
+            self._prices = {coin: Decimal(str(price)) for coin, price in snapshot.prices.items()}
+            self._capacity_idr = {coin: self._compute_capacity(coin) for coin in self._balances}
+        return True
+    
+    def _compute_capacity(self, coin: str) -> Decimal:
+        available = self._balances.get(coin, Decimal("0")) - self._reserved.get(coin, Decimal("0"))
+        return max(available, Decimal("0")) * self._prices.get(coin, Decimal("0")) * USD_TO_IDR
+    
+    def _adjust(self, coin: str, reserved: Decimal = Decimal("0"), balance: Decimal = Decimal("0")) -> None:
+        self._reserved[coin] = self._reserved.get(coin, Decimal("0")) + reserved
+        if balance and coin in self._balances:
+            self._balances[coin] += balance
+        self._capacity_idr[coin] = self._compute_capacity(coin)
+    
+    def available(self, coin: str) -> Optional[Decimal]:
+        """Coin units free for new payouts, or None when custody is unknown"""
+        if not self._sync():
+            return None
+        return self._balances.get(coin, Decimal("0")) - self._reserved.get(coin, Decimal("0"))
+    
+    def capacity_idr(self, coin: str) -> Optional[Decimal]:
+        """Largest IDR purchase custody can cover for a coin, or None when custody is unknown"""
+        if not self._sync():
+            return None
+        return self._capacity_idr.get(coin, Decimal("0"))
+    
+    def has_capacity(self, coin: str, amount: Decimal) -> bool:
+        available = self.available(coin)
+        return available is None or amount <= available
+    
+    def filter_coins(self, coins: list, min_idr: Decimal) -> list:
+        """Drop coins whose custody capacity is below the smallest purchase"""
+        if not self._sync():
+            return coins
+        return [
+            coin for coin in coins
+            if self._capacity_idr.get(coin["symbol"] if isinstance(coin, dict) else coin, Decimal("0")) >= min_idr
+        ]
+    
+    def reserve(self, coin: str, amount: Decimal) -> Optional[Reservation]:
+        """
+        Hold amount for a pending payout. Returns None when custody cannot
+        cover it. Check and hold happen without awaiting, so concurrent
+        confirmations cannot both take the last of the stock
+        """
+        if not self.has_capacity(coin, amount):
+            return None
+        self._adjust(coin, reserved=amount)
+        return Reservation(coin=coin, amount=amount)
+    
+    def release(self, reservation: Optional[Reservation]) -> None:
+        """Return a held amount after the order or payout failed"""
+        if reservation is None or not reservation.active:
+            return
+        reservation.active = False
+        self._adjust(reservation.coin, reserved=-reservation.amount)
+    
+    def settle(self, reservation: Optional[Reservation]) -> None:
+        """Payout sent - the held amount has left custody"""
+        if reservation is None or not reservation.active:
+            return
+        reservation.active = False
+        self._adjust(reservation.coin, reserved=-reservation.amount, balance=-reservation.amount)
+    
+    def stats(self) -> dict[str, dict[str, float]]:
+        self._sync()
+        return {
+            coin: {
+                "balance": float(balance),
+                "reserved": float(self._reserved.get(coin, Decimal("0"))),
+                "capacity_idr": float(self._capacity_idr.get(coin, Decimal("0"))),
+            }
+            for coin, balance in self._balances.items()
+        }
+
+
+# Global liquidity ledger instance
+liquidity_ledger = LiquidityLedger()
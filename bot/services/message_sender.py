@@ -0,0 +1,224 @@
+"""
+Outbound Telegram message queue
+Handlers enqueue notifications and return immediately; workers deliver them
+within Telegram's global (~30 msg/s) and per-chat (~1 msg/s) limits
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+@dataclass(order=True)
+class OutboundMessage:
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    text: str = field(compare=False)
+    kwargs: dict[str, Any] = field(compare=False, default_factory=dict)
+    attempts: int = field(compare=False, default=0)
+
+
+class TokenBucket:
+    """Token bucket with lazy refill - no background timer needed"""
+    
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+    
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+    
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available. Returns 0 on success, else seconds to wait"""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+    
+    async def acquire(self, tokens: float = 1) -> None:
+        """Wait until tokens are available, then take them"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class MessageSender:
+    GLOBAL_RATE = 30.0
+    PER_CHAT_INTERVAL = 1.0
+    MAX_ATTEMPTS = 3
+    
+    def __init__(self, workers: int = 4):
+        self._queue: asyncio.PriorityQueue[OutboundMessage] = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._bucket = TokenBucket(rate=self.GLOBAL_RATE, capacity=self.GLOBAL_RATE)
+        self._chat_next_at: dict[int, float] = {}
+        self._paused_until: float = 0
+        self._delayed = 0
+        self._workers_count = workers
+        self._workers: list[asyncio.Task] = []
+        self._bot: Optional[Bot] = None
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+    
+    @property
+    def bucket(self) -> TokenBucket:
+        """Global Telegram bucket, shared with other bulk senders"""
+        return self._bucket
+    
+    def start(self, bot: Bot) -> None:
+        if self._workers:
+            return
+        self._bot = bot
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"message-sender-{i}")
+            for i in range(self._workers_count)
+        ]
+        logger.info(f"Message sender started with {self._workers_count} workers")
+    
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Flush pending messages (bounded by timeout), then stop workers"""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Message sender stopped with {self.pending()} messages pending")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+    
+    def send(self, chat_id: int, text: str, priority: Priority = Priority.NORMAL, **kwargs: Any) -> None:
+        """Enqueue a message - returns immediately, never raises on delivery errors"""
+        kwargs.setdefault("parse_mode", "HTML")
+        self._queue.put_nowait(OutboundMessage(
+            priority=int(priority),
+            seq=next(self._seq),
+            chat_id=chat_id,
+            text=text,
+            kwargs=kwargs,
+        ))
+    
+    def notify_admins(self, text: str, priority: Priority = Priority.NORMAL, **kwargs: Any) -> None:
+        """Fan out a message to every admin off the request path"""
+        for admin_id in config.bot.admin_ids:
+            self.send(admin_id, text, priority=priority, **kwargs)
+    
+    def pending(self) -> int:
+        return self._queue.qsize() + self._delayed
+    
+    async def _drain(self) -> None:
+        while True:
+            await self._queue.join()
+            if not self._delayed:
+                return
+            await asyncio.sleep(0.1)
+    
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": self.pending(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+    
+    def _requeue(self, item: OutboundMessage, delay: float) -> None:
+        self._delayed += 1
+        asyncio.get_running_loop().call_later(delay, self._put_delayed, item)
+    
+    def _put_delayed(self, item: OutboundMessage) -> None:
+        self._delayed -= 1
+        self._queue.put_nowait(item)
+    
+    async def _worker(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._deliver(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Message sender error for chat {item.chat_id}: {e}")
+            finally:
+                self._queue.task_done()
+    
+    async def _deliver(self, item: OutboundMessage) -> None:
+        now = time.monotonic()
+        
+        # Per-chat limit: push back without blocking other chats
+        chat_wait = self._chat_next_at.get(item.chat_id, 0) - now
+        if chat_wait > 0:
+            self._requeue(item, chat_wait)
+            return
+        
+        if self._paused_until > now:
+            await asyncio.sleep(self._paused_until - now)
+        
+        await self._bucket.acquire()
+        self._chat_next_at[item.chat_id] = time.monotonic() + self.PER_CHAT_INTERVAL
+        
+        if self._bot is None:
+            return
+        
+        try:
+            await self._bot.send_message(item.chat_id, item.text, **item.kwargs)
+            self.sent += 1
+        except TelegramRetryAfter as e:
+            # Flood control applies to the whole bot, not just this chat
+            self._paused_until = time.monotonic() + e.retry_after
+            self.retried += 1
+            logger.warning(f"Telegram flood control, pausing sends for {e.retry_after}s")
+            self._requeue(item, e.retry_after)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            self.failed += 1
+            logger.debug(f"Dropping message to chat {item.chat_id}: {e}")
+        except Exception as e:
+            item.attempts += 1
+            if item.attempts < self.MAX_ATTEMPTS:
+                self.retried += 1
+                self._requeue(item, 2 ** item.attempts)
+            else:
+                self.failed += 1
+                logger.error(f"Failed to send message to chat {item.chat_id}: {e}")
+        
+        self._prune_chat_limits()
+    
+    def _prune_chat_limits(self) -> None:
+        if len(self._chat_next_at) < 10000:
+            return
+        now = time.monotonic()
+        self._chat_next_at = {k: v for k, v in self._chat_next_at.items() if v > now}
+
+
+# Global sender instance
+message_sender = MessageSender()
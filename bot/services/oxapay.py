@@ -1,12 +1,15 @@
 import aiohttp
 import hashlib
 import hmac
-import json
 import time
 from decimal import Decimal
 from typing import Optional, Any
 from dataclasses import dataclass
 
+from bot.services.circuit_breaker import get_breaker
+from bot.types import NetworkInfo
+from bot.utils import json_codec
+
 
 @dataclass
 class CurrencyInfo:
@@ -29,17 +32,33 @@ class PayoutResult:
     payout_id: Optional[str] = None
     tx_hash: Optional[str] = None
     error: Optional[str] = None
+    uncertain: bool = False     # the request may have reached OxaPay - do not refund yet
 
 
 _currencies_cache: dict = {}
 _currencies_cache_time: float = 0
+# symbol -> networks, rebuilt only when the currencies payload is refetched
+_networks_cache: dict[str, list[NetworkInfo]] = {}
+_networks_source: Optional[dict] = None
 _prices_cache: dict = {}
 _prices_cache_time: float = 0
+_prices_version: int = 0
 CACHE_TTL = 30
 
+# Creating a payment or payout is not idempotent - a client-side timeout leaves the
+# outcome unknown, so these keep the full deadline instead of the adaptive one
+NON_IDEMPOTENT_ENDPOINTS = {"/v1/payment/create", "/v1/payment/static-address", "/v1/payout/create"}
+
+
+def get_prices_version() -> int:
+    """Bumped whenever the shared price snapshot changes - used to key rendered screens"""
+    return _prices_version
+
 
 class OxaPayService:
     BASE_URL = "https://api.oxapay.com"
+    PAYOUT_HISTORY_PAGE_SIZE = 100
+    PAYOUT_HISTORY_MAX_PAGES = 50     # beyond this the reconciler retries instead of refunding
     
     def __init__(self, merchant_api_key: str, payout_api_key: str, webhook_secret: str = ""):
         self.merchant_api_key = merchant_api_key
@@ -50,7 +69,8 @@ class OxaPayService:
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
             self._session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=30)
+                timeout=aiohttp.ClientTimeout(total=30),
+                json_serialize=json_codec.dumps,
             )
         return self._session
     
@@ -65,6 +85,11 @@ class OxaPayService:
         data: Optional[dict] = None,
         use_payout_key: bool = False
     ) -> dict:
+        breaker = get_breaker(f"oxapay:{endpoint}")
+        if not breaker.allow():
+            # Fail fast instead of holding the handler while OxaPay is down
+            return {"status": 0, "error": "circuit open"}
+        
         session = await self._get_session()
         url = f"{self.BASE_URL}{endpoint}"
         
@@ -74,16 +99,26 @@ class OxaPayService:
             "merchant_api_key": api_key
         }
         
+        deadline = breaker.default_timeout if endpoint in NON_IDEMPOTENT_ENDPOINTS else breaker.timeout()
+        timeout = aiohttp.ClientTimeout(total=deadline)
+        started = time.perf_counter()
         try:
             if method == "GET":
-                async with session.get(url, headers=headers) as resp:
-                    return await resp.json()
+                async with session.get(url, params=data, headers=headers, timeout=timeout) as resp:
+                    result = json_codec.loads(await resp.read())
             else:
                 payload = data or {}
-                async with session.post(url, json=payload, headers=headers) as resp:
-                    return await resp.json()
+                async with session.post(url, json=payload, headers=headers, timeout=timeout) as resp:
+                    result = json_codec.loads(await resp.read())
         except Exception as e:
+            breaker.record_failure()
             return {"status": 0, "error": str(e)}
+        
+        if resp.status >= 500 or resp.status == 429:
+            breaker.record_failure()
+        else:
+            breaker.record_success(time.perf_counter() - started)
+        return result
     
     async def get_currencies(self, force_refresh: bool = False) -> dict:
         global _currencies_cache, _currencies_cache_time
@@ -117,46 +152,46 @@ class OxaPayService:
         
         return coins
     
-    async def get_coin_networks(self, symbol: str) -> list[dict]:
+    async def get_coin_networks(self, symbol: str) -> list[NetworkInfo]:
+        global _networks_source
         currencies = await self.get_currencies()
         
+        if currencies is not _networks_source:
+            _networks_cache.clear()
+            _networks_source = currencies
+        
+        cached = _networks_cache.get(symbol)
+        if cached is not None:
+            return cached
+        
         if symbol not in currencies:
             return []
         
         networks = currencies[symbol].get("networks", {})
-        result = []
-        
-        for network_key, network_data in networks.items():
-            result.append({
-                "network": network_data.get("network", network_key),
-                "name": network_data.get("name", network_key),
-                "withdraw_fee": Decimal(str(network_data.get("withdraw_fee", 0))),
-                "withdraw_min": Decimal(str(network_data.get("withdraw_min", 0))),
-                "deposit_min": Decimal(str(network_data.get("deposit_min", 0))),
-            })
-        
+        result = [
+            NetworkInfo.from_oxapay(network_key, network_data)
+            for network_key, network_data in networks.items()
+        ]
+        _networks_cache[symbol] = result
         return result
     
     async def get_prices(self) -> dict:
         """Get all crypto prices in USD"""
-        global _prices_cache, _prices_cache_time
+        global _prices_cache, _prices_cache_time, _prices_version
         
         now = time.time()
         if _prices_cache and (now - _prices_cache_time) < CACHE_TTL:
             return _prices_cache
         
-        session = await self._get_session()
-        url = f"{self.BASE_URL}/v1/common/prices"
-        
-        try:
-            async with session.get(url) as resp:
-                result = await resp.json()
-                if result.get("status") == 200:
-                    _prices_cache = result.get("data", {})
-                    _prices_cache_time = now
-                    return _prices_cache
-        except Exception:
-            pass
+        # Goes through the breaker - while OxaPay is down the last prices are served at once
+        result = await self._request("GET", "/v1/common/prices")
+        if result.get("status") == 200:
+            data = result.get("data", {})
+            if data != _prices_cache:
+                _prices_version += 1
+            _prices_cache = data
+            _prices_cache_time = now
+            return _prices_cache
         return _prices_cache or {}
     
     async def get_exchange_rate(self, from_currency: str, to_currency: str = "USD") -> Optional[Decimal]:
@@ -267,9 +302,55 @@ class OxaPayService:
         
         return PayoutResult(
             success=False,
-            error=result.get("message", "Unknown error")
+            error=result.get("message") or result.get("error") or "Unknown error",
+            # A transport error after sending leaves the outcome unknown; an open circuit never sent it
+            uncertain=result.get("status") == 0 and result.get("error") != "circuit open",
         )
     
+    async def find_payout(self, address: str, currency: str, description: str) -> Optional[dict]:
+        """
+        Look a payout up in the payout history by its description, paging
+        through every payout to the address. None only after the whole
+        history was read; raises when it cannot be, or the scan may have
+        missed pages, since "not found" must never be guessed
+        """
+        size = self.PAYOUT_HISTORY_PAGE_SIZE
+        seen = 0
+        for page in range(1, self.PAYOUT_HISTORY_MAX_PAGES + 1):
+            result = await self._request(
+                "GET",
+                "/v1/payout",
+                {"address": address, "currency": currency, "size": size, "page": page},
+                use_payout_key=True
+            )
+            
+            if result.get("status") != 200:
+                raise RuntimeError(result.get("message") or result.get("error") or "payout history unavailable")
+            
+            data = result.get("data") or {}
+            items = data.get("list", []) if isinstance(data, dict) else data
+            meta = (data.get("meta") or {}) if isinstance(data, dict) else {}
+            for item in items:
+                if item.get("description") == description:
+                    return item
+            seen += len(items)
+            
+            last_page = meta.get("last_page")
+            total = meta.get("total")
+            if last_page is not None and page < int(last_page):
+                continue
+            if total is not None:
+                if seen >= int(total):
+                    return None
+                if last_page is not None or not items:
+                    raise RuntimeError(f"payout history incomplete: read {seen} of {total}")
+                continue
+            if last_page is not None or len(items) < size:
+                # Last page by the page count, or a short page with no counts given
+                return None
+        
+        raise RuntimeError(f"payout history longer than {self.PAYOUT_HISTORY_MAX_PAGES} pages")
+    
     async def get_payment_status(self, track_id: str) -> dict:
         result = await self._request(
             "POST",
@@ -295,18 +376,18 @@ class OxaPayService:
         
         return {}
     
-    def verify_webhook(self, payload: dict, signature: str) -> bool:
-        if not self.webhook_secret:
+    def verify_webhook(self, raw_body: bytes, signature: str) -> bool:
+        """HMAC-SHA512 over the request body exactly as received"""
+        if not self.webhook_secret or not signature:
             return False
         
-        sorted_payload = json.dumps(payload, sort_keys=True, separators=(',', ':'))
         expected_sig = hmac.new(
             self.webhook_secret.encode(),
-            sorted_payload.encode(),
+            raw_body,
             hashlib.sha512
         ).hexdigest()
         
-        return hmac.compare_digest(expected_sig, signature)
+        return hmac.compare_digest(expected_sig, signature.strip().lower())
     
     async def get_balance(self, currency: Optional[str] = None, use_payout: bool = True) -> dict:
         data = {}
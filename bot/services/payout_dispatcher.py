@@ -0,0 +1,297 @@
+"""
+Buy payout dispatcher
+Buy orders enqueue their payout and return. The dispatcher collects
+payouts over a short window, groups them per (coin, network) and submits
+them through one shared OxaPay session under a request rate limit and a
+concurrency cap. Each result is written back as soon as it arrives (track
+id, or fail + refund), with retries; final payout status arrives later
+through the payout tracker.
+
+The queue is in memory, so a crash, a drain timeout or a write that keeps
+failing can leave a PROCESSING order without a track id. The reconciler
+finds those, asks OxaPay whether the payout exists, and either records its
+track id or refunds the order
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Optional
+
+from prisma import Prisma
+from prisma.enums import OrderStatus, OrderType
+
+from bot.config import config
+from bot.db.queries import record_submitted_payouts, fail_unsubmitted_buy_order
+from bot.services.custody import custody_snapshot
+from bot.services.liquidity import liquidity_ledger, Reservation
+from bot.services.message_sender import TokenBucket
+from bot.services.oxapay import OxaPayService, PayoutResult
+from bot.services.payout_tracker import notify_payout_failed
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PayoutJob:
+    order_id: str
+    user_id: str
+    wallet_address: str
+    amount: Decimal
+    coin: str
+    network: str
+    total_idr: Decimal
+    reservation: Optional[Reservation] = None
+    chat_id: Optional[int] = None
+
+
+def payout_description(order_id: str) -> str:
+    """Also the key the reconciler searches the OxaPay payout history for"""
+    return f"Order {order_id}"
+
+
+class PayoutDispatcher:
+    BATCH_WINDOW = 0.25   # seconds to keep collecting after the first payout arrives
+    MAX_BATCH = 25
+    RECORD_ATTEMPTS = 4   # per result, with exponential backoff from RECORD_BACKOFF
+    RECORD_BACKOFF = 0.5
+    RECONCILE_INTERVAL = 300.0
+    RECONCILE_GRACE = 600.0   # orders younger than this may still be queued elsewhere
+    RECONCILE_BATCH = 50
+    
+    def __init__(self, rate: float, concurrency: int):
+        self._queue: asyncio.Queue[PayoutJob] = asyncio.Queue()
+        self._bucket = TokenBucket(rate=rate, capacity=max(rate, 1))
+        self._gate = asyncio.Semaphore(concurrency)
+        self._concurrency = concurrency
+        self._db: Optional[Prisma] = None
+        self._oxapay: Optional[OxaPayService] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._reconciler: Optional[asyncio.Task] = None
+        self._batches: set[asyncio.Task] = set()
+        self._in_flight: set[str] = set()   # order ids submitted here and not yet recorded
+        self.submitted = 0
+        self.accepted = 0
+        self.failed = 0
+        self.uncertain = 0
+        self.record_errors = 0
+        self.reconciled = 0
+        self.batches = 0
+    
+    def start(self, db: Prisma) -> None:
+        if self._collector is not None:
+            return
+        self._db = db
+        self._oxapay = OxaPayService(
+            merchant_api_key=config.oxapay.merchant_api_key,
+            payout_api_key=config.oxapay.payout_api_key,
+            webhook_secret=config.oxapay.webhook_secret,
+        )
+        self._collector = asyncio.create_task(self._collect(), name="payout-dispatcher")
+        self._reconciler = asyncio.create_task(self._reconcile_loop(), name="payout-reconciler")
+        logger.info(f"Payout dispatcher started (concurrency {self._concurrency}, {self._bucket.rate:g} req/s)")
+    
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Submit what is queued and wait for in-flight batches (bounded by timeout)"""
+        if self._collector is None:
+            return
+        try:
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            # Left PROCESSING without a track id - the reconciler refunds them on the next start
+            logger.warning(f"Payout dispatcher stopped with {self.pending()} payouts pending")
+        for task in (self._collector, self._reconciler):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(t for t in (self._collector, self._reconciler) if t), return_exceptions=True)
+        self._collector = None
+        self._reconciler = None
+        if self._oxapay is not None:
+            await self._oxapay.close()
+    
+    def submit(self, job: PayoutJob) -> None:
+        """Enqueue a payout - returns immediately"""
+        if self._collector is None:
+            raise RuntimeError("Payout dispatcher is not started")
+        self.submitted += 1
+        self._in_flight.add(job.order_id)
+        self._queue.put_nowait(job)
+    
+    def pending(self) -> int:
+        return self._queue.qsize()
+    
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending": self.pending(),
+            "in_flight_batches": len(self._batches),
+            "submitted": self.submitted,
+            "accepted": self.accepted,
+            "failed": self.failed,
+            "uncertain": self.uncertain,
+            "record_errors": self.record_errors,
+            "reconciled": self.reconciled,
+            "batches": self.batches,
+        }
+    
+    async def _drain(self) -> None:
+        while self._queue.qsize() or self._batches:
+            await asyncio.sleep(0.1)
+    
+    async def _collect(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.BATCH_WINDOW
+            while len(batch) < self.MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Keep collecting while this batch is out - the gate and bucket bound the API load
+            task = asyncio.create_task(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+    
+    async def _dispatch(self, batch: list[PayoutJob]) -> None:
+        self.batches += 1
+        groups: dict[tuple[str, str], list[PayoutJob]] = {}
+        for job in batch:
+            groups.setdefault((job.coin, job.network), []).append(job)
+        
+        await asyncio.gather(*(self._submit_group(jobs) for jobs in groups.values()))
+        custody_snapshot.request_refresh()
+    
+    async def _submit_group(self, jobs: list[PayoutJob]) -> None:
+        """
+        OxaPay has no bulk payout endpoint, so a group goes out as concurrent
+        single payouts. Grouping keeps the seam for a bulk call per network
+        """
+        await asyncio.gather(*(self._submit_one(job) for job in jobs))
+    
+    async def _submit_one(self, job: PayoutJob) -> None:
+        assert self._oxapay is not None
+        try:
+            async with self._gate:
+                await self._bucket.acquire()
+                try:
+                    result = await self._oxapay.create_payout(
+                        address=job.wallet_address,
+                        amount=job.amount,
+                        currency=job.coin,
+                        network=job.network,
+                        callback_url=config.oxapay.webhook_url,
+                        description=payout_description(job.order_id),
+                    )
+                except Exception as e:
+                    result = PayoutResult(success=False, error=str(e), uncertain=True)
+            
+            if result.success or result.uncertain:
+                # Possibly sent - keep the coin off the books until custody says otherwise
+                liquidity_ledger.settle(job.reservation)
+            else:
+                liquidity_ledger.release(job.reservation)
+            
+            await self._record(job, result)
+        finally:
+            self._in_flight.discard(job.order_id)
+    
+    async def _record(self, job: PayoutJob, result: PayoutResult) -> None:
+        """Write one result back right away, retrying transient DB errors"""
+        assert self._db is not None
+        if result.uncertain:
+            self.uncertain += 1
+            logger.warning(f"Payout outcome unknown for order {job.order_id}: {result.error}; left to the reconciler")
+            return
+        
+        for attempt in range(self.RECORD_ATTEMPTS):
+            try:
+                if result.success:
+                    await record_submitted_payouts(self._db, [(job.order_id, result.payout_id, result.tx_hash)])
+                    self.accepted += 1
+                    logger.info(f"Payout submitted for order {job.order_id}: {result.payout_id}")
+                else:
+                    order = await fail_unsubmitted_buy_order(self._db, job.order_id)
+                    self.failed += 1
+                    logger.error(f"Payout failed for order {job.order_id}: {result.error}")
+                    if order is not None and job.chat_id is not None:
+                        notify_payout_failed(job.chat_id, job.coin, order.fiatAmount)
+                return
+            except Exception as e:
+                if attempt + 1 == self.RECORD_ATTEMPTS:
+                    self.record_errors += 1
+                    logger.error(f"Could not record payout for order {job.order_id}, left to the reconciler: {e}")
+                    return
+                await asyncio.sleep(self.RECORD_BACKOFF * 2 ** attempt)
+    
+    async def _reconcile_loop(self) -> None:
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Payout reconciliation failed: {e}")
+            await asyncio.sleep(self.RECONCILE_INTERVAL)
+    
+    async def reconcile(self) -> int:
+        """
+        Settle PROCESSING buy orders that never got a track id. A payout found
+        in the OxaPay history gets its track id recorded (the tracker takes it
+        from there); one OxaPay has never seen is refunded. Orders whose
+        history lookup fails are retried on the next pass. Returns how many
+        orders were settled
+        """
+        assert self._db is not None and self._oxapay is not None
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.RECONCILE_GRACE)
+        orders = await self._db.cryptoorder.find_many(
+            where={
+                "orderType": OrderType.BUY,
+                "status": OrderStatus.PROCESSING,
+                "oxapayPayoutId": None,
+                "createdAt": {"lt": cutoff},
+            },
+            include={"user": True},
+            order={"createdAt": "asc"},
+            take=self.RECONCILE_BATCH,
+        )
+        
+        settled = 0
+        for order in orders:
+            if order.id in self._in_flight or not order.walletAddress:
+                continue
+            await self._bucket.acquire()
+            try:
+                payout = await self._oxapay.find_payout(order.walletAddress, order.coinSymbol, payout_description(order.id))
+            except Exception as e:
+                logger.warning(f"Payout history lookup failed for order {order.id}: {e}")
+                continue
+            
+            if payout is not None:
+                track_id = payout.get("trackId") or payout.get("track_id")
+                tx_hash = payout.get("txHash") or payout.get("tx_hash")
+                await record_submitted_payouts(self._db, [(order.id, track_id, tx_hash)])
+                logger.info(f"Reconciled order {order.id}: payout {track_id} found at OxaPay")
+            else:
+                refunded = await fail_unsubmitted_buy_order(self._db, order.id)
+                if refunded is None:
+                    continue
+                logger.warning(f"Reconciled order {order.id}: no payout at OxaPay, refunded {refunded.fiatAmount}")
+                if refunded.user is not None:
+                    notify_payout_failed(refunded.user.telegramId, refunded.coinSymbol, refunded.fiatAmount)
+            settled += 1
+        
+        self.reconciled += settled
+        if settled:
+            custody_snapshot.request_refresh()
+        return settled
+
+
+# Global payout dispatcher instance
+payout_dispatcher = PayoutDispatcher(
+    rate=config.oxapay.payout_rate,
+    concurrency=config.oxapay.payout_concurrency,
+)
@@ -0,0 +1,255 @@
+"""
+Payout status tracking
+Buy payouts stay PROCESSING until OxaPay reports a final status, either
+through the payout callback or, when the callback is overdue, through a
+small rate-limited poll. Final states book the transaction or refund the
+user, and the user is notified through the outbound message queue
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Optional
+
+from prisma import Prisma, Json
+from prisma.enums import OrderStatus, OrderType, TransactionStatus, TransactionType
+from prisma.models import CryptoOrder
+
+from bot.config import config
+from bot.db.queries import update_balance
+from bot.formatters.messages import Emoji, format_currency
+from bot.services.custody import custody_snapshot
+from bot.services.message_sender import message_sender, TokenBucket
+from bot.services.oxapay import OxaPayService
+
+logger = logging.getLogger(__name__)
+
+COMPLETED_STATUSES = {"complete", "completed", "confirmed", "paid", "success"}
+FAILED_STATUSES = {"rejected", "failed", "canceled", "cancelled", "expired", "refunded"}
+
+
+@dataclass
+class PayoutUpdate:
+    track_id: str
+    status: str
+    tx_hash: Optional[str] = None
+    confirmations: Optional[int] = None
+    
+    @classmethod
+    def from_oxapay(cls, track_id: str, data: dict) -> "PayoutUpdate":
+        """Callback bodies and /payout/info responses name the hash differently"""
+        confirmations = data.get("confirmations")
+        return cls(
+            track_id=track_id,
+            status=str(data.get("status", "")).lower(),
+            tx_hash=data.get("txHash") or data.get("txID") or data.get("tx_hash") or None,
+            confirmations=int(confirmations) if confirmations is not None else None,
+        )
+    
+    @property
+    def is_completed(self) -> bool:
+        return self.status in COMPLETED_STATUSES
+    
+    @property
+    def is_failed(self) -> bool:
+        return self.status in FAILED_STATUSES
+
+
+def notify_payout_failed(chat_id: int, coin: str, refund_idr: Decimal) -> None:
+    message_sender.send(
+        chat_id,
+        f"<b>Pembelian Gagal</b> {Emoji.CROSS}\n\n"
+        f"Pengiriman {coin} tidak dapat diproses.\n"
+        f"{format_currency(refund_idr)} telah dikembalikan ke saldo Anda."
+    )
+
+
+class PayoutTracker:
+    CALLBACK_GRACE = 300.0   # seconds without news before an order is polled
+    POLL_INTERVAL = 60.0
+    POLL_BATCH = 20
+    POLL_RATE = 2.0          # payout/info requests per second
+    
+    def __init__(self) -> None:
+        self._bucket = TokenBucket(rate=self.POLL_RATE, capacity=self.POLL_RATE)
+        self._db: Optional[Prisma] = None
+        self._oxapay: Optional[OxaPayService] = None
+        self._task: Optional[asyncio.Task] = None
+        self.callbacks = 0
+        self.polled = 0
+        self.completed = 0
+        self.failed = 0
+    
+    def start(self, db: Prisma) -> None:
+        if self._task is not None:
+            return
+        self._db = db
+        self._oxapay = OxaPayService(
+            merchant_api_key=config.oxapay.merchant_api_key,
+            payout_api_key=config.oxapay.payout_api_key,
+            webhook_secret=config.oxapay.webhook_secret,
+        )
+        self._task = asyncio.create_task(self._poll_loop(), name="payout-tracker")
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._oxapay is not None:
+            await self._oxapay.close()
+    
+    def stats(self) -> dict[str, Any]:
+        return {
+            "callbacks": self.callbacks,
+            "polled": self.polled,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+    
+    async def handle_callback(self, db: Prisma, track_id: str, body: dict) -> bool:
+        """Apply an OxaPay payout callback. False when no buy order matches the track id"""
+        self.callbacks += 1
+        order = await db.cryptoorder.find_first(
+            where={"oxapayPayoutId": track_id, "orderType": OrderType.BUY},
+            include={"user": True},
+        )
+        if order is None:
+            logger.warning(f"Payout callback for unknown trackId {track_id}")
+            return False
+        await self._apply(db, order, PayoutUpdate.from_oxapay(track_id, body))
+        return True
+    
+    async def poll_overdue(self) -> int:
+        """Check payouts whose callback is overdue, oldest first. Returns how many were checked"""
+        assert self._db is not None and self._oxapay is not None
+        db = self._db
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.CALLBACK_GRACE)
+        orders = await db.cryptoorder.find_many(
+            where={
+                "orderType": OrderType.BUY,
+                "status": OrderStatus.PROCESSING,
+                "oxapayPayoutId": {"not": None},
+                "updatedAt": {"lt": cutoff},
+            },
+            include={"user": True},
+            order={"updatedAt": "asc"},
+            take=self.POLL_BATCH,
+        )
+        if not orders:
+            return 0
+        
+        statuses = await asyncio.gather(*(self._fetch_status(order.oxapayPayoutId or "") for order in orders))
+        self.polled += len(orders)
+        
+        unanswered = []
+        for order, data in zip(orders, statuses):
+            if not data:
+                unanswered.append(order.id)
+                continue
+            await self._apply(db, order, PayoutUpdate.from_oxapay(order.oxapayPayoutId or "", data))
+        
+        if unanswered:
+            # Send them to the back of the line so one bad payout cannot starve the rest
+            await db.cryptoorder.update_many(
+                where={"id": {"in": unanswered}},
+                data={"updatedAt": datetime.now(timezone.utc)},
+            )
+        return len(orders)
+    
+    async def _poll_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.POLL_INTERVAL)
+            try:
+                await self.poll_overdue()
+            except Exception as e:
+                logger.error(f"Payout status poll failed: {e}")
+    
+    async def _fetch_status(self, track_id: str) -> dict:
+        assert self._oxapay is not None
+        await self._bucket.acquire()
+        try:
+            return await self._oxapay.get_payout_status(track_id)
+        except Exception as e:
+            logger.warning(f"Payout status check failed for {track_id}: {e}")
+            return {}
+    
+    async def _apply(self, db: Prisma, order: CryptoOrder, update: PayoutUpdate) -> None:
+        if order.status != OrderStatus.PROCESSING:
+            # Already final - callback and poll can both report the same payout
+            return
+        
+        data: dict[str, Any] = {}
+        if update.tx_hash:
+            data["txHash"] = update.tx_hash
+        if update.confirmations is not None:
+            data["confirmations"] = update.confirmations
+        
+        if update.is_completed:
+            await self._complete(db, order, data)
+        elif update.is_failed:
+            await self._fail(db, order, update.status)
+        else:
+            # Still in flight - record progress; the write also resets the poll timer
+            await db.cryptoorder.update(
+                where={"id": order.id},
+                data={**data, "updatedAt": datetime.now(timezone.utc)},
+            )
+    
+    async def _complete(self, db: Prisma, order: CryptoOrder, data: dict[str, Any]) -> None:
+        async with db.tx() as tx:
+            # Conditional on PROCESSING so a concurrent callback and poll book it once
+            moved = await tx.cryptoorder.update_many(
+                where={"id": order.id, "status": OrderStatus.PROCESSING},
+                data={**data, "status": OrderStatus.COMPLETED},
+            )
+            if not moved:
+                return
+            await tx.transaction.create(
+                data={
+                    "userId": order.userId,
+                    "type": TransactionType.BUY,
+                    "amount": order.fiatAmount,
+                    "status": TransactionStatus.COMPLETED,
+                    "description": f"Beli {order.cryptoAmount:.8f} {order.coinSymbol}",
+                    "metadata": Json({"orderId": order.id}),
+                }
+            )
+        
+        self.completed += 1
+        tx_hash = data.get("txHash") or order.txHash
+        logger.info(f"Payout confirmed for order {order.id}: {tx_hash}")
+        
+        if order.user is not None:
+            text = (
+                f"<b>Pembelian Selesai</b> {Emoji.CHECK}\n\n"
+                f"{format_currency(order.cryptoAmount, order.coinSymbol)} telah dikirim ke "
+                f"<code>{order.walletAddress}</code>"
+            )
+            if tx_hash:
+                text += f"\nTX: <code>{tx_hash}</code>"
+            message_sender.send(order.user.telegramId, text)
+    
+    async def _fail(self, db: Prisma, order: CryptoOrder, status: str) -> None:
+        async with db.tx() as tx:
+            moved = await tx.cryptoorder.update_many(
+                where={"id": order.id, "status": OrderStatus.PROCESSING},
+                data={"status": OrderStatus.FAILED},
+            )
+            if not moved:
+                return
+            await update_balance(tx, order.userId, order.fiatAmount)
+        
+        self.failed += 1
+        logger.error(f"Payout {status} for order {order.id}, refunded {order.fiatAmount}")
+        # The coin never left custody after all
+        custody_snapshot.request_refresh()
+        
+        if order.user is not None:
+            notify_payout_failed(order.user.telegramId, order.coinSymbol, order.fiatAmount)
+
+
+# Global payout tracker instance
+payout_tracker = PayoutTracker()
@@ -0,0 +1,226 @@
+"""
+Transaction PIN hashing and verification
+PINs are hashed with salted scrypt. The KDF is deliberately slow, so it
+runs in a small bounded thread pool instead of on the event loop. Legacy
+unsalted SHA-256 hashes still verify and are rewritten as scrypt on the
+first successful check. Failed attempts are counted per user and lock
+verification for a while once they pile up.
+
+A successful check opens a short verified session, so a burst of
+confirmations costs one KDF run. The hash itself comes from the cached
+user snapshot; PIN changes made here override it until that cache expires
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from cachetools import TTLCache
+from prisma import Prisma
+
+from bot.config import config
+from bot.types import UserSnapshot
+
+logger = logging.getLogger(__name__)
+
+SCHEME = "scrypt"
+
+
+@dataclass(slots=True)
+class PinCheck:
+    ok: bool
+    locked_for: float = 0.0      # seconds until the user may try again
+    attempts_left: int = 0
+    
+    @property
+    def locked(self) -> bool:
+        return self.locked_for > 0
+
+
+@dataclass(slots=True)
+class _Attempts:
+    failures: int = 0
+    locked_until: float = 0.0
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+class PinService:
+    MAX_ATTEMPTS = 5
+    LOCKOUT = 900.0          # also how long failures are remembered
+    SESSION_TTL = 300.0      # verified PIN skips the prompt for this long
+    HASH_OVERRIDE_TTL = 60.0 # outlives the 30s user snapshot cache
+    SALT_BYTES = 16
+    KEY_BYTES = 32
+    R = 8
+    P = 1
+    
+    def __init__(self, n: int, workers: int):
+        self.n = n
+        self._workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._attempts: TTLCache[str, _Attempts] = TTLCache(maxsize=100000, ttl=self.LOCKOUT)
+        self._sessions: TTLCache[str, bool] = TTLCache(maxsize=100000, ttl=self.SESSION_TTL)
+        self._hashes: TTLCache[str, Optional[str]] = TTLCache(maxsize=10000, ttl=self.HASH_OVERRIDE_TTL)
+        self.hashed = 0
+        self.verified = 0
+        self.rejected = 0
+        self.locked_out = 0
+        self.upgraded = 0
+        self.session_hits = 0
+    
+    def _run(self, func, *args) -> "asyncio.Future[Any]":
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="pin-kdf")
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def _derive(self, pin: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(
+            pin.encode(), salt=salt, n=n, r=r, p=p,
+            maxmem=128 * n * r * 2, dklen=self.KEY_BYTES,
+        )
+    
+    def _hash_sync(self, pin: str) -> str:
+        salt = os.urandom(self.SALT_BYTES)
+        key = self._derive(pin, salt, self.n, self.R, self.P)
+        return f"{SCHEME}${self.n}${self.R}${self.P}${_b64(salt)}${_b64(key)}"
+    
+    def _verify_sync(self, pin: str, pin_hash: str) -> bool:
+        if "$" not in pin_hash:
+            # Legacy unsalted SHA-256 hex digest
+            return hmac.compare_digest(hashlib.sha256(pin.encode()).hexdigest(), pin_hash)
+        try:
+            scheme, n, r, p, salt, key = pin_hash.split("$")
+            if scheme != SCHEME:
+                return False
+            derived = self._derive(pin, _unb64(salt), int(n), int(r), int(p))
+            return hmac.compare_digest(derived, _unb64(key))
+        except ValueError:
+            logger.error("Malformed PIN hash")
+            return False
+    
+    def needs_rehash(self, pin_hash: str) -> bool:
+        """True for legacy hashes and scrypt hashes made with other parameters"""
+        return not pin_hash.startswith(f"{SCHEME}${self.n}${self.R}${self.P}$")
+    
+    async def hash_pin(self, pin: str) -> str:
+        self.hashed += 1
+        return await self._run(self._hash_sync, pin)
+    
+    def locked_for(self, user_id: str) -> float:
+        entry = self._attempts.get(user_id)
+        if entry is None:
+            return 0.0
+        return max(0.0, entry.locked_until - time.monotonic())
+    
+    def reset(self, user_id: str) -> None:
+        self._attempts.pop(user_id, None)
+    
+    def current_hash(self, user: UserSnapshot) -> Optional[str]:
+        """The user's PIN hash, preferring a change the snapshot has not seen yet"""
+        return self._hashes.get(user.id, user.pinHash)
+    
+    def pin_changed(self, user_id: str, pin_hash: Optional[str]) -> None:
+        """Record a PIN set or removed (None) and drop any verified session"""
+        self._hashes[user_id] = pin_hash
+        self._sessions.pop(user_id, None)
+    
+    def needs_pin(self, user: UserSnapshot) -> bool:
+        """True when the user has a PIN and no verified session"""
+        if not self.current_hash(user):
+            return False
+        if user.id in self._sessions:
+            self.session_hits += 1
+            return False
+        return True
+    
+    async def verify_pin(
+        self,
+        db: Prisma,
+        user_id: str,
+        pin: str,
+        pin_hash: Optional[str],
+    ) -> PinCheck:
+        """
+        Check a PIN for a user, counting failures. A successful check opens
+        a verified session, and an outdated hash is rewritten in the background
+        """
+        now = time.monotonic()
+        entry = self._attempts.get(user_id)
+        if entry is None:
+            entry = self._attempts[user_id] = _Attempts()
+        if entry.locked_until > now:
+            self.locked_out += 1
+            return PinCheck(ok=False, locked_for=entry.locked_until - now)
+        
+        # Count the attempt before hashing so parallel guesses cannot exceed the limit
+        entry.failures += 1
+        ok = pin_hash is not None and await self._run(self._verify_sync, pin, pin_hash)
+        
+        if ok:
+            self.verified += 1
+            self.reset(user_id)
+            self._sessions[user_id] = True
+            if pin_hash is not None and self.needs_rehash(pin_hash):
+                from bot.tasks.background_tasks import schedule_background_task
+                await schedule_background_task(self._upgrade(db, user_id, pin, pin_hash))
+            return PinCheck(ok=True, attempts_left=self.MAX_ATTEMPTS)
+        
+        self.rejected += 1
+        if entry.failures >= self.MAX_ATTEMPTS:
+            entry.locked_until = time.monotonic() + self.LOCKOUT
+            self._attempts[user_id] = entry   # restart the TTL so the lock outlives it
+            logger.warning(f"PIN locked for user {user_id} after {entry.failures} failed attempts")
+            return PinCheck(ok=False, locked_for=self.LOCKOUT)
+        return PinCheck(ok=False, attempts_left=self.MAX_ATTEMPTS - entry.failures)
+    
+    async def _upgrade(self, db: Prisma, user_id: str, pin: str, old_hash: str) -> None:
+        try:
+            new_hash = await self.hash_pin(pin)
+            # Conditional on the old hash so a PIN changed meanwhile is not overwritten
+            moved = await db.user.update_many(
+                where={"id": user_id, "pinHash": old_hash},
+                data={"pinHash": new_hash},
+            )
+            if moved:
+                self.upgraded += 1
+                self._hashes[user_id] = new_hash
+        except Exception as e:
+            logger.warning(f"PIN hash upgrade failed for user {user_id}: {e}")
+    
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hashed": self.hashed,
+            "verified": self.verified,
+            "rejected": self.rejected,
+            "locked_out": self.locked_out,
+            "upgraded": self.upgraded,
+            "session_hits": self.session_hits,
+            "sessions": len(self._sessions),
+            "throttled_users": sum(1 for entry in self._attempts.values() if entry.failures),
+        }
+
+
+# Global PIN service instance
+pin_service = PinService(
+    n=config.bot.pin_scrypt_n,
+    workers=config.bot.pin_hash_workers,
+)
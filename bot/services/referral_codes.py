@@ -0,0 +1,116 @@
+"""
+Referral code allocator
+Codes are a keyed Feistel permutation of a counter, so distinct counter
+values always give distinct codes that still look random. Counter values
+are reserved from a Postgres sequence in blocks by a background refill,
+so handing out a code on the signup path costs no query
+"""
+
+import asyncio
+import hashlib
+import logging
+import string
+from typing import Optional
+
+from prisma import Prisma
+
+from bot.config import config
+from bot.utils.helpers import generate_referral_code
+
+logger = logging.getLogger(__name__)
+
+ALPHABET = string.ascii_uppercase + string.digits
+CODE_LENGTH = 8
+SEQUENCE_NAME = "referral_code_seq"
+
+
+class FeistelCodec:
+    """Bijection on [0, 2**(2*HALF_BITS)) rendered as a fixed-length base36 code"""
+    
+    HALF_BITS = 20   # 40-bit domain, ~1.1e12 codes - fits in 8 base36 chars (36**8 ~ 2.8e12)
+    ROUNDS = 4
+    
+    def __init__(self, key: str):
+        digest = hashlib.sha256(key.encode()).digest()
+        self._round_keys = [int.from_bytes(digest[i * 4:(i + 1) * 4], "big") for i in range(self.ROUNDS)]
+        self._mask = (1 << self.HALF_BITS) - 1
+    
+    def _round(self, value: int, round_key: int) -> int:
+        h = hashlib.blake2b(
+            (value ^ round_key).to_bytes(8, "big"),
+            digest_size=4,
+        ).digest()
+        return int.from_bytes(h, "big") & self._mask
+    
+    def permute(self, n: int) -> int:
+        left, right = n >> self.HALF_BITS, n & self._mask
+        for round_key in self._round_keys:
+            left, right = right, left ^ self._round(right, round_key)
+        return (left << self.HALF_BITS) | right
+    
+    def encode(self, n: int) -> str:
+        value = self.permute(n)
+        chars = []
+        for _ in range(CODE_LENGTH):
+            value, rem = divmod(value, len(ALPHABET))
+            chars.append(ALPHABET[rem])
+        return "".join(reversed(chars))
+
+
+class ReferralCodeAllocator:
+    BLOCK_SIZE = 100
+    LOW_WATERMARK = 20
+    
+    def __init__(self, key: str):
+        self._codec = FeistelCodec(key)
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._db: Optional[Prisma] = None
+    
+    async def start(self, db: Prisma) -> None:
+        """Reserve the first block. The sequence comes from a migration, INCREMENT BY BLOCK_SIZE"""
+        self._db = db
+        await self._refill()
+    
+    def remaining(self) -> int:
+        return self._end - self._next
+    
+    async def allocate(self, db: Prisma) -> str:
+        """Next unique code. Served from memory; only a cold or exhausted block touches the DB"""
+        if self._db is None:
+            self._db = db
+        if self.remaining() <= 0:
+            await self._refill()
+        if self.remaining() <= 0:
+            # Sequence unavailable - fall back to a random code, the unique index still guards it
+            return generate_referral_code(CODE_LENGTH)
+        
+        n = self._next
+        self._next += 1
+        if self.remaining() < self.LOW_WATERMARK:
+            self._schedule_refill()
+        return self._codec.encode(n)
+    
+    def _schedule_refill(self) -> None:
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+    
+    async def _refill(self) -> None:
+        async with self._lock:
+            if self.remaining() >= self.LOW_WATERMARK or self._db is None:
+                return
+            try:
+                rows = await self._db.query_raw(f"SELECT nextval('{SEQUENCE_NAME}') AS start")
+            except Exception as e:
+                logger.error(f"Failed to reserve referral code block: {e}")
+                return
+            start = int(rows[0]["start"])
+            # The unused tail of the current block is dropped; gaps are harmless
+            self._next, self._end = start, start + self.BLOCK_SIZE
+            logger.debug(f"Reserved referral code block {start}..{self._end - 1}")
+
+
+# Global allocator instance
+referral_code_allocator = ReferralCodeAllocator(config.bot.referral_code_key)
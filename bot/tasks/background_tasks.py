@@ -5,92 +5,15 @@ Allows handlers to respond quickly while processing continues asynchronously
 
 import asyncio
 import logging
-from decimal import Decimal
 from typing import Optional
 from datetime import datetime, timedelta
-from prisma import Prisma, Json
-from prisma.enums import OrderStatus, TransactionStatus, TransactionType
 from bot.services.oxapay import OxaPayService
-from bot.db.queries import update_balance
 from bot.config import config
 
 logger = logging.getLogger(__name__)
 
-
-async def process_payout_async(
-    db: Prisma,
-    order_id: str,
-    user_id: str,
-    wallet_address: str,
-    amount: Decimal,
-    coin: str,
-    network: str,
-    total_idr: Decimal,
-):
-    """
-    Process crypto payout in background
-    Called AFTER immediate response to user
-    Reduces response time from 700-900ms to 100-200ms
-    """
-    try:
-        oxapay = OxaPayService(
-            merchant_api_key=config.oxapay.merchant_api_key,
-            payout_api_key=config.oxapay.payout_api_key,
-            webhook_secret=config.oxapay.webhook_secret,
-        )
-        
-        try:
-            # THIS IS THE HEAVY OPERATION - now in background
-            result = await oxapay.create_payout(
-                address=wallet_address,
-                amount=amount,
-                currency=coin,
-                network=network,
-                description=f"Order {order_id}",
-            )
-            
-            if result.success:
-                # Update order status to completed
-                await db.cryptoorder.update(
-                    where={"id": order_id},
-                    data={
-                        "status": OrderStatus.COMPLETED,
-                        "oxapayPayoutId": result.payout_id,
-                        "txHash": result.tx_hash,
-                    }
-                )
-                
-                # Create transaction record
-                await db.transaction.create(
-                    data={
-                        "userId": user_id,
-                        "type": TransactionType.BUY,
-                        "amount": total_idr,
-                        "status": TransactionStatus.COMPLETED,
-                        "description": f"Beli {amount:.8f} {coin}",
-                        "metadata": Json({"orderId": order_id}),
-                    }
-                )
-                
-                logger.info(f"Payout completed for order {order_id}: {result.tx_hash}")
-            else:
-                # Payout failed - refund user
-                await update_balance(db, user_id, total_idr)
-                await db.cryptoorder.update(
-                    where={"id": order_id},
-                    data={"status": OrderStatus.FAILED}
-                )
-                logger.error(f"Payout failed for order {order_id}: {result.error}")
-        finally:
-            await oxapay.close()
-    except Exception as e:
-        logger.error(f"Error in background payout: {str(e)}")
-        # Refund user if anything goes wrong
-        await update_balance(db, user_id, total_idr)
-        await db.cryptoorder.update(
-            where={"id": order_id},
-            data={"status": OrderStatus.FAILED}
-        )
+# Event-loop scheduling lag (how late a sleep wakes up) - exposed at /metrics
+loop_lag_stats: dict[str, float] = {"last_ms": 0.0, "max_ms": 0.0, "avg_ms": 0.0}
 
 
 async def schedule_background_task(coro):
@@ -158,30 +81,81 @@ async def refresh_coins_cache_worker():
             logger.error(f"Error in coins cache refresh worker: {str(e)}")
 
 
-async def database_keepalive_worker(prisma: Prisma):
+async def warm_cryptobot_rates_cache():
     """
-    Ping database every 60 seconds to keep connection alive.
-    Prevents NeonSQL from closing idle connections.
+    Pre-populate the shared CryptoBot rate snapshot on startup
+    Deposit handlers then create invoices without a getExchangeRates round-trip
     """
+    from bot.services.cryptobot import CryptoBotService
+    
+    if not config.cryptobot.api_token:
+        return
+    
+    try:
+        cryptobot = CryptoBotService(
+            api_token=config.cryptobot.api_token,
+            margin=config.cryptobot.margin,
+        )
+        
+        try:
+            rates = await cryptobot.get_exchange_rates(force_refresh=True)
+            logger.info(f"CryptoBot rates cache warmed: {len(rates)} rates loaded")
+        finally:
+            await cryptobot.close()
+    except Exception as e:
+        logger.error(f"Failed to warm CryptoBot rates cache: {str(e)}")
+
+
+async def refresh_cryptobot_rates_worker():
+    """
+    Background worker that refreshes the CryptoBot rate snapshot every 60 seconds
+    Refresh interval is below RATES_CACHE_TTL so handlers never hit an expired snapshot
+    """
+    from bot.services.cryptobot import CryptoBotService
+    
+    if not config.cryptobot.api_token:
+        return
+    
     while True:
         try:
             await asyncio.sleep(60)
             
-            if prisma.is_connected():
-                await prisma.execute_raw("SELECT 1")
-                logger.debug("Database keepalive ping OK")
-            else:
-                logger.warning("Database not connected, reconnecting...")
-                await prisma.connect()
-                logger.info("Database reconnected via keepalive")
-        except Exception as e:
-            logger.warning(f"Database keepalive error: {e}, reconnecting...")
-            try:
-                await prisma.disconnect()
-            except Exception:
-                pass
+            cryptobot = CryptoBotService(
+                api_token=config.cryptobot.api_token,
+                margin=config.cryptobot.margin,
+            )
+            
             try:
-                await prisma.connect()
-                logger.info("Database reconnected after keepalive error")
-            except Exception as re:
-                logger.error(f"Failed to reconnect database: {re}")
+                rates = await cryptobot.get_exchange_rates(force_refresh=True)
+                logger.debug(f"CryptoBot rates cache refreshed: {len(rates)} rates")
+            finally:
+                await cryptobot.close()
+        except Exception as e:
+            logger.error(f"Error in CryptoBot rates refresh worker: {str(e)}")
+
+
+async def event_loop_lag_monitor(interval: float = 0.5):
+    """
+    Measure how late the event loop wakes a sleeping task.
+    Anything blocking the loop (sync I/O, heavy formatting) shows up as lag.
+    """
+    loop = asyncio.get_running_loop()
+    window_max = 0.0
+    window_start = loop.time()
+    
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag_ms = max(0.0, (loop.time() - expected) * 1000)
+        
+        loop_lag_stats["last_ms"] = round(lag_ms, 2)
+        loop_lag_stats["avg_ms"] = round(loop_lag_stats["avg_ms"] * 0.95 + lag_ms * 0.05, 2)
+        window_max = max(window_max, lag_ms)
+        
+        # Max over a rolling ~60s window
+        if loop.time() - window_start >= 60:
+            loop_lag_stats["max_ms"] = round(window_max, 2)
+            window_max = 0.0
+            window_start = loop.time()
+        else:
+            loop_lag_stats["max_ms"] = round(max(loop_lag_stats["max_ms"], window_max), 2)
@@ -1,12 +1,16 @@
 """
 Type definitions for the bot.
-Uses Prisma's generated models for proper typing.
+Uses Prisma's generated models for proper typing, plus compact slotted
+records for what the caches keep. The records use the Prisma field names
+so handlers read them exactly like the models.
 """
-from typing import Optional, TYPE_CHECKING
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional, TYPE_CHECKING
 from decimal import Decimal
 
 if TYPE_CHECKING:
-    from prisma.models import User, Balance, CryptoOrder, Deposit, Withdrawal
+    from prisma.models import User, Balance, CryptoOrder, Deposit, Withdrawal, CoinSetting
     from prisma.enums import UserStatus, OrderStatus, TransactionStatus
 
 # Re-export Prisma models for convenience
@@ -29,3 +33,92 @@ class UserWithBalance:
     referralCode: str
     status: str
     balance: Optional["Balance"]
+
+
+@dataclass(slots=True)
+class BalanceSnapshot:
+    amount: Decimal
+    
+    @classmethod
+    def from_model(cls, balance: "Balance") -> "BalanceSnapshot":
+        return cls(amount=balance.amount)
+
+
+@dataclass(slots=True)
+class UserSnapshot:
+    """The user fields handlers read, cached per Telegram ID by UserStatusMiddleware"""
+    id: str
+    telegramId: int
+    username: Optional[str]
+    firstName: Optional[str]
+    status: str
+    referralCode: str
+    referralCount: int
+    referralBonusTotal: Decimal
+    pinHash: Optional[str]
+    lastActiveAt: datetime
+    balance: Optional[BalanceSnapshot]
+    
+    @classmethod
+    def from_model(cls, user: "User") -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            telegramId=user.telegramId,
+            username=user.username,
+            firstName=user.firstName,
+            status=user.status,
+            referralCode=user.referralCode,
+            referralCount=user.referralCount,
+            referralBonusTotal=user.referralBonusTotal,
+            pinHash=user.pinHash,
+            lastActiveAt=user.lastActiveAt,
+            balance=BalanceSnapshot.from_model(user.balance) if user.balance else None,
+        )
+
+
+@dataclass(slots=True)
+class CoinQuote:
+    """Admin-configured trading terms for one coin on one network (a CoinSetting row)"""
+    coinSymbol: str
+    network: str
+    buyMargin: Decimal
+    sellMargin: Decimal
+    minBuy: Decimal
+    maxBuy: Decimal
+    minSell: Decimal
+    maxSell: Decimal
+    isActive: bool
+    
+    @classmethod
+    def from_model(cls, setting: "CoinSetting") -> "CoinQuote":
+        return cls(
+            coinSymbol=setting.coinSymbol,
+            network=setting.network,
+            buyMargin=setting.buyMargin,
+            sellMargin=setting.sellMargin,
+            minBuy=setting.minBuy,
+            maxBuy=setting.maxBuy,
+            minSell=setting.minSell,
+            maxSell=setting.maxSell,
+            isActive=setting.isActive,
+        )
+
+
+@dataclass(slots=True)
+class NetworkInfo:
+    """One OxaPay network for a coin, with its payout fee and limits in coin units"""
+    network: str
+    name: str
+    withdraw_fee: Decimal
+    withdraw_min: Decimal
+    deposit_min: Decimal
+    
+    @classmethod
+    def from_oxapay(cls, key: str, data: dict[str, Any]) -> "NetworkInfo":
+        return cls(
+            network=data.get("network", key),
+            name=data.get("name", key),
+            withdraw_fee=Decimal(str(data.get("withdraw_fee", 0))),
+            withdraw_min=Decimal(str(data.get("withdraw_min", 0))),
+            deposit_min=Decimal(str(data.get("deposit_min", 0))),
+        )
@@ -0,0 +1,46 @@
+"""
+JSON codec for HTTP traffic
+Uses orjson or msgspec when installed and falls back to the stdlib.
+The payment clients, the aiogram session and the webhook server all take
+dumps/loads from here. JSON_CODEC=stdlib forces the fallback
+"""
+
+import json
+import os
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _select(preferred: str) -> tuple[str, Callable[[Any], str], Callable[[str | bytes], Any]]:
+    if orjson is not None and preferred in ("", "orjson"):
+        options = orjson.OPT_NON_STR_KEYS
+        return (
+            "orjson",
+            lambda obj: orjson.dumps(obj, option=options).decode(),
+            orjson.loads,
+        )
+    if msgspec is not None and preferred in ("", "msgspec"):
+        encoder = msgspec.json.Encoder()
+        decoder = msgspec.json.Decoder()
+        return (
+            "msgspec",
+            lambda obj: encoder.encode(obj).decode(),
+            decoder.decode,
+        )
+    return (
+        "stdlib",
+        lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":")),
+        json.loads,
+    )
+
+
+BACKEND, dumps, loads = _select(os.getenv("JSON_CODEC", "").lower())
@@ -0,0 +1,109 @@
+"""
+Non-blocking logging setup.
+Records are pushed onto an in-memory queue from the event loop and
+formatted/written by a QueueListener thread, so stdout I/O never blocks handlers.
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+# Extra fields promoted to top-level JSON keys when present on a record
+STRUCTURED_FIELDS = (
+    "user_id", "handler", "latency_ms", "queries", "db_ms",
+    "event", "data", "track_id", "order_id", "status",
+)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in STRUCTURED_FIELDS:
+            value = record.__dict__.get(key)
+            if value is not None:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that skips the full format in prepare().
+    Like the stdlib version it enqueues a copy with msg % args merged and
+    the traceback rendered to exc_text, so later mutation of args cannot
+    change the line and no exc_info/traceback objects cross threads. The
+    formatter itself (JSON encoding, timestamps) runs on the listener thread.
+    """
+    
+    _exc_formatter = logging.Formatter()
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO-and-below records; warnings and errors always pass"""
+    
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    json_format: bool = True,
+    sample_rate: float = 1.0,
+    sampled_loggers: tuple[str, ...] = ("bot.middlewares.logging", "aiogram.event"),
+) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue. Returns the started listener;
+    call listener.stop() on shutdown to flush remaining records.
+    """
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if json_format:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(
+            logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        )
+    
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(level)
+    
+    if sample_rate < 1:
+        for name in sampled_loggers:
+            logging.getLogger(name).addFilter(SamplingFilter(sample_rate))
+    
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -1,6 +1,7 @@
+import hmac
 import logging
-import json
 from decimal import Decimal
+from functools import partial, wraps
 from aiohttp import web
 from prisma import Prisma, Json
 from prisma.enums import OrderStatus, TransactionStatus, TransactionType
@@ -8,38 +9,87 @@ from prisma.enums import OrderStatus, TransactionStatus, TransactionType
 from bot.services.oxapay import OxaPayService
 from bot.db.queries import update_balance
 from bot.config import config
+from bot.utils import json_codec
 
 logger = logging.getLogger(__name__)
 
+json_response = partial(web.json_response, dumps=json_codec.dumps)
+
+DEBUG_QUERIES_MAX_LIMIT = 200
+
+
+def ops_authorized(request: web.Request) -> bool:
+    """True when the request carries the configured OPS_API_TOKEN as a bearer token"""
+    token = config.ops_token
+    if not token:
+        return False
+    scheme, _, supplied = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        return False
+    return hmac.compare_digest(supplied.strip().encode(), token.encode())
+
+
+def ops_only(handler):
+    """
+    Guard for internal endpoints on the public port: disabled (404) without
+    OPS_API_TOKEN, 401 without the right bearer token
+    """
+    @wraps(handler)
+    async def guarded(request: web.Request) -> web.Response:
+        if not config.ops_token:
+            raise web.HTTPNotFound()
+        if not ops_authorized(request):
+            return json_response({"error": "Unauthorized"}, status=401)
+        return await handler(request)
+    return guarded
+
 
 async def handle_oxapay_webhook(request: web.Request) -> web.Response:
     try:
         signature = request.headers.get("X-OxaPay-Signature", "")
-        body = await request.json()
+        raw_body = await request.read()
         
-        logger.info(f"Received webhook: {json.dumps(body)}")
+        # Callbacks move money, so they are only trusted when signed. With a
+        # secret configured every callback must carry a valid signature; without
+        # one, payout callbacks (refund / book a buy) are refused outright
+        if config.oxapay.webhook_secret:
+            verifier = OxaPayService(
+                merchant_api_key=config.oxapay.merchant_api_key,
+                payout_api_key=config.oxapay.payout_api_key,
+                webhook_secret=config.oxapay.webhook_secret,
+            )
+            if not verifier.verify_webhook(raw_body, signature):
+                logger.warning("Rejected OxaPay webhook with missing or invalid signature")
+                return json_response({"error": "Invalid signature"}, status=401)
         
-        oxapay = OxaPayService(
-            merchant_api_key=config.oxapay.merchant_api_key,
-            payout_api_key=config.oxapay.payout_api_key,
-            webhook_secret=config.oxapay.webhook_secret,
+        body = json_codec.loads(raw_body)
+        if not isinstance(body, dict):
+            return json_response({"error": "Invalid body"}, status=400)
+        
+        logger.info(
+            "Received OxaPay webhook",
+            extra={"track_id": body.get("trackId"), "order_id": body.get("orderId"), "status": body.get("status")},
         )
+        logger.debug("OxaPay webhook body: %s", body)
         
-        if config.oxapay.webhook_secret and signature:
-            if not oxapay.verify_webhook(body, signature):
-                logger.warning("Invalid webhook signature")
-                return web.json_response({"error": "Invalid signature"}, status=401)
+        if body.get("type") == "payout" and not config.oxapay.webhook_secret:
+            logger.warning("Rejected payout callback: OXAPAY_WEBHOOK_SECRET is not set")
+            return json_response({"error": "Unsigned payout callback"}, status=401)
         
         status = body.get("status")
         track_id = body.get("trackId")
         order_id = body.get("orderId", "")
         
         if not track_id:
-            return web.json_response({"error": "Missing trackId"}, status=400)
+            return json_response({"error": "Missing trackId"}, status=400)
         
         db: Prisma = request.app["db"]
         
-        if order_id.startswith("SELL_"):
+        if body.get("type") == "payout":
+            from bot.services.payout_tracker import payout_tracker
+            await payout_tracker.handle_callback(db, track_id, body)
+        
+        elif order_id.startswith("SELL_"):
             order = await db.cryptoorder.find_first(
                 where={"oxapayPaymentId": track_id},
                 include={"user": True}
@@ -66,15 +116,81 @@ async def handle_oxapay_webhook(request: web.Request) -> web.Response:
                 
                 logger.info(f"Sell order {order.id} completed, added {order.fiatAmount} to balance")
         
-        return web.json_response({"status": "ok"})
-        
+        return json_response({"status": "ok"})
+    
     except Exception as e:
         logger.error(f"Webhook error: {str(e)}")
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 
 async def health_check(request: web.Request) -> web.Response:
-    return web.json_response({"status": "healthy"})
+    from bot.services.circuit_breaker import breaker_stats, open_circuits
+    
+    # Upstream outages degrade the bot but do not make the process unhealthy - stay 200
+    return json_response({
+        "status": "degraded" if open_circuits() else "healthy",
+        "circuits": {name: stats["state"] for name, stats in breaker_stats().items()},
+    })
+
+
+async def readiness_check(request: web.Request) -> web.Response:
+    from bot.services.db_supervisor import db_supervisor
+    
+    status = 200 if db_supervisor.ready else 503
+    # Probes only need the status; pool state and the last error are for operators
+    if not ops_authorized(request):
+        return json_response({"ready": db_supervisor.ready}, status=status)
+    return json_response(db_supervisor.stats(), status=status)
+
+
+@ops_only
+async def metrics(request: web.Request) -> web.Response:
+    from bot.services.message_sender import message_sender
+    from bot.tasks.background_tasks import loop_lag_stats
+    from bot.services.db_supervisor import db_supervisor
+    from bot.formatters.render_cache import render_cache
+    from bot.services.liquidity import liquidity_ledger
+    from bot.services.payout_dispatcher import payout_dispatcher
+    from bot.services.payout_tracker import payout_tracker
+    from bot.services.circuit_breaker import breaker_stats
+    from bot.services.pin import pin_service
+    
+    data: dict = {
+        "message_sender": message_sender.stats(),
+        "event_loop": loop_lag_stats,
+        "database": db_supervisor.stats(),
+        "render_cache": render_cache.stats(),
+        "liquidity": liquidity_ledger.stats(),
+        "payouts": {**payout_dispatcher.stats(), "tracking": payout_tracker.stats()},
+        "circuits": breaker_stats(),
+        "pin": pin_service.stats(),
+    }
+    
+    db = request.app.get("db")
+    if hasattr(db, "pool_stats"):
+        data["db_pool"] = db.pool_stats()
+    
+    throttling = request.app.get("throttling")
+    if throttling is not None:
+        data["throttling"] = throttling.stats()
+    
+    return json_response(data)
+
+
+@ops_only
+async def debug_queries(request: web.Request) -> web.Response:
+    from bot.db.instrumentation import query_profiler
+    
+    try:
+        limit = int(request.query.get("limit", "20"))
+    except ValueError:
+        return json_response({"error": "limit must be an integer"}, status=400)
+    if not 1 <= limit <= DEBUG_QUERIES_MAX_LIMIT:
+        return json_response(
+            {"error": f"limit must be between 1 and {DEBUG_QUERIES_MAX_LIMIT}"},
+            status=400,
+        )
+    return json_response(query_profiler.top(limit))
 
 
 async def create_webhook_app(db: Prisma) -> web.Application:
@@ -0,0 +1,238 @@
+-- Baseline: the schema as it stood before versioned migrations were introduced.
+-- Fresh databases get it from `prisma migrate deploy`; databases created earlier
+-- (e.g. with `prisma db push`) mark it applied once with
+--   prisma migrate resolve --applied 0_init --schema=prisma/schema.prisma
+
+-- CreateEnum
+CREATE TYPE "UserStatus" AS ENUM ('PENDING', 'ACTIVE', 'INACTIVE', 'BANNED');
+
+-- CreateEnum
+CREATE TYPE "TransactionType" AS ENUM ('BUY', 'SELL', 'TOPUP', 'WITHDRAW', 'REFERRAL_BONUS');
+
+-- CreateEnum
+CREATE TYPE "TransactionStatus" AS ENUM ('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', 'CANCELLED');
+
+-- CreateEnum
+CREATE TYPE "OrderType" AS ENUM ('BUY', 'SELL');
+
+-- CreateEnum
+CREATE TYPE "OrderStatus" AS ENUM ('PENDING', 'AWAITING_PAYMENT', 'AWAITING_CRYPTO', 'PROCESSING', 'COMPLETED', 'FAILED', 'CANCELLED', 'EXPIRED');
+
+-- CreateTable
+CREATE TABLE "users" (
+    "id" TEXT NOT NULL,
+    "telegram_id" BIGINT NOT NULL,
+    "username" TEXT,
+    "first_name" TEXT,
+    "last_name" TEXT,
+    "email" TEXT,
+    "whatsapp" TEXT,
+    "latitude" DOUBLE PRECISION,
+    "longitude" DOUBLE PRECISION,
+    "pin_hash" TEXT,
+    "referral_code" TEXT NOT NULL,
+    "referred_by_id" TEXT,
+    "status" "UserStatus" NOT NULL DEFAULT 'PENDING',
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+    "last_active_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "users_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateTable
+CREATE TABLE "balances" (
+    "id" TEXT NOT NULL,
+    "user_id" TEXT NOT NULL,
+    "amount" DECIMAL(20,2) NOT NULL DEFAULT 0,
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "balances_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateTable
+CREATE TABLE "transactions" (
+    "id" TEXT NOT NULL,
+    "user_id" TEXT NOT NULL,
+    "type" "TransactionType" NOT NULL,
+    "amount" DECIMAL(20,2) NOT NULL,
+    "description" TEXT,
+    "status" "TransactionStatus" NOT NULL DEFAULT 'PENDING',
+    "metadata" JSONB,
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "transactions_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateTable
+CREATE TABLE "deposits" (
+    "id" TEXT NOT NULL,
+    "user_id" TEXT NOT NULL,
+    "amount" DECIMAL(20,2) NOT NULL,
+    "payment_method" TEXT NOT NULL,
+    "proof_image" TEXT,
+    "cryptobot_invoice_id" TEXT,
+    "status" "TransactionStatus" NOT NULL DEFAULT 'PENDING',
+    "admin_note" TEXT,
+    "approved_by_id" TEXT,
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "deposits_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateTable
+CREATE TABLE "withdrawals" (
+    "id" TEXT NOT NULL,
+    "user_id" TEXT NOT NULL,
+    "amount" DECIMAL(20,2) NOT NULL,
+    "bank_name" TEXT,
+    "account_number" TEXT,
+    "account_name" TEXT,
+    "ewallet_type" TEXT,
+    "ewallet_number" TEXT,
+    "status" "TransactionStatus" NOT NULL DEFAULT 'PENDING',
+    "admin_note" TEXT,
+    "approved_by_id" TEXT,
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "withdrawals_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateTable
+CREATE TABLE "crypto_orders" (
+    "id" TEXT NOT NULL,
+    "user_id" TEXT NOT NULL,
+    "order_type" "OrderType" NOT NULL,
+    "coin_symbol" TEXT NOT NULL,
+    "network" TEXT NOT NULL,
+    "crypto_amount" DECIMAL(30,18) NOT NULL,
+    "fiat_amount" DECIMAL(20,2) NOT NULL,
+    "rate" DECIMAL(30,8) NOT NULL,
+    "margin" DECIMAL(10,4) NOT NULL,
+    "network_fee" DECIMAL(30,18) NOT NULL,
+    "wallet_address" TEXT,
+    "deposit_address" TEXT,
+    "oxapay_payment_id" TEXT,
+    "oxapay_payout_id" TEXT,
+    "tx_hash" TEXT,
+    "status" "OrderStatus" NOT NULL DEFAULT 'PENDING',
+    "expires_at" TIMESTAMP(3),
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "crypto_orders_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateTable
+CREATE TABLE "settings" (
+    "id" TEXT NOT NULL,
+    "key" TEXT NOT NULL,
+    "value" TEXT NOT NULL,
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "settings_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateTable
+CREATE TABLE "coin_settings" (
+    "id" TEXT NOT NULL,
+    "coin_symbol" TEXT NOT NULL,
+    "network" TEXT NOT NULL,
+    "buy_margin" DECIMAL(10,4) NOT NULL,
+    "sell_margin" DECIMAL(10,4) NOT NULL,
+    "is_active" BOOLEAN NOT NULL DEFAULT true,
+    "min_buy" DECIMAL(20,2) NOT NULL,
+    "max_buy" DECIMAL(20,2) NOT NULL,
+    "min_sell" DECIMAL(20,2) NOT NULL,
+    "max_sell" DECIMAL(20,2) NOT NULL,
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "coin_settings_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateTable
+CREATE TABLE "payment_methods" (
+    "id" TEXT NOT NULL,
+    "type" TEXT NOT NULL,
+    "name" TEXT NOT NULL,
+    "account_no" TEXT,
+    "account_name" TEXT,
+    "is_active" BOOLEAN NOT NULL DEFAULT true,
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "payment_methods_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateTable
+CREATE TABLE "admins" (
+    "id" TEXT NOT NULL,
+    "username" TEXT NOT NULL,
+    "password_hash" TEXT NOT NULL,
+    "name" TEXT NOT NULL,
+    "is_active" BOOLEAN NOT NULL DEFAULT true,
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "admins_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateTable
+CREATE TABLE "referral_settings" (
+    "id" TEXT NOT NULL,
+    "referrer_bonus" DECIMAL(20,2) NOT NULL,
+    "referee_bonus" DECIMAL(20,2) NOT NULL,
+    "is_active" BOOLEAN NOT NULL DEFAULT true,
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "referral_settings_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "users_telegram_id_key" ON "users"("telegram_id");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "users_referral_code_key" ON "users"("referral_code");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "balances_user_id_key" ON "balances"("user_id");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "settings_key_key" ON "settings"("key");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "coin_settings_coin_symbol_network_key" ON "coin_settings"("coin_symbol", "network");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "admins_username_key" ON "admins"("username");
+
+-- AddForeignKey
+ALTER TABLE "users" ADD CONSTRAINT "users_referred_by_id_fkey" FOREIGN KEY ("referred_by_id") REFERENCES "users"("id") ON DELETE SET NULL ON UPDATE CASCADE;
+
+-- AddForeignKey
+ALTER TABLE "balances" ADD CONSTRAINT "balances_user_id_fkey" FOREIGN KEY ("user_id") REFERENCES "users"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- AddForeignKey
+ALTER TABLE "transactions" ADD CONSTRAINT "transactions_user_id_fkey" FOREIGN KEY ("user_id") REFERENCES "users"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- AddForeignKey
+ALTER TABLE "deposits" ADD CONSTRAINT "deposits_user_id_fkey" FOREIGN KEY ("user_id") REFERENCES "users"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- AddForeignKey
+ALTER TABLE "deposits" ADD CONSTRAINT "deposits_approved_by_id_fkey" FOREIGN KEY ("approved_by_id") REFERENCES "admins"("id") ON DELETE SET NULL ON UPDATE CASCADE;
+
+-- AddForeignKey
+ALTER TABLE "withdrawals" ADD CONSTRAINT "withdrawals_user_id_fkey" FOREIGN KEY ("user_id") REFERENCES "users"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- AddForeignKey
+ALTER TABLE "withdrawals" ADD CONSTRAINT "withdrawals_approved_by_id_fkey" FOREIGN KEY ("approved_by_id") REFERENCES "admins"("id") ON DELETE SET NULL ON UPDATE CASCADE;
+
+-- AddForeignKey
+ALTER TABLE "crypto_orders" ADD CONSTRAINT "crypto_orders_user_id_fkey" FOREIGN KEY ("user_id") REFERENCES "users"("id") ON DELETE CASCADE ON UPDATE CASCADE;
@@ -0,0 +1,24 @@
+-- Denormalized referral stats on users, kept up to date by signup and referral bonus writes
+ALTER TABLE "users" ADD COLUMN IF NOT EXISTS "referral_count" INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE "users" ADD COLUMN IF NOT EXISTS "referral_bonus_total" DECIMAL(20,2) NOT NULL DEFAULT 0;
+
+-- Backfill from existing rows
+UPDATE "users" u
+SET "referral_count" = r.cnt
+FROM (
+    SELECT "referred_by_id" AS id, COUNT(*) AS cnt
+    FROM "users"
+    WHERE "referred_by_id" IS NOT NULL
+    GROUP BY "referred_by_id"
+) r
+WHERE u."id" = r.id;
+
+UPDATE "users" u
+SET "referral_bonus_total" = t.total
+FROM (
+    SELECT "user_id" AS id, SUM("amount") AS total
+    FROM "transactions"
+    WHERE "type" = 'REFERRAL_BONUS' AND "status" = 'COMPLETED'
+    GROUP BY "user_id"
+) t
+WHERE u."id" = t.id;
@@ -0,0 +1,27 @@
+-- Referral closure table: one row per (ancestor, descendant) pair, depth 1 = direct referral
+CREATE TABLE IF NOT EXISTS "referral_closure" (
+    "ancestor_id" TEXT NOT NULL,
+    "descendant_id" TEXT NOT NULL,
+    "depth" INTEGER NOT NULL,
+    CONSTRAINT "referral_closure_pkey" PRIMARY KEY ("ancestor_id", "descendant_id"),
+    CONSTRAINT "referral_closure_ancestor_id_fkey" FOREIGN KEY ("ancestor_id") REFERENCES "users"("id") ON DELETE CASCADE ON UPDATE CASCADE,
+    CONSTRAINT "referral_closure_descendant_id_fkey" FOREIGN KEY ("descendant_id") REFERENCES "users"("id") ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS "referral_closure_ancestor_id_depth_idx" ON "referral_closure"("ancestor_id", "depth");
+CREATE INDEX IF NOT EXISTS "referral_closure_descendant_id_idx" ON "referral_closure"("descendant_id");
+
+-- Backfill from users.referred_by_id
+WITH RECURSIVE tree AS (
+    SELECT "referred_by_id" AS ancestor_id, "id" AS descendant_id, 1 AS depth
+    FROM "users"
+    WHERE "referred_by_id" IS NOT NULL
+    UNION ALL
+    SELECT u."referred_by_id", t.descendant_id, t.depth + 1
+    FROM tree t
+    JOIN "users" u ON u."id" = t.ancestor_id
+    WHERE u."referred_by_id" IS NOT NULL AND t.depth < 100
+)
+INSERT INTO "referral_closure" ("ancestor_id", "descendant_id", "depth")
+SELECT ancestor_id, descendant_id, depth FROM tree
+ON CONFLICT DO NOTHING;
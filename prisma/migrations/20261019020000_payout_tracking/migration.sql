@@ -0,0 +1,6 @@
+-- Payout progress reported by OxaPay callbacks and the overdue-callback poller
+ALTER TABLE "crypto_orders" ADD COLUMN IF NOT EXISTS "confirmations" INTEGER NOT NULL DEFAULT 0;
+
+-- Callback lookup by payout track id, and the poller's scan of stale PROCESSING orders
+CREATE INDEX IF NOT EXISTS "crypto_orders_oxapay_payout_id_idx" ON "crypto_orders"("oxapay_payout_id");
+CREATE INDEX IF NOT EXISTS "crypto_orders_status_updated_at_idx" ON "crypto_orders"("status", "updated_at");
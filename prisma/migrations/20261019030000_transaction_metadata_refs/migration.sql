@@ -0,0 +1,4 @@
+-- Ledger transactions are tied to their deposit / withdrawal through metadata;
+-- bulk admin approvals look them up by that key
+CREATE INDEX IF NOT EXISTS "transactions_metadata_deposit_id_idx" ON "transactions" (("metadata"->>'depositId'));
+CREATE INDEX IF NOT EXISTS "transactions_metadata_withdrawal_id_idx" ON "transactions" (("metadata"->>'withdrawalId'));
@@ -0,0 +1,2 @@
+-- Top referrers by direct referrals read users ordered by referral_count
+CREATE INDEX IF NOT EXISTS "users_referral_count_idx" ON "users"("referral_count");
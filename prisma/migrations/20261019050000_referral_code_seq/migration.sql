@@ -0,0 +1,2 @@
+-- Counter behind referral codes; each nextval reserves a block of 100 (ReferralCodeAllocator.BLOCK_SIZE)
+CREATE SEQUENCE IF NOT EXISTS "referral_code_seq" INCREMENT BY 100;
@@ -8,6 +8,7 @@ load_dotenv()
 from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from typing import Optional
@@ -15,17 +16,36 @@ from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_applicati
 from prisma import Prisma
 
 from bot.config import config
+from bot.utils import json_codec
+from bot.db.client import create_prisma, set_read_replica
 from bot.handlers import setup_routers
 from bot.middlewares.throttling import ThrottlingMiddleware
 from bot.middlewares.database import DatabaseMiddleware
 from bot.middlewares.user_status import UserStatusMiddleware
 from bot.middlewares.logging import LoggingMiddleware
-from bot.webhook import handle_oxapay_webhook, health_check
-from bot.tasks.background_tasks import warm_coins_cache, refresh_coins_cache_worker, database_keepalive_worker
+from bot.webhook import handle_oxapay_webhook, health_check, readiness_check, metrics, debug_queries
+from bot.services.message_sender import message_sender
+from bot.services.broadcast import broadcast_engine
+from bot.services.db_supervisor import db_supervisor
+from bot.services.referral_codes import referral_code_allocator
+from bot.services.custody import custody_snapshot
+from bot.services.payout_dispatcher import payout_dispatcher
+from bot.services.payout_tracker import payout_tracker
+from bot.services.pin import pin_service
+from bot.tasks.background_tasks import (
+    warm_coins_cache,
+    refresh_coins_cache_worker,
+    warm_cryptobot_rates_cache,
+    refresh_cryptobot_rates_worker,
+    event_loop_lag_monitor,
+)
+
+from bot.utils.log_setup import setup_logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+log_listener = setup_logging(
+    level=getattr(logging, config.logging.level, logging.INFO),
+    json_format=config.logging.json,
+    sample_rate=config.logging.sample_rate,
 )
 logger = logging.getLogger(__name__)
 
@@ -33,12 +53,17 @@ WEBHOOK_PATH = "/telegram/webhook"
 WEBHOOK_PORT = 8080
 
 
+_throttling_mw: Optional[ThrottlingMiddleware] = None
+
+
 def setup_dispatcher(prisma: Prisma) -> Dispatcher:
+    global _throttling_mw
     storage = MemoryStorage()
     dp = Dispatcher(storage=storage)
     
     logging_mw = LoggingMiddleware()
-    throttling_mw = ThrottlingMiddleware(rate_limit=0.1)
+    throttling_mw = ThrottlingMiddleware()
+    _throttling_mw = throttling_mw
     database_mw = DatabaseMiddleware(prisma)
     user_status_mw = UserStatusMiddleware()
     
@@ -74,17 +99,42 @@ async def on_startup(bot: Bot):
     
     # WARM COINS CACHE FOR INSTANT RESPONSES
     await warm_coins_cache()
+    await warm_cryptobot_rates_cache()
+    
+    # OUTBOUND MESSAGE QUEUE - handlers enqueue, workers deliver within Telegram limits
+    message_sender.start(bot)
     
     # START BACKGROUND WORKERS (fire and forget)
     asyncio.create_task(refresh_coins_cache_worker())
+    asyncio.create_task(refresh_cryptobot_rates_worker())
+    asyncio.create_task(event_loop_lag_monitor())
+    asyncio.create_task(custody_snapshot.run())
     
-    # DATABASE KEEPALIVE - ping every 60s to prevent NeonSQL idle disconnect
+    # DATABASE SUPERVISOR - health probes (also keep NeonSQL awake) and single-flight reconnect
     if _prisma_instance:
-        asyncio.create_task(database_keepalive_worker(_prisma_instance))
-        logger.info("Database keepalive worker started")
+        db_supervisor.start(_prisma_instance)
+        
+        # BUY PAYOUTS ARE QUEUED AND SUBMITTED IN RATE-LIMITED BATCHES
+        payout_dispatcher.start(_prisma_instance)
+        
+        # PAYOUT STATUS - callbacks finalize orders, overdue ones are polled
+        payout_tracker.start(_prisma_instance)
+        
+        # RESERVE A BLOCK OF REFERRAL CODES SO SIGNUP NEVER WAITS ON THE SEQUENCE
+        await referral_code_allocator.start(_prisma_instance)
+        
+        # RESUME UNFINISHED BROADCAST FROM ITS LAST CHECKPOINT
+        await broadcast_engine.resume(bot, _prisma_instance)
 
 
 async def on_shutdown(bot: Bot):
+    await payout_dispatcher.stop()
+    await payout_tracker.stop()
+    # Last, so notices produced while the payout services drain still go out
+    await message_sender.stop()
+    await db_supervisor.stop()
+    await custody_snapshot.close()
+    pin_service.close()
     await bot.delete_webhook()
     logger.info("Webhook deleted")
 
@@ -103,7 +153,7 @@ async def main():
         return
     
     global _prisma_instance
-    prisma = Prisma()
+    prisma = create_prisma(config.database)
     _prisma_instance = prisma
     
     try:
@@ -113,8 +163,20 @@ async def main():
         logger.error(f"Failed to connect to database: {e}")
         return
     
+    replica = None
+    if config.database.replica_url:
+        replica = create_prisma(config.database, replica=True)
+        try:
+            await replica.connect()
+            set_read_replica(replica, primary=prisma)
+            logger.info("Connected to read replica")
+        except Exception as e:
+            replica = None
+            logger.warning(f"Read replica unavailable, reads stay on primary: {e}")
+    
     bot = Bot(
         token=config.bot.token,
+        session=AiohttpSession(json_loads=json_codec.loads, json_dumps=json_codec.dumps),
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
     
@@ -126,9 +188,13 @@ async def main():
     app = web.Application()
     app["db"] = prisma
     app["bot"] = bot
+    app["throttling"] = _throttling_mw
     
     app.router.add_post("/webhook/oxapay", handle_oxapay_webhook)
     app.router.add_get("/health", health_check)
+    app.router.add_get("/ready", readiness_check)
+    app.router.add_get("/debug/queries", debug_queries)
+    app.router.add_get("/metrics", metrics)
     
     webhook_handler = SimpleRequestHandler(dispatcher=dp, bot=bot)
     webhook_handler.register(app, path=WEBHOOK_PATH)
@@ -152,7 +218,10 @@ async def main():
     finally:
         await runner.cleanup()
         await prisma.disconnect()
+        if replica is not None:
+            await replica.disconnect()
         await bot.session.close()
+        log_listener.stop()
 
 
 if __name__ == "__main__":